@@ -1,22 +1,107 @@
-from flask import Flask, jsonify, request
-from flask_jwt_extended import JWTManager, create_access_token
+from flask import Flask, Response, g, has_request_context, jsonify, request
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
 from flask_cors import CORS
-import bcrypt
+from werkzeug.exceptions import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import atexit
+import click
+import functools
+import json
 import mysql.connector
 import threading
 import time
 
 from dotenv import load_dotenv
 import os
+
+import dashboard
+import ingest
+import json_provider
+import metrics
+import migrations
+import pagination
+import reference_data
+import response_compression
+import route_search
+import storage
+import timeseries
+from auth import CredentialVerifier, TokenBucketLimiter, VerifierBusy
+from change_detector import ChangeDetector
+from db_pool import ConnectionPool
+from live_stream import LiveFeed
+from risk_index import RiskIndex
+from result_cache import CacheEntry, DataVersion, ResultCache
  
 load_dotenv()
 
 app = Flask(__name__)
+app.json = json_provider.provider_class(os.getenv("JSON_PROVIDER", "orjson"))(app)
 CORS(app)
 app.config['JWT_SECRET_KEY'] = 'abhishek_harsh_manish'
 jwt = JWTManager(app)
+app.config['RESULT_CACHE_ENABLED'] = os.getenv("RESULT_CACHE_ENABLED", "1") != "0"
+app.config['STORAGE_ENGINE'] = os.getenv("STORAGE_ENGINE", "mysql")
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", response_compression.DEFAULT_MIN_SIZE))
+app.config['COMPRESS_LEVEL'] = int(os.getenv("COMPRESS_LEVEL")) if os.getenv("COMPRESS_LEVEL") else None
+# Reverse proxies in front of the app; their X-Forwarded-For entries are trusted.
+app.config['TRUSTED_PROXIES'] = int(os.getenv("TRUSTED_PROXIES", 0))
 
-def get_db_connection():
+_pool = None
+_pool_lock = threading.Lock()
+
+registry = metrics.Registry()
+http_requests = registry.counter(
+    'http_requests_total', "Requests served, by route and status.", ('method', 'route', 'status')
+)
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', "Time until the response (or the start of a stream) was ready.",
+    ('method', 'route'),
+)
+http_in_flight = registry.gauge('http_requests_in_flight', "Requests currently being handled.")
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _query_context():
+    """Name the route (or background thread) a statement runs for."""
+    if has_request_context():
+        return _route_label()
+    return threading.current_thread().name
+
+
+query_recorder = metrics.QueryRecorder(
+    registry,
+    slow_threshold=float(os.getenv("SLOW_QUERY_MS", 200)) / 1000,
+    context=_query_context,
+)
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    http_in_flight.inc()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = _route_label()
+        http_request_duration.observe(time.perf_counter() - started, method=request.method, route=route)
+        http_requests.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def _finish_request(exc):
+    if g.pop('request_started', None) is not None:
+        http_in_flight.dec()
+
+
+def _connect():
     """Establish and return a MySQL database connection with SSL."""
     return mysql.connector.connect(
         host=os.getenv("DB_HOST"),
@@ -26,6 +111,302 @@ def get_db_connection():
         port=int(os.getenv("DB_PORT"))
     )
 
+
+def get_pool():
+    """Return this process's connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+                    max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 5)),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+                    pre_ping=os.getenv("DB_POOL_PRE_PING", "1") != "0",
+                )
+    return _pool
+
+
+def get_db_connection():
+    """Check a MySQL connection out of the pool; closing it returns it to the pool."""
+    return get_pool().connect()
+
+
+@contextmanager
+def db_connection():
+    """Yield a pooled connection and always give it back, dropping it if it broke.
+
+    Statements run on it are timed into ``/metrics`` and the slow-query log.
+    """
+    conn = metrics.InstrumentedConnection(get_db_connection(), query_recorder)
+    try:
+        yield conn
+    except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError):
+        conn.invalidate()
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def db_cursor(dictionary=False):
+    """Yield a cursor on a pooled connection, closing both afterwards."""
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+# Only a path the operator chose is trusted to hold a snapshot from an earlier run.
+snapshot = storage.SnapshotEngine(
+    db_connection,
+    path=os.getenv("SQLITE_SNAPSHOT_PATH") or os.path.join(app.instance_path, 'snapshot.db'),
+    interval=float(os.getenv("SQLITE_SNAPSHOT_INTERVAL", 60)),
+    reuse=bool(os.getenv("SQLITE_SNAPSHOT_PATH")),
+)
+
+
+@contextmanager
+def read_connection():
+    """Yield a connection for read-only queries from the configured storage engine.
+
+    With ``STORAGE_ENGINE=sqlite`` reads go to the local snapshot once one
+    exists; until then, and with the default ``mysql`` engine, they use the pool.
+    The first such read starts the refresher if ``start_background_jobs`` has not.
+    """
+    if app.config['STORAGE_ENGINE'] == 'sqlite':
+        snapshot.ensure_started()
+    if app.config['STORAGE_ENGINE'] == 'sqlite' and snapshot.ready:
+        with snapshot.connection() as conn:
+            conn = metrics.InstrumentedConnection(conn, query_recorder)
+            try:
+                yield conn
+            finally:
+                conn.finish()
+    else:
+        with db_connection() as conn:
+            yield conn
+
+
+@contextmanager
+def read_cursor(dictionary=False):
+    """Like ``db_cursor`` but on a ``read_connection``."""
+    with read_connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("QUERY_FANOUT_WORKERS", 8)),
+    thread_name_prefix='query',
+)
+
+
+def fan_out(*calls):
+    """Run independent zero-argument DB calls concurrently, returning results in order.
+
+    Each call checks out its own pooled connection, so never call this while
+    holding one: the jobs then only ever wait on the pool, not on each other.
+    """
+    futures = [query_executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
+
+
+reference = reference_data.ReferenceStore(
+    db_connection,
+    interval=float(os.getenv("REFERENCE_DATA_INTERVAL", 30)),
+)
+REFERENCE_TABLES = ('vulnerability_severity', 'VulnerabilityMitigations')
+
+
+def _reference():
+    """The preloaded reference tables, loaded on first use; ``None`` (read them with SQL) if MySQL cannot serve them."""
+    try:
+        return reference.current()
+    except mysql.connector.Error:
+        return None
+
+
+VERSIONED_TABLES = (
+    'api_routes',
+    'api_route_methods',
+    'vulnerabilities',
+    'vulnerability_severity',
+    'live_graph',
+    'VulnerabilityMitigations',
+)
+# Tables without an ``id`` column and the column whose maximum versions them instead.
+VERSION_COLUMNS = {'api_route_methods': 'route_id'}
+
+
+def _probe_data_versions():
+    """Return a (row count, max id) token for every versioned table in one round trip.
+
+    Once the reference tables are preloaded their content version is used
+    instead, so in-place edits picked up by a reload also change the token.
+    ``api_route_methods`` reads as ``None`` until migration 0002 creates it.
+    """
+    tables = VERSIONED_TABLES
+    with read_cursor() as cursor:
+        try:
+            versions = _select_versions(cursor, tables)
+        except mysql.connector.Error as e:
+            if not migrations.is_missing_table(e):
+                raise
+            tables = tuple(table for table in tables if table != 'api_route_methods')
+            versions = dict(_select_versions(cursor, tables), api_route_methods=None)
+    data = _reference()
+    if data is not None:
+        versions.update((table, data.version) for table in REFERENCE_TABLES)
+    return versions
+
+
+def _select_versions(cursor, tables):
+    cursor.execute(" UNION ALL ".join(
+        f"SELECT '{table}', COUNT(*), MAX({VERSION_COLUMNS.get(table, 'id')}) FROM `{table}`" for table in tables
+    ))
+    return {table: (count, max_id) for table, count, max_id in cursor.fetchall()}
+
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 256)),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", 300)),
+)
+data_versions = DataVersion(_probe_data_versions, ttl=float(os.getenv("DATA_VERSION_TTL", 1)))
+registry.add_collector('db_pool', "Connection pool statistics.", lambda: get_pool().stats() if _pool is not None else {})
+registry.add_collector('result_cache', "Result cache statistics.", lambda: result_cache.stats())
+
+
+def _render_entry(view, args, kwargs):
+    response = app.make_response(view(*args, **kwargs))
+    return CacheEntry(response.get_data(), response.status_code, response.mimetype)
+
+
+def _response_encoding(size, mimetype, req=None):
+    """The content coding negotiated by ``req`` (the current request) for a body
+    of ``size`` bytes, or ``None`` to send it as is."""
+    if size < app.config['COMPRESS_MIN_SIZE'] or not response_compression.is_compressible(mimetype):
+        return None
+    return response_compression.negotiate((req or request).headers.get('Accept-Encoding'))
+
+
+@app.after_request
+def _compress_response(response):
+    """Compress large uncached bodies; cached ones are already encoded by ``cached_read``."""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = _response_encoding(response.content_length or 0, response.mimetype)
+    if encoding:
+        response.set_data(response_compression.compress(response.get_data(), encoding, app.config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def wants_stream():
+    """Whether the client asked for an NDJSON stream instead of a JSON document."""
+    return request.args.get('format') == 'ndjson'
+
+
+def ndjson_response(query, params, encode):
+    """Stream the rows of ``query`` to the client as newline-delimited JSON."""
+    return Response(
+        pagination.stream_ndjson(read_connection, query, params, encode, dumps=app.json.dumps),
+        mimetype='application/x-ndjson',
+    )
+
+
+CACHED_ENTRY_KEY = 'deploy_api.cached_entry'
+_cached_views = {}  # endpoint -> (tables, vary) of its cached_read
+
+
+def _cache_key(path, query_string, args, versions, vary):
+    key = (path, query_string, versions)
+    return key if vary is None else key + (vary(args),)
+
+
+def cached_read(*tables, vary=None):
+    """Serve a GET view from the result cache, keyed on the data versions of ``tables``.
+
+    ``vary(request.args)``, when given, adds to the key whatever else the
+    response depends on, such as the current time. Responses carry an ETag
+    and answer a matching ``If-None-Match`` with 304.
+    """
+    def decorator(view):
+        _cached_views[view.__name__] = (tables, vary)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not app.config['RESULT_CACHE_ENABLED'] or wants_stream():
+                return view(*args, **kwargs)
+
+            entry = request.environ.get(CACHED_ENTRY_KEY)
+            if entry is None:
+                key = _cache_key(request.path, request.query_string, request.args,
+                                 data_versions.current(tables), vary)
+                entry = result_cache.get_or_compute(
+                    key,
+                    lambda: _render_entry(view, args, kwargs),
+                    cacheable=lambda entry: entry.status == 200,
+                )
+            response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+            etag = entry.etag
+            encoding = _response_encoding(len(entry.body), entry.mimetype)
+            if encoding:
+                # Encoded once per entry; later hits reuse the compressed bytes.
+                response.set_data(entry.encoded(encoding, lambda body: response_compression.compress(
+                    body, encoding, app.config['COMPRESS_LEVEL'])))
+                response.headers['Content-Encoding'] = encoding
+                etag = f"{etag}-{encoding}"
+            response.vary.add('Accept-Encoding')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def attach_cached_entry(environ):
+    """Find the cached response for a WSGI request without touching the database.
+
+    When the request is a GET for a ``cached_read`` view, the data versions
+    were probed within their TTL and the result cache holds the entry with
+    the negotiated encoding already applied (or none needed), the entry is
+    stored in ``environ`` and this returns True: running the app on
+    ``environ`` then does no I/O or compression, so the ASGI front end can
+    answer it on the event loop instead of an executor thread.
+    """
+    if not app.config['RESULT_CACHE_ENABLED'] or environ.get('REQUEST_METHOD') != 'GET':
+        return False
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return False
+    if endpoint not in _cached_views:
+        return False
+    tables, vary = _cached_views[endpoint]
+    req = app.request_class(environ)
+    if req.args.get('format') == 'ndjson':
+        return False
+    versions = data_versions.peek(tables)
+    if versions is None:
+        return False
+    entry = result_cache.get(_cache_key(req.path, req.query_string, req.args, versions, vary))
+    if entry is None:
+        return False
+    encoding = _response_encoding(len(entry.body), entry.mimetype, req)
+    if encoding is not None and not entry.has_encoded(encoding):
+        return False
+    environ[CACHED_ENTRY_KEY] = entry
+    return True
+
 # def verifyToken():
 #     username = get_jwt_identity()
 #     conn = get_db_connection()
@@ -36,6 +417,55 @@ def get_db_connection():
 #     conn.close()
 #     return user_exists
 
+credential_cache = ResultCache(
+    max_entries=int(os.getenv("CREDENTIAL_CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(os.getenv("CREDENTIAL_CACHE_TTL", 30)),
+)
+login_ip_limiter = TokenBucketLimiter(
+    capacity=int(os.getenv("LOGIN_IP_BURST", 20)),
+    refill_rate=float(os.getenv("LOGIN_IP_RATE", 1)),
+)
+login_user_limiter = TokenBucketLimiter(
+    capacity=int(os.getenv("LOGIN_USER_BURST", 5)),
+    refill_rate=float(os.getenv("LOGIN_USER_RATE", 0.2)),
+)
+password_verifier = CredentialVerifier(
+    max_workers=int(os.getenv("BCRYPT_WORKERS", os.cpu_count() or 2)),
+    max_queue=int(os.getenv("BCRYPT_MAX_QUEUE", 16)),
+)
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", 5))
+
+
+def _client_address():
+    """The caller's IP: ``remote_addr``, or behind ``TRUSTED_PROXIES`` proxies
+    the ``X-Forwarded-For`` entry added by the outermost one of them."""
+    proxies = app.config['TRUSTED_PROXIES']
+    if proxies:
+        forwarded = [addr.strip() for addr in request.headers.get('X-Forwarded-For', '').split(',') if addr.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.remote_addr
+
+
+def _load_password_hash(username):
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT hashed_password FROM users WHERE username = %s", (username,))
+        user = cursor.fetchone()
+    # Unknown users are cached as '' so a username spray does not reach the database either.
+    return user['hashed_password'] if user else ''
+
+
+def _password_hash(username):
+    """Return the stored bcrypt hash for ``username`` ('' if unknown), cached for a few seconds."""
+    return credential_cache.get_or_compute(username, lambda: _load_password_hash(username))
+
+
+def _too_many_attempts(retry_after):
+    response = jsonify({"msg": "Too many login attempts, try again later"})
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+
 @app.route('/api/login', methods=['POST'])
 def login():
     username = request.json.get('username', None)
@@ -44,14 +474,22 @@ def login():
     if not username or not password:
         return jsonify({"msg": "Username and password are required"}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT hashed_password FROM users WHERE username = %s", (username,))
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    # Throttle before touching the database or spending any bcrypt time.
+    for limiter, key in ((login_ip_limiter, _client_address()), (login_user_limiter, username)):
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            return _too_many_attempts(retry_after)
+
+    hashed_password = _password_hash(username)
 
-    if user and bcrypt.checkpw(password.encode('utf-8'), user['hashed_password'].encode('utf-8')):
+    try:
+        verified = bool(hashed_password) and password_verifier.verify(password, hashed_password, timeout=BCRYPT_TIMEOUT)
+    except VerifierBusy:
+        response = jsonify({"msg": "Login is busy, try again shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    if verified:
         access_token = create_access_token(identity=username)
         return jsonify(access_token=access_token), 200
     else:
@@ -59,229 +497,776 @@ def login():
 
 
 @app.route('/api/routes', methods=['GET'])
+@cached_read('api_routes', 'api_route_methods')
 def get_routes():
-    """Fetch API routes from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT path, methods FROM api_routes")
-    routes = cursor.fetchall()
-    
-    for route in routes:
-        route['methods'] = route['methods'].split(', ')
-    
-    cursor.close()
-    conn.close()
-    return jsonify(routes)
+    """Fetch API routes from the database.
+
+    ``limit``/``after`` return one keyset page ordered by id together with
+    ``next_after``; ``format=ndjson`` streams every route line by line.
+    """
+    try:
+        limit, after = pagination.parse_page_args(
+            request.args, max_limit=None if wants_stream() else pagination.MAX_PAGE_SIZE
+        )
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    if wants_stream():
+        return Response(_stream_routes(after, limit), mimetype='application/x-ndjson')
+
+    if limit is not None or after is not None:
+        limit = limit or pagination.DEFAULT_PAGE_SIZE
+        with read_cursor() as cursor:
+            routes = _fetch_routes(cursor, after, limit + 1)
+        next_after = routes[limit - 1]['id'] if len(routes) > limit else None
+        return jsonify(routes=routes[:limit], next_after=next_after)
+
+    with read_cursor() as cursor:
+        routes = _fetch_routes(cursor)
+
+    return jsonify([{'path': route['path'], 'methods': route['methods']} for route in routes])
+
+
+def _fetch_routes(cursor, after=None, limit=None):
+    """One keyset page of routes as ``{'id', 'path', 'methods'}``, methods read as in ``route_search``."""
+    query, params = pagination.keyset_query("id, path, methods, route_name", "api_routes", after, limit)
+    return [{'id': route_id, 'path': path, 'methods': methods}
+            for route_id, path, methods, _ in route_search.fetch_routes(cursor, query, params)]
+
+
+def _stream_routes(after=None, limit=None):
+    """Yield routes after ``after`` (up to ``limit``) as NDJSON, one keyset page of routes per query."""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            remaining = limit
+            while remaining is None or remaining > 0:
+                size = pagination.STREAM_BATCH_SIZE if remaining is None else min(remaining, pagination.STREAM_BATCH_SIZE)
+                routes = _fetch_routes(cursor, after, size)
+                if not routes:
+                    break
+                yield ''.join(app.json.dumps(route) + '\n' for route in routes)
+                after = routes[-1]['id']
+                if remaining is not None:
+                    remaining -= len(routes)
+        finally:
+            cursor.close()
 
-@app.route('/api/vulnerabilities', methods=['GET'])
-def get_vulnerabilities():
-    """Fetch vulnerabilities from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT vulnerability_type, route_name FROM vulnerabilities")
-    vulnerabilities = cursor.fetchall()
-    cursor.close()
-    conn.close()
 
+route_index = route_search.RouteIndex()
+
+
+def _current_route_index():
+    """The route search index, first catching up with any change to ``api_routes``."""
+    version = data_versions.current(('api_routes',))[0]
+    if not route_index.ready or route_index.stale or version != route_index.version:
+        with read_connection() as conn:
+            route_index.sync(conn, version)
+    return route_index
+
+
+def _routes_with_finding(vulnerability_type):
+    if risk_index.ready:
+        return risk_index.routes_with(vulnerability_type)
+    with read_cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT route_name FROM vulnerabilities WHERE vulnerability_type = %s", (vulnerability_type,)
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+@app.route('/api/routes/search', methods=['GET'])
+@cached_read('api_routes', 'vulnerabilities')
+def search_routes():
+    """Search route paths by prefix, segment wildcard (``*``, ``**``) or fuzzy match.
+
+    ``match`` picks the mode (``auto`` by default); ``method`` (repeatable
+    or comma-separated) and ``vulnerability`` filter the results, which are
+    ranked best first and paged with ``limit``/``offset``.
+    """
+    match = request.args.get('match', 'auto')
+    if match not in route_search.MATCH_MODES:
+        return jsonify({"msg": f"match must be one of {', '.join(route_search.MATCH_MODES)}"}), 400
+    try:
+        limit = int(request.args.get('limit', route_search.DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"msg": "limit and offset must be integers"}), 400
+    if not 1 <= limit <= route_search.MAX_LIMIT or offset < 0:
+        return jsonify({"msg": f"limit must be between 1 and {route_search.MAX_LIMIT} and offset not negative"}), 400
+
+    methods = [m for raw in request.args.getlist('method') for m in migrations.split_methods(raw)]
+    vulnerability = request.args.get('vulnerability')
+    route_names = _routes_with_finding(vulnerability) if vulnerability else None
+
+    query = request.args.get('q', '')
+    total, results = _current_route_index().search(
+        query, match=match, methods=methods, route_names=route_names, offset=offset, limit=limit
+    )
+    next_offset = offset + limit if offset + limit < total else None
+    return jsonify(query=query, match=match, total=total, results=results, next_offset=next_offset)
+
+
+def _group_vulnerabilities(vulnerabilities):
     grouped_vulnerabilities = {}
     for vuln in vulnerabilities:
         vuln_type = vuln['vulnerability_type']
         if vuln_type not in grouped_vulnerabilities:
             grouped_vulnerabilities[vuln_type] = []
         grouped_vulnerabilities[vuln_type].append(vuln['route_name'])
+    return grouped_vulnerabilities
+
+
+@app.route('/api/vulnerabilities', methods=['GET'])
+@cached_read('vulnerabilities')
+def get_vulnerabilities():
+    """Fetch vulnerabilities from the database, grouped by type.
+
+    Supports the same ``limit``/``after`` paging and ``format=ndjson``
+    streaming as ``/api/routes``; streamed rows are not grouped.
+    """
+    try:
+        limit, after = pagination.parse_page_args(
+            request.args, max_limit=None if wants_stream() else pagination.MAX_PAGE_SIZE
+        )
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    columns = "id, vulnerability_type, route_name"
+    if wants_stream():
+        query, params = pagination.keyset_query(columns, "vulnerabilities", after, limit)
+        return ndjson_response(query, params, dict)
 
-    return jsonify(grouped_vulnerabilities)
+    if limit is not None or after is not None:
+        with read_cursor(dictionary=True) as cursor:
+            vulnerabilities, next_after = pagination.fetch_page(
+                cursor, columns, "vulnerabilities", after, limit or pagination.DEFAULT_PAGE_SIZE
+            )
+        return jsonify(vulnerabilities=_group_vulnerabilities(vulnerabilities), next_after=next_after)
+
+    with read_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT vulnerability_type, route_name FROM vulnerabilities")
+        vulnerabilities = cursor.fetchall()
+
+    return jsonify(_group_vulnerabilities(vulnerabilities))
 
 @app.route('/api/vulnerabilities/<path:path>', methods=['GET'])
+@cached_read('vulnerabilities')
 def get_vulnerability_details(path):
     """Fetch vulnerabilities for a specific API route from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT vulnerability_type FROM vulnerabilities WHERE route_name = %s", (path,))
-    vulnerabilities = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with read_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT vulnerability_type FROM vulnerabilities WHERE route_name = %s", (path,))
+        vulnerabilities = cursor.fetchall()
 
     route_vulnerabilities = {vuln['vulnerability_type']: path for vuln in vulnerabilities}
     return jsonify(route_vulnerabilities)
 
 
+DETAILS_MAX_BATCH = int(os.getenv("VULNERABILITY_DETAILS_MAX_BATCH", pagination.MAX_PAGE_SIZE))
+DETAILS_MAX_STREAM_BATCH = int(os.getenv("VULNERABILITY_DETAILS_MAX_STREAM_BATCH", 20000))
+DETAILS_CHUNK_SIZE = 500
+
+
+def _details_route_names(cursor, paths):
+    """Map each of ``paths`` to the ``route_name`` its findings are filed under.
+
+    Paths starting with ``/`` are ``api_routes`` paths and resolve through the
+    stored ``api_routes.route_name``; those not found or never named by a
+    scan or ``db-backfill-route-names`` map to ``None``. Anything else
+    already is a route name.
+    """
+    routes = [path for path in paths if path.startswith('/')]
+    names = {path: path for path in paths if not path.startswith('/')}
+    if routes:
+        placeholders = ', '.join(['%s'] * len(routes))
+        cursor.execute(f"SELECT path, route_name FROM api_routes WHERE path IN ({placeholders})", routes)
+        names.update(cursor.fetchall())
+    return names
+
+
+def _vulnerability_details(cursor, paths, data):
+    """Yield ``(path, {type: details})`` for ``paths``, one ``IN (...)`` query per chunk.
+
+    Paths without a route name yield ``None`` in place of the details.
+    """
+    for start in range(0, len(paths), DETAILS_CHUNK_SIZE):
+        chunk = paths[start:start + DETAILS_CHUNK_SIZE]
+        route_names = _details_route_names(cursor, chunk)
+        names = list(dict.fromkeys(name for name in route_names.values() if name))
+        found = {}
+        if names:
+            placeholders = ', '.join(['%s'] * len(names))
+            cursor.execute(
+                f"SELECT route_name, vulnerability_type FROM vulnerabilities WHERE route_name IN ({placeholders})",
+                names
+            )
+            for route_name, vulnerability_type in cursor.fetchall():
+                level, score = data.severity.get(vulnerability_type, (None, None))
+                found.setdefault(route_name, {})[vulnerability_type] = {
+                    'severity_level': level,
+                    'severity_score': score,
+                    'mitigations': list(data.mitigations.get(vulnerability_type, ())),
+                }
+        for path in chunk:
+            name = route_names.get(path)
+            yield path, found.get(name, {}) if name else None
+
+
+def _stream_vulnerability_details(paths, data):
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for path, vulnerabilities in _vulnerability_details(cursor, paths, data):
+                if vulnerabilities is None:
+                    yield app.json.dumps({'path': path, 'unmapped': True}) + '\n'
+                else:
+                    yield app.json.dumps({'path': path, 'vulnerabilities': vulnerabilities}) + '\n'
+        finally:
+            cursor.close()
+
+
+@app.route('/api/vulnerabilities/batch', methods=['POST'])
+def get_vulnerability_details_batch():
+    """Fetch vulnerability types, severities and mitigations for many routes at once.
+
+    The body is ``{"paths": [...]}`` holding route names (as in
+    ``/api/vulnerabilities/<path>``) or ``api_routes`` paths. The answer is
+    ``{"results": {path: {type: {severity_level, severity_score,
+    mitigations}}}, "unmapped": [...]}``, where ``unmapped`` lists the
+    ``api_routes`` paths that are unknown or have no stored route name. Up
+    to ``VULNERABILITY_DETAILS_MAX_BATCH`` paths are answered as one JSON
+    document; with ``format=ndjson`` larger batches stream back one line per
+    path as each chunk is read (``{"path": ..., "unmapped": true}`` for
+    unmapped ones).
+    """
+    payload = request.get_json(silent=True)
+    paths = payload.get('paths') if isinstance(payload, dict) else None
+    if not isinstance(paths, list) or not all(isinstance(path, str) and path for path in paths):
+        return jsonify({"msg": "body must be {\"paths\": [non-empty strings]}"}), 400
+    paths = list(dict.fromkeys(paths))
+    limit = DETAILS_MAX_STREAM_BATCH if wants_stream() else DETAILS_MAX_BATCH
+    if len(paths) > limit:
+        hint = "" if wants_stream() else "; use format=ndjson for larger batches"
+        return jsonify({"msg": f"at most {limit} paths per request{hint}"}), 413
+
+    data = reference.current()
+    if wants_stream():
+        return Response(_stream_vulnerability_details(paths, data), mimetype='application/x-ndjson')
+    results, unmapped = {}, []
+    with read_cursor() as cursor:
+        for path, vulnerabilities in _vulnerability_details(cursor, paths, data):
+            if vulnerabilities is None:
+                unmapped.append(path)
+            else:
+                results[path] = vulnerabilities
+    return jsonify({'results': results, 'unmapped': unmapped})
+
+
 @app.route('/api/total_apis', methods=['GET'])
+@cached_read('api_routes')
 def get_total_apis():
     """Fetch total number of APIs from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM api_routes")
-    total_apis = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
+    with read_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM api_routes")
+        total_apis = cursor.fetchone()[0]
     return jsonify(total_apis)
 
 @app.route('/api/total_vulnerabilities', methods=['GET'])
+@cached_read('vulnerabilities')
 def get_total_vulnerabilities():
     """Fetch total number of vulnerabilities from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM vulnerabilities")
-    total_vulnerabilities = cursor.fetchone()[0]
-    cursor.close()
-    conn.close()
+    with read_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM vulnerabilities")
+        total_vulnerabilities = cursor.fetchone()[0]
     return jsonify(total_vulnerabilities)
 
 @app.route('/api/vulnerabilities/severity', methods=['GET'])
+@cached_read('vulnerability_severity')
 def get_vulnerabilities_severity():
     """Fetch severity of vulnerabilities from the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT vulnerability_type, severity_score as count FROM vulnerability_severity
-    """)
-    severity_data = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    severity_map = {
-        'Critical': 4,
-        'High': 3,
-        'Medium': 2,
-        'Low': 1
-    }
-
-    severity = {}
-    for item in severity_data:
-        vulnerability = item['vulnerability_type']
-        count = item['count']
-        severity_level = severity_map.get(vulnerability, 1)
-        severity[vulnerability] = severity_level * count
+    data = _reference()
+    if data is not None:
+        return jsonify(data.severity_weights())
+
+    with read_cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT vulnerability_type, severity_score as count FROM vulnerability_severity
+        """)
+        severity_data = cursor.fetchall()
+
+    severity = dashboard.severity_weights(
+        (item['vulnerability_type'], item['count']) for item in severity_data
+    )
 
     return jsonify(severity)
 
+def _timeline_now_bucket(args):
+    """The bucket ``now`` falls in when a range request leaves ``end`` to default to now.
+
+    The range then slides with the clock, so a cached answer must not
+    outlive one bucket even while ``live_graph`` is unchanged.
+    """
+    if args.get('end') or not any(args.get(name) for name in ('start', 'window', 'buckets')):
+        return None
+    try:
+        start, end, buckets = timeseries.parse_range(args)
+    except ValueError:
+        return None
+    step = timeseries.bucket_step(start, end, buckets)
+    return int(end // step)
+
+
 @app.route('/api/vulnerabilities/timeline', methods=['GET'])
+@cached_read('live_graph', vary=_timeline_now_bucket)
 def get_vulnerabilities_timeline():
-    """Fetch the latest 15 entries of vulnerabilities from the live_graph table."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, vulnerabilities FROM live_graph ORDER BY id DESC LIMIT 15")
-    timeline_data = cursor.fetchall()
+    """Fetch the latest 15 entries of vulnerabilities from the live_graph table.
+
+    With ``start``/``end`` (epoch seconds or ISO 8601), ``window`` (``15m``,
+    ``24h``, ``30d``) or ``buckets``, return the count over that range
+    downsampled into at most ``buckets`` min/max/avg points instead. Range
+    queries read MySQL, which holds the timestamps and rollups.
+    """
+    if any(request.args.get(name) for name in ('start', 'end', 'window', 'buckets')):
+        try:
+            start, end, buckets = timeseries.parse_range(request.args)
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+        with db_cursor() as cursor:
+            step, points = timeseries.series(cursor, start, end, buckets)
+        return jsonify(start=start, end=end, step=step, points=points)
+
+    with read_cursor() as cursor:
+        cursor.execute("SELECT id, vulnerabilities FROM live_graph ORDER BY id DESC LIMIT 15")
+        timeline_data = cursor.fetchall()
     timeline_data.reverse()  
-    cursor.close()
-    conn.close()
     return jsonify(timeline_data)
 
 @app.route('/api/code_score', methods=['GET'])
+@cached_read('api_routes', 'vulnerabilities', 'vulnerability_severity')
 def get_code_score():
     """Fetch a calculated score of code quality from the database based on the severity and type of vulnerabilities."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
- 
-    cursor.execute("""
-        SELECT vs.severity_score, COUNT(*) AS count
-        FROM vulnerabilities v
-        JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
-        GROUP BY vs.severity_score
-    """)    
-    vulnerabilities = cursor.fetchall()
+    def severity_impact():
+        data = _reference()
+        with read_cursor() as cursor:
+            if data is not None:
+                cursor.execute("SELECT vulnerability_type, COUNT(*) FROM vulnerabilities GROUP BY vulnerability_type")
+                return data.impact_rows(cursor.fetchall())
+            cursor.execute("""
+                SELECT vs.severity_score, COUNT(*) AS count
+                FROM vulnerabilities v
+                JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+                GROUP BY vs.severity_score
+            """)
+            return cursor.fetchall()
 
- 
-    total_impact = sum(score * count for score, count in vulnerabilities)
+    def route_count():
+        with read_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM api_routes")
+            return cursor.fetchone()[0]
 
-  
-    cursor.execute("SELECT COUNT(*) FROM api_routes")
-    total_apis = cursor.fetchone()[0]
+    # Only trust the index when it has caught up with exactly the versions this
+    # response is cached under; otherwise it could pin a stale score.
+    if risk_index.ready:
+        data = _reference()
+        vulnerabilities_version, routes_version = data_versions.current(('vulnerabilities', 'api_routes'))
+        if risk_index.matches(vulnerabilities_version, routes_version, weights=data.weights() if data else None):
+            return jsonify(dashboard.code_score(risk_index.impact_rows(), risk_index.total_routes))
 
-   
-    base_score = 100
-    score_per_api = 10
-    raw_score = score_per_api * total_apis - total_impact
-    code_score = max(0, raw_score)
+    vulnerabilities, total_apis = fan_out(severity_impact, route_count)
 
-    cursor.close()
-    conn.close()
+    code_score = dashboard.code_score(vulnerabilities, total_apis)
 
-    # return jsonify(formatted_score)
+    return jsonify(code_score)
 
-    
-    if total_apis > 0:
-        normalized_impact = (total_impact / total_apis) * 10
+
+def _score_bound(name):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+@app.route('/api/risk/routes', methods=['GET'])
+def get_route_risk():
+    """Rank routes by the summed severity of their findings, riskiest first.
+
+    ``limit`` (default 10, at most 1000) caps the result; ``min_score`` and
+    ``max_score`` keep only routes scoring within that inclusive range.
+    Served from the in-memory risk index once it is warm.
+    """
+    try:
+        limit = int(request.args.get('limit', 10))
+        min_score, max_score = _score_bound('min_score'), _score_bound('max_score')
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    if not 1 <= limit <= 1000:
+        return jsonify({"msg": "limit must be between 1 and 1000"}), 400
+
+    if risk_index.ready:
+        rows = risk_index.top(limit, min_score=min_score, max_score=max_score)
     else:
-        normalized_impact = 0
+        having, params = [], []
+        if min_score is not None:
+            having.append("score >= %s")
+            params.append(min_score)
+        if max_score is not None:
+            having.append("score <= %s")
+            params.append(max_score)
+        with read_cursor() as cursor:
+            cursor.execute(f"""
+                SELECT v.route_name, SUM(COALESCE(vs.severity_score, 0)) AS score, COUNT(*) AS findings
+                FROM vulnerabilities v
+                LEFT JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+                GROUP BY v.route_name
+                {"HAVING " + " AND ".join(having) if having else ""}
+                ORDER BY score DESC, v.route_name
+                LIMIT %s
+            """, params + [limit])
+            rows = cursor.fetchall()
 
-    
-    base_score = 100
-    code_score = max(0, base_score - normalized_impact)
+    return jsonify([
+        {'route': route, 'score': int(score), 'findings': int(findings)}
+        for route, score, findings in rows
+    ])
 
-   
-    code_score = f"{code_score:.2f}"
 
-    return jsonify(code_score)
+@app.route('/api/mitigations', methods=['GET'])
+@cached_read('VulnerabilityMitigations')
+def get_mitigations():
+    """Return the recommended mitigations for each vulnerability type.
 
+    Repeat ``type`` to ask for specific vulnerability types only. Served
+    from the preloaded reference tables.
+    """
+    mitigations = reference.current().mitigations
+    wanted = request.args.getlist('type')
+    if wanted:
+        return jsonify({t: list(mitigations[t]) for t in wanted if t in mitigations})
+    return jsonify({t: list(recommendations) for t, recommendations in mitigations.items()})
 
-def insert_vulnerability_count():
-    """Periodically check and update the total number of vulnerabilities in the live_graph table only if the count has changed."""
-    last_vulnerability_count = None 
 
-    while True:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        
-        cursor.execute("SELECT COUNT(*) FROM vulnerabilities")
-        current_vulnerability_count = cursor.fetchone()[0]
-        print(f"Current vulnerability count: {current_vulnerability_count}")
-
-       
-        if last_vulnerability_count is None or current_vulnerability_count != last_vulnerability_count:
-            print(f"Updating live graph: New count is {current_vulnerability_count}")
-            
-            
-            cursor.execute("INSERT INTO live_graph (vulnerabilities) VALUES (%s)", (current_vulnerability_count,))
-            conn.commit()
-            
-        
-            last_vulnerability_count = current_vulnerability_count
-        else:
-            print("No change in vulnerability count; not updating live graph.")
-
-        cursor.close()
-        conn.close()
+@app.route('/api/reference_data', methods=['GET'])
+def get_reference_data_stats():
+    """Report the version and reload history of the preloaded severity and mitigation tables."""
+    return jsonify(reference.stats())
+
+
+@app.route('/api/risk', methods=['GET'])
+def get_risk_index_stats():
+    """Report whether the route risk index is warm and how much it holds."""
+    return jsonify(risk_index.stats())
+
+
+@app.route('/api/db/pool', methods=['GET'])
+def get_pool_stats():
+    """Report occupancy and checkout-wait statistics for this worker's connection pool."""
+    return jsonify(get_pool().stats())
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose request, query, pool and cache metrics in the Prometheus text format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/storage', methods=['GET'])
+def get_storage_stats():
+    """Report the active storage engine and the age and size of the SQLite snapshot."""
+    return jsonify(engine=app.config['STORAGE_ENGINE'], snapshot=snapshot.stats())
 
-       
-        time.sleep(5)
 
 @app.route('/api/donought_chart', methods=['GET'])
+@cached_read('vulnerabilities', 'vulnerability_severity')
 def get_donought_chart():
     """Fetch counts of APIs affected by different severity levels of vulnerabilities."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-   
-    cursor.execute("""
-        SELECT vs.severity_level, vs.severity_score, COUNT(v.route_name) AS count
-        FROM vulnerabilities v
-        JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
-        GROUP BY vs.severity_level, vs.severity_score
-        ORDER BY vs.severity_score;
-
-        # SELECT vs.severity_level, COUNT(v.route_name) AS count
-        # FROM vulnerabilities v
-        # JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
-        # GROUP BY vs.severity_level ORDER BY vs.severity_score
-    """)
-    data = cursor.fetchall()
-    print(data)
-    cursor.close()
-    conn.close()
+    data = _reference()
+    if data is not None:
+        with read_cursor() as cursor:
+            cursor.execute("SELECT vulnerability_type, COUNT(*) FROM vulnerabilities GROUP BY vulnerability_type")
+            return jsonify(data.level_counts(cursor.fetchall()))
 
-    
-    severity_counts = {item['severity_level']: item['count'] for item in data}
+    with read_cursor(dictionary=True) as cursor:
+        cursor.execute("""
+            SELECT vs.severity_level, vs.severity_score, COUNT(v.route_name) AS count
+            FROM vulnerabilities v
+            JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+            GROUP BY vs.severity_level, vs.severity_score
+            ORDER BY vs.severity_score
+        """)
+        data = cursor.fetchall()
+
+    severity_counts = dashboard.severity_counts(
+        (item['severity_level'], item['count']) for item in data
+    )
     return jsonify(severity_counts)
 
 
+@app.route('/api/dashboard', methods=['GET'])
+@cached_read('api_routes', 'vulnerabilities', 'vulnerability_severity', 'live_graph')
+def get_dashboard():
+    """Fetch every dashboard widget, or the comma-separated ``sections`` asked for, from one snapshot."""
+    try:
+        sections = dashboard.parse_sections(request.args.get('sections'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    with read_connection() as conn:
+        data = dashboard.load_dashboard(conn, sections, reference=_reference())
+    return jsonify(data)
+
+
+LIVE_STATS = ('total_apis', 'total_vulnerabilities', 'code_score')
+LIVE_CHARTS = ('severity', 'donought_chart')
+LIVE_TABLES = ('api_routes', 'vulnerabilities', 'vulnerability_severity', 'live_graph')
+
+
+def _load_live_state():
+    """Load the headline stats and the chart data pushed to stream subscribers."""
+    with read_connection() as conn:
+        data = dashboard.load_dashboard(conn, LIVE_STATS + LIVE_CHARTS + ('timeline',), reference=_reference())
+    state = {'stats': {section: data[section] for section in LIVE_STATS}}
+    state.update((section, data[section]) for section in LIVE_CHARTS)
+    state['timeline'] = [list(point) for point in data['timeline']]
+    return state
+
+
+live_feed = LiveFeed(
+    version=lambda: data_versions.current(LIVE_TABLES),
+    load=_load_live_state,
+    interval=float(os.getenv("LIVE_FEED_INTERVAL", 2)),
+)
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """Push ``stats``, ``severity``, ``donought_chart`` and ``timeline`` events whenever they change (SSE)."""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription = live_feed.subscribe(last_event_id)
+    heartbeat = float(os.getenv("LIVE_FEED_HEARTBEAT", 15))
+    response = Response(
+        subscription.stream(heartbeat),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    response.call_on_close(subscription.close)
+    return response
+
+
+
+def _live_graph_has_timestamps():
+    with db_cursor() as cursor:
+        return migrations.column_exists(cursor, 'live_graph', 'created_at')
+
+
+compactor = timeseries.Compactor(
+    db_connection,
+    interval=float(os.getenv("LIVE_GRAPH_COMPACTION_INTERVAL", 3600)),
+)
+
+
+change_detector = ChangeDetector(
+    db_connection,
+    min_interval=float(os.getenv("CHANGE_DETECTOR_MIN_INTERVAL", 1)),
+    max_interval=float(os.getenv("CHANGE_DETECTOR_MAX_INTERVAL", 30)),
+    batch_size=int(os.getenv("CHANGE_DETECTOR_BATCH_SIZE", 20)),
+    max_delay=float(os.getenv("CHANGE_DETECTOR_MAX_DELAY", 5)),
+    # One writer across processes and hosts; the others only probe.
+    lock_name='live_graph_writer',
+)
+
+
+def _on_data_changed(*args):
+    """Drop the cached data versions and wake stream subscribers right away."""
+    data_versions.invalidate()
+    live_feed.wake()
+
+
+risk_index = RiskIndex()
+
+
+def sync_risk_index(expected_count=None):
+    data = _reference()
+    with db_connection() as conn:
+        return risk_index.sync(conn, expected_count, weights=data.weights() if data else None)
+
+
+def _on_reference_data_changed(data):
+    risk_index.set_weights(data.weights())
+    _on_data_changed()
+
+
+def _on_vulnerabilities_changed(count):
+    try:
+        sync_risk_index(count)
+    except mysql.connector.Error:
+        app.logger.exception("route risk index sync failed")
+    if app.config['STORAGE_ENGINE'] == 'sqlite':
+        snapshot.request_refresh()
+    _on_data_changed()
+
+
+def _on_snapshot_refreshed(*args):
+    # Upserts can change a route's methods or name without moving its (count, max id)
+    # version, so results cached under the old version token would stay current.
+    route_index.invalidate()
+    result_cache.clear()
+    _on_data_changed()
+
+
+change_detector.add_listener(_on_vulnerabilities_changed)
+snapshot.add_listener(_on_snapshot_refreshed)
+reference.add_listener(_on_reference_data_changed)
+
+
+@app.route('/api/change_detector', methods=['GET'])
+def get_change_detector_stats():
+    """Report watermark, poll interval, probe latency and change rate of the live_graph recorder."""
+    return jsonify(change_detector.stats())
+
+
+def _ingest(payload, batch_size):
+    routes, findings = ingest.parse_scan(payload)
+    route_names = ingest.parse_route_names(payload)
+    with db_connection() as conn:
+        report = ingest.ingest_scan(conn, routes, findings, batch_size=batch_size, route_names=route_names)
+        if route_index.ready and app.config['STORAGE_ENGINE'] == 'mysql':
+            route_index.update(conn, routes)
+    if risk_index.ready:
+        sync_risk_index()
+    if app.config['STORAGE_ENGINE'] == 'sqlite':
+        snapshot.request_refresh()
+    # An upsert that only changes methods or names leaves every version token as it was.
+    result_cache.clear()
+    data_versions.invalidate()
+    return report
+
+
+@app.route('/api/scans', methods=['POST'])
+@jwt_required()
+def post_scan():
+    """Load a scanner run's routes and findings in one transaction and report batch timings."""
+    try:
+        batch_size = int(request.args.get('batch_size', ingest.DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({"msg": "batch_size must be an integer"}), 400
+    if batch_size < 1:
+        return jsonify({"msg": "batch_size must be a positive integer"}), 400
+
+    try:
+        report = _ingest(request.get_json(silent=True), batch_size)
+    except ingest.ScanError as e:
+        return jsonify({"msg": str(e)}), 400
+    return jsonify(report), 201
+
+
+@app.cli.command('ingest-scan')
+@click.argument('scan_file', type=click.File('r'))
+@click.option('--batch-size', type=int, default=ingest.DEFAULT_BATCH_SIZE)
+def ingest_scan_command(scan_file, batch_size):
+    """Load a scan result JSON file (use - for stdin)."""
+    try:
+        report = _ingest(json.load(scan_file), batch_size)
+    except (ingest.ScanError, json.JSONDecodeError) as e:
+        raise click.ClickException(str(e))
+    for batch in report['batches']:
+        click.echo(f"{batch['table']:<16} {batch['rows']:>6} rows  {batch['seconds']:.3f}s")
+    click.echo(
+        f"{report['routes']['written']} routes, {report['findings']['inserted']} new findings "
+        f"({report['findings']['duplicates']} duplicates) in {report['seconds']:.3f}s"
+    )
+
+
+@app.cli.command('db-upgrade')
+@click.option('--target', type=int, default=None, help="Stop after this schema version.")
+def db_upgrade(target):
+    """Apply pending schema migrations."""
+    with db_connection() as conn:
+        if not migrations.upgrade(conn, target=target, log=click.echo):
+            click.echo("schema is up to date")
+
+
+@app.cli.command('db-status')
+def db_status():
+    """List schema migrations and whether each has been applied."""
+    with db_connection() as conn:
+        done = migrations.applied_versions(conn)
+    for m in migrations.MIGRATIONS:
+        click.echo(f"{m.version:04d} {'applied' if m.version in done else 'pending'}  {m.name}")
+
+
+@app.cli.command('db-backfill-methods')
+@click.option('--batch-size', type=int, default=1000)
+def db_backfill_methods(batch_size):
+    """Re-sync api_route_methods from api_routes.methods."""
+    with db_connection() as conn:
+        scanned = migrations.backfill_route_methods(conn, batch_size=batch_size)
+    click.echo(f"scanned {scanned} routes")
+
+
+@app.cli.command('db-backfill-route-names')
+@click.option('--batch-size', type=int, default=1000)
+def db_backfill_route_names(batch_size):
+    """Name unnamed api_routes after the vulnerabilities.route_name their path matches."""
+    with db_connection() as conn:
+        named, scanned = migrations.backfill_route_names(conn, batch_size=batch_size)
+    click.echo(f"named {named} of {scanned} unnamed routes")
+
+
+@app.cli.command('live-graph-compact')
+def live_graph_compact():
+    """Roll expired live_graph points into coarser rollup buckets."""
+    report = compactor.run_once()
+    if report is None:
+        raise click.ClickException("another worker is compacting live_graph")
+    for tier, removed in report.items():
+        click.echo(f"{tier:<12} {removed:>8} rows rolled up")
+
+
+@app.cli.command('snapshot-refresh')
+def snapshot_refresh():
+    """Copy the MySQL tables into the local SQLite snapshot once."""
+    report = snapshot.refresh()
+    for table, rows in report['rows'].items():
+        click.echo(f"{table:<26} {rows:>8} rows")
+    click.echo(f"wrote {snapshot.path} in {report['seconds']:.3f}s")
+
+
+def _warm_risk_index():
+    try:
+        sync_risk_index()
+    except mysql.connector.Error:
+        app.logger.exception("could not build the route risk index; serving risk from SQL")
+
+
+def start_background_jobs():
+    """Start the live_graph recorder, compactor and snapshot refresher; flush on interpreter exit."""
+    reference.start()
+    atexit.register(reference.stop)
+    threading.Thread(target=_warm_risk_index, name='risk-index-warmup', daemon=True).start()
+    try:
+        change_detector.timestamps = _live_graph_has_timestamps()
+    except mysql.connector.Error:
+        app.logger.exception("could not inspect live_graph; recording points without timestamps")
+    change_detector.start()
+    atexit.register(change_detector.stop)
+    if change_detector.timestamps:
+        compactor.start()
+        atexit.register(compactor.stop)
+    if app.config['STORAGE_ENGINE'] == 'sqlite':
+        snapshot.start()
+        atexit.register(snapshot.stop)
+
 
 if __name__ == '__main__':
-    
-    # threading.Thread(target=insert_vulnerability_count, daemon=True).start()
-    threading.Thread(daemon=True).start()
+    debug = True
+
+    # app.debug is only set inside app.run, so decide here: with the reloader
+    # (on whenever debug is) the parent process just watches files and only
+    # the serving child, marked by WERKZEUG_RUN_MAIN, runs the jobs.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs()
 
-    app.run(debug=True, host='0.0.0.0', port=5001)  
+    app.run(debug=debug, host='0.0.0.0', port=5001)  
@@ -0,0 +1,214 @@
+"""Asyncio serving mode for the API.
+
+Run with any ASGI server, for example ``uvicorn asgi:application``.
+
+Connections live on the event loop, so the number of open clients is no
+longer tied to the thread count. ``/api/stream`` is served natively: an
+idle dashboard costs a coroutine, not a thread. Result-cache hits are
+answered on the loop as well: ``app.attach_cached_entry`` finds the entry
+without any I/O and the Flask app then runs inline, so a hit never waits
+for a worker. A hit whose negotiated encoding has not been compressed yet
+goes to the executor once, like a miss.
+
+Everything else still needs a thread. The views use the blocking MySQL
+driver, so a cache miss or an uncached view runs on a bounded executor of
+``ASGI_WORKERS`` threads and holds one while its queries run. Responses
+(caching, ETags, auth, CORS, errors) are identical to the WSGI app in both
+cases. Independent queries inside a view still fan out concurrently through
+``app.fan_out``. Streamed bodies such as NDJSON are pulled from the view
+chunk by chunk through the executor and forwarded as they arrive.
+
+Every worker process runs the lifespan startup, so every worker starts the
+background jobs. The ones that write (the change detector's live_graph
+points, compaction) elect a single writer through a MySQL named lock. At
+shutdown they are stopped and joined on a thread, not on the loop.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+import asyncio
+import io
+import os
+import sys
+
+import app as app_module
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ASGI_WORKERS", 16)),
+    thread_name_prefix='asgi',
+)
+
+_DONE = object()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _start_wsgi(environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    iterable = app_module.app.wsgi_app(environ, start_response)
+    iterator = iter(iterable)
+    # Generator views may only call start_response once the first chunk is produced.
+    first = next(iterator, _DONE) if 'status' not in started else None
+    return started, iterable, iterator, first
+
+
+async def dispatch_to_flask(scope, receive, send):
+    """Run the Flask view for this request and forward its response.
+
+    Cache hits run inline on the loop; everything else runs on the executor.
+    """
+    loop = asyncio.get_running_loop()
+    body = await _read_body(receive)
+    if body is None:
+        return
+
+    environ = build_environ(scope, body)
+    if app_module.attach_cached_entry(environ):
+        await _forward(send, *_start_wsgi(environ), pull=_run_inline)
+        return
+    started, iterable, iterator, first = await loop.run_in_executor(executor, _start_wsgi, environ)
+    await _forward(send, started, iterable, iterator, first, pull=loop.run_in_executor)
+
+
+async def _run_inline(_executor, func, *args):
+    return func(*args)
+
+
+async def _forward(send, started, iterable, iterator, first, pull):
+    """Send a started WSGI response; ``pull(executor, func, *args)`` runs each blocking step."""
+    try:
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        if first is not None and first is not _DONE:
+            await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+        if first is not _DONE:
+            while True:
+                chunk = await pull(executor, next, iterator, _DONE)
+                if chunk is _DONE:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            await pull(executor, close)
+
+
+async def stream_updates(scope, receive, send):
+    """Serve ``/api/stream`` on the event loop; subscribers hold no thread while idle."""
+    loop = asyncio.get_running_loop()
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    last_event_id = headers.get('last-event-id') or (query.get('last_event_id') or [None])[0]
+
+    subscription = await loop.run_in_executor(executor, app_module.live_feed.subscribe, last_event_id)
+    heartbeat = float(os.getenv("LIVE_FEED_HEARTBEAT", 15))
+
+    async def pump():
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+        async for frame in subscription.astream(heartbeat):
+            await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(wait_for_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
+
+
+def stop_background_jobs():
+    app_module.change_detector.stop()
+    app_module.compactor.stop(timeout=1)
+    app_module.snapshot.stop(timeout=1)
+    app_module.reference.stop(timeout=1)
+    app_module.live_feed.stop(timeout=1)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            app_module.start_background_jobs()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # The stops join their threads; wait for them off the event loop so
+            # streams and in-flight requests keep being served meanwhile.
+            await asyncio.get_running_loop().run_in_executor(None, stop_background_jobs)
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point."""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http':
+        if scope['path'] == '/api/stream' and scope['method'] == 'GET':
+            await stream_updates(scope, receive, send)
+        else:
+            await dispatch_to_flask(scope, receive, send)
@@ -0,0 +1,115 @@
+"""Login throttling and bounded password verification."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import threading
+import time
+
+import bcrypt
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets holding at most ``capacity`` tokens.
+
+    Each key regains ``refill_rate`` tokens per second. Only the
+    ``max_keys`` most recently seen keys are tracked so a spray of
+    distinct usernames or addresses cannot grow memory without bound.
+    """
+
+    def __init__(self, capacity, refill_rate, max_keys=10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def allow(self, key):
+        """Take one token for ``key``.
+
+        Returns ``(allowed, retry_after)`` where ``retry_after`` is the number
+        of seconds until a token is available again when the call was refused.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / self.refill_rate
+        return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class VerifierBusy(Exception):
+    """Raised when the verification queue is full or a check took too long."""
+
+
+class CredentialVerifier:
+    """Run ``bcrypt.checkpw`` on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so worker threads give real
+    parallelism while ``max_workers`` caps the CPU a login burst can take.
+    At most ``max_queue`` further checks may wait; beyond that callers get
+    ``VerifierBusy`` immediately instead of piling up behind the burst.
+
+    The pool bounds hashing, not request handling: ``verify`` still blocks
+    the calling request thread until its check finishes or ``timeout``
+    passes.
+    """
+
+    def __init__(self, max_workers=2, max_queue=16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._rejected = 0
+
+    def verify(self, password, hashed, timeout=None):
+        """Return whether ``password`` matches the bcrypt ``hashed`` value.
+
+        Blocks the caller until the check is done. Raises ``VerifierBusy``
+        when no slot is free or the result is not ready after ``timeout``
+        seconds.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise VerifierBusy("too many password checks in flight")
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+        except Exception:
+            self._done(None)
+            raise
+        # Free the slot when the hash finishes, even if the caller gave up waiting.
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise VerifierBusy("password check timed out")
+
+    def _done(self, future):
+        with self._lock:
+            self._queued -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._queued,
+                'rejected': self._rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
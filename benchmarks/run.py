@@ -0,0 +1,286 @@
+"""Drive the read endpoints under concurrency and record latency, throughput and RSS.
+
+By default the app runs in-process against a SQLite database seeded by
+``synthetic.py``, through the snapshot storage engine:
+
+    python benchmarks/run.py --routes 10000 --findings 1000000 --concurrency 16
+
+Use ``--base-url`` to benchmark a running server instead (add ``--server-pid``
+to sample its RSS). Every run writes a JSON report to ``benchmarks/results``;
+pass ``--compare`` with an earlier report to print the change per endpoint.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import storage
+import synthetic
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+ENDPOINTS = (
+    '/api/routes',
+    '/api/vulnerabilities',
+    '/api/vulnerabilities/{route}',
+    '/api/total_apis',
+    '/api/total_vulnerabilities',
+    '/api/vulnerabilities/severity',
+    '/api/vulnerabilities/timeline',
+    '/api/code_score',
+    '/api/donought_chart',
+    '/api/dashboard',
+)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def rss_bytes(pid=None):
+    """Current resident set size of ``pid`` (this process by default)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        if pid is not None:
+            return None
+        # ru_maxrss is kilobytes on Linux and bytes on macOS; it is a lifetime peak.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RssSampler:
+    """Sample RSS in the background and keep the peak."""
+
+    def __init__(self, pid=None, interval=0.01):
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_bytes(pid) or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes(self.pid) or 0)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes(self.pid) or 0)
+
+
+def in_process_client(db_path, cache):
+    """Return a ``get(path) -> status`` callable running the app against ``db_path``."""
+    import app as app_module
+
+    app_module.app.config['TESTING'] = True
+    app_module.app.config['STORAGE_ENGINE'] = 'sqlite'
+    app_module.app.config['RESULT_CACHE_ENABLED'] = cache
+    app_module.snapshot = storage.SnapshotEngine(None, path=db_path, reuse=True)
+    local = threading.local()
+
+    def get(path):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app_module.app.test_client()
+        response = client.get(path)
+        response.get_data()
+        response.close()
+        return response.status_code
+    return get
+
+
+def http_client(base_url):
+    """Return a ``get(path) -> status`` callable hitting a running server."""
+    import requests
+
+    local = threading.local()
+
+    def get(path):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.get(base_url.rstrip('/') + path)
+        response.content
+        return response.status_code
+    return get
+
+
+def bench_endpoint(get, path, requests_count, concurrency, warmup=5, pid=None):
+    """Issue ``requests_count`` GETs to ``path`` from ``concurrency`` threads."""
+    for _ in range(warmup):
+        get(path)
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    tickets = itertools.count()
+
+    def worker():
+        mine = []
+        codes = {}
+        while next(tickets) < requests_count:
+            started = time.perf_counter()
+            try:
+                status = get(path)
+            except Exception as e:
+                status = type(e).__name__
+            mine.append(time.perf_counter() - started)
+            codes[status] = codes.get(status, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for status, n in codes.items():
+                statuses[status] = statuses.get(status, 0) + n
+
+    with RssSampler(pid) as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else None,
+        'statuses': {str(status): n for status, n in statuses.items()},
+        'errors': sum(n for status, n in statuses.items() if status != 200),
+        'latency_ms': {
+            'p50': percentile(ms, 50),
+            'p95': percentile(ms, 95),
+            'p99': percentile(ms, 99),
+            'mean': sum(ms) / len(ms) if ms else None,
+            'max': ms[-1] if ms else None,
+        },
+        'peak_rss_mb': rss.peak / (1024 * 1024),
+    }
+
+
+def hottest_route(db_path):
+    with storage.connect_sqlite(db_path, readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT route_name FROM vulnerabilities GROUP BY route_name ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+    return row[0] if row else 'login'
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print p95 latency and throughput changes against ``baseline``."""
+    print(f"\n{'endpoint':<34} {'p95 ms':>10} {'change':>8} {'req/s':>10} {'change':>8}")
+    for path, result in report['results'].items():
+        before = baseline['results'].get(path)
+        p95, rps = result['latency_ms']['p95'], result['throughput']
+        if before is None:
+            print(f"{path:<34} {p95:>10.2f} {'new':>8} {rps:>10.1f} {'new':>8}")
+            continue
+        p95_change = (p95 / before['latency_ms']['p95'] - 1) * 100 if before['latency_ms']['p95'] else 0
+        rps_change = (rps / before['throughput'] - 1) * 100 if before['throughput'] else 0
+        print(f"{path:<34} {p95:>10.2f} {p95_change:>+7.1f}% {rps:>10.1f} {rps_change:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--routes', type=int, default=10000)
+    parser.add_argument('--findings', type=int, default=1000000)
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="seeded SQLite file; generated if missing (default: a temp file)")
+    parser.add_argument('--base-url', help="benchmark a running server instead of the in-process app")
+    parser.add_argument('--server-pid', type=int, help="pid whose RSS to sample with --base-url")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint")
+    parser.add_argument('--endpoints', help="comma-separated subset of endpoints to run")
+    parser.add_argument('--cache', action='store_true', help="leave the result cache on")
+    parser.add_argument('--output', help="report path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', type=argparse.FileType('r'), help="earlier report to diff against")
+    args = parser.parse_args(argv)
+
+    pid = args.server_pid
+    route = 'login'
+    if args.base_url:
+        get = http_client(args.base_url)
+    else:
+        db_path = args.db or os.path.join(
+            tempfile.gettempdir(), f"deploy-api-bench-{args.routes}-{args.findings}-{args.seed}.db"
+        )
+        if not os.path.exists(db_path):
+            print(f"seeding {db_path} ...", flush=True)
+            synthetic.seed_sqlite(db_path, routes=args.routes, findings=args.findings,
+                                  points=args.points, seed=args.seed)
+        route = hottest_route(db_path)
+        get = in_process_client(db_path, args.cache)
+
+    endpoints = args.endpoints.split(',') if args.endpoints else ENDPOINTS
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'target': args.base_url or 'in-process',
+            'routes': args.routes,
+            'findings': args.findings,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'cache': args.cache,
+        },
+        'results': {},
+    }
+
+    print(f"{'endpoint':<34} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>9} {'rss MB':>8} {'errors':>6}")
+    for endpoint in endpoints:
+        result = bench_endpoint(get, endpoint.format(route=route), args.requests, args.concurrency, pid=pid)
+        report['results'][endpoint] = result
+        latency = result['latency_ms']
+        print(f"{endpoint:<34} {latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} "
+              f"{result['throughput']:>9.1f} {result['peak_rss_mb']:>8.1f} {result['errors']:>6}", flush=True)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['commit'] or 'unknown'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        compare(report, json.load(args.compare))
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Seed a database with synthetic data shaped like api.sql.
+
+Severity levels and scores are the real rows from api.sql. Routes, findings
+and live_graph points are generated, with skewed finding counts so a few
+routes carry most of the vulnerabilities, like real scans. Findings are drawn
+with replacement, so at the default scale (10k routes, 1M findings) the same
+(route, type) pair shows up many times. That volume only fits a table
+without the unique key from migration 3, which is why the generator targets
+a local SQLite file by default:
+
+    python benchmarks/synthetic.py --routes 10000 --findings 1000000 bench.db
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import storage
+
+API_SQL = os.path.join(os.path.dirname(__file__), '..', 'api.sql')
+RESOURCES = ('users', 'orders', 'products', 'payments', 'reports', 'admin', 'search', 'files')
+METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'GET, POST')
+
+
+def load_severities(path=API_SQL):
+    """Return the ``(vulnerability_type, severity_level, severity_score)`` rows from the dump."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith("INSERT INTO `vulnerability_severity`"):
+                return [(t, level, int(score)) for _, t, level, score in
+                        re.findall(r"\((\d+),'([^']*)','([^']*)',(\d+)\)", line)]
+    raise ValueError(f"no vulnerability_severity rows in {path}")
+
+
+def route_paths(count, rng):
+    """Yield ``count`` distinct API paths."""
+    for n in range(count):
+        resource = rng.choice(RESOURCES)
+        suffix = rng.choice(('', '/<int:id>', '/search', '/export'))
+        yield f"/api/v{n % 3 + 1}/{resource}{n}{suffix}"
+
+
+def route_name(path):
+    """The name the synthetic scanner files ``path``'s findings under."""
+    return path.strip('/').split('/<', 1)[0].replace('/', '_').replace('-', '_')
+
+
+def _insert(conn, table, columns, rows, batch_size):
+    query = f"INSERT INTO `{table}` ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(query, rows[start:start + batch_size])
+    finally:
+        cursor.close()
+
+
+def generate(conn, routes=10000, findings=1000000, points=1000, seed=0, batch_size=10000):
+    """Fill an empty schema on ``conn`` and return the number of rows per table."""
+    rng = random.Random(seed)
+    severities = load_severities()
+    types = [t for t, _, _ in severities]
+
+    paths = list(route_paths(routes, rng))
+    names = [route_name(path) for path in paths]
+    methods = [rng.choice(METHODS) for _ in paths]
+    # Pareto weights: a handful of hot routes collect most findings.
+    weights = [rng.paretovariate(1.2) for _ in names]
+    picked_routes = rng.choices(names, weights=weights, k=findings)
+    picked_types = rng.choices(types, k=findings)
+
+    total = 0
+    timeline = []
+    for _ in range(points):
+        total += rng.randint(0, max(1, findings // max(1, points)))
+        timeline.append(total)
+
+    data = {
+        'api_routes': (
+            ('id', 'path', 'methods', 'route_name'),
+            [(i, path, method, name) for i, (path, method, name) in enumerate(zip(paths, methods, names), 1)],
+        ),
+        'api_route_methods': (
+            ('route_id', 'method'),
+            [(i, method) for i, joined in enumerate(methods, 1) for method in joined.split(', ')],
+        ),
+        'vulnerabilities': (('vulnerability_type', 'route_name'), list(zip(picked_types, picked_routes))),
+        'vulnerability_severity': (('vulnerability_type', 'severity_level', 'severity_score'), severities),
+        'VulnerabilityMitigations': (
+            ('vulnerability_type', 'recommendations'),
+            [(t, f"Review {t} controls and add regression tests.") for t in types],
+        ),
+        'live_graph': (('vulnerabilities',), [(value,) for value in timeline]),
+    }
+    conn.start_transaction()
+    try:
+        for table, (columns, rows) in data.items():
+            _insert(conn, table, columns, rows, batch_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {table: len(rows) for table, (_, rows) in data.items()}
+
+
+def seed_sqlite(path, **kwargs):
+    """Create ``path`` as a fresh SQLite database and fill it with ``generate``."""
+    if os.path.exists(path):
+        os.unlink(path)
+    conn = storage.connect_sqlite(path)
+    try:
+        storage.create_schema(conn)
+        return generate(conn, **kwargs)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path', help="SQLite file to (re)create")
+    parser.add_argument('--routes', type=int, default=10000)
+    parser.add_argument('--findings', type=int, default=1000000)
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = seed_sqlite(args.path, routes=args.routes, findings=args.findings,
+                         points=args.points, seed=args.seed)
+    for table, rows in counts.items():
+        print(f"{table:<26} {rows:>8} rows")
+    print(f"wrote {args.path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
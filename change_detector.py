@@ -0,0 +1,282 @@
+"""Background job that records the vulnerability count into live_graph.
+
+Instead of running ``COUNT(*)`` over the whole table every few seconds it
+tracks a high-water mark on ``vulnerabilities.id``. A tick normally costs a
+single primary-key lookup; rows are only counted when the mark moved, and
+then only the rows above it. A periodic full reconciliation catches
+deletions, which do not move the mark.
+
+When several processes run a detector (reloader children, ASGI workers,
+several hosts), pass ``lock_name``: only the process holding that MySQL
+named lock writes points, the others keep probing so their listeners
+still fire. The lock lives on a connection the detector keeps checked out,
+so it is released as soon as the writer exits or loses its session.
+"""
+from collections import deque
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeDetector:
+    """Watch ``vulnerabilities`` and append a live_graph point when the count changes.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB-API connection. The poll interval starts at
+    ``min_interval``, grows by ``backoff`` on every idle tick up to
+    ``max_interval``, snaps back after a change, and is spread by
+    ``jitter`` so several workers do not probe in lockstep. Points are
+    written in batches of up to ``batch_size`` or after ``max_delay``
+    seconds, whichever comes first.
+    """
+
+    def __init__(self, connection, min_interval=1.0, max_interval=30.0, backoff=2.0,
+                 jitter=0.1, batch_size=20, max_delay=5.0, reconcile_every=20, timestamps=False,
+                 lock_name=None):
+        self._connection = connection
+        self.lock_name = lock_name
+        self.writer = lock_name is None
+        self._lock_session = None
+        self._lock_conn = None
+        # Write the observation time into live_graph.created_at (schema version 4).
+        self.timestamps = timestamps
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.reconcile_every = reconcile_every
+
+        self.interval = min_interval
+        self.watermark = None
+        self.count = None
+        self._ticks = 0
+        self._pending = []
+        self._pending_since = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._probe_latency_total = 0.0
+        self._probe_latency_max = 0.0
+        self._last_probe_latency = 0.0
+        self._recent_changes = deque()
+        self._counters = {
+            'probes': 0,
+            'changes': 0,
+            'reconciliations': 0,
+            'points_written': 0,
+            'flushes': 0,
+            'errors': 0,
+        }
+
+    def add_listener(self, callback):
+        """Call ``callback(count)`` after every tick that saw a change or wrote points."""
+        self._listeners.append(callback)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='change-detector', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop polling, write any buffered points and wait for the thread to exit."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _claim_writer(self):
+        """Take (or confirm) the writer lock on the held connection. Returns True while we hold it."""
+        if self.lock_name is None:
+            return True
+        try:
+            if self._lock_conn is None:
+                self._lock_session = self._connection()
+                self._lock_conn = self._lock_session.__enter__()
+            cursor = self._lock_conn.cursor()
+            try:
+                cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (self.lock_name,))
+                held = cursor.fetchone()[0]
+                if not held:
+                    cursor.execute("SELECT GET_LOCK(%s, 0)", (self.lock_name,))
+                    held = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+        except Exception:
+            self._release_writer()
+            raise
+        if bool(held) != self.writer:
+            logger.info("%s the live_graph writer lock", "acquired" if held else "do not hold")
+        if not held:
+            # Points seen while another process writes are its to record.
+            self._pending = []
+            self._pending_since = None
+        return bool(held)
+
+    def _release_writer(self):
+        session, self._lock_session, self._lock_conn = self._lock_session, None, None
+        self.writer = self.lock_name is None
+        if session is not None:
+            try:
+                # Closing the session drops the named lock with it.
+                session.__exit__(None, None, None)
+            except Exception:
+                logger.exception("could not release the live_graph writer lock")
+
+    def tick(self):
+        """Run one probe (and flush if due). Returns True when the count changed."""
+        with self._lock:
+            self.writer = self._claim_writer()
+            started = time.perf_counter()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    changed = self._probe(cursor)
+                    self._record_latency(time.perf_counter() - started)
+                    flushed = self._flush_due()
+                    if flushed:
+                        self._flush(conn, cursor)
+                finally:
+                    cursor.close()
+
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+            count = self.count
+
+        if changed or flushed:
+            for callback in self._listeners:
+                try:
+                    callback(count)
+                except Exception:
+                    logger.exception("change listener failed")
+        return changed
+
+    def flush(self):
+        """Write buffered points now."""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    self._flush(conn, cursor)
+                finally:
+                    cursor.close()
+
+    def stats(self):
+        with self._lock:
+            probes = self._counters['probes']
+            now = time.monotonic()
+            while self._recent_changes and now - self._recent_changes[0] > 60:
+                self._recent_changes.popleft()
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'writer': self.writer,
+                'watermark': self.watermark,
+                'count': self.count,
+                'interval': round(self.interval, 3),
+                'pending_points': len(self._pending),
+                'probe_latency_last': round(self._last_probe_latency, 6),
+                'probe_latency_avg': round(self._probe_latency_total / probes, 6) if probes else 0.0,
+                'probe_latency_max': round(self._probe_latency_max, 6),
+                'changes_per_minute': len(self._recent_changes),
+                **self._counters,
+            }
+
+    def _probe(self, cursor):
+        self._counters['probes'] += 1
+        self._ticks += 1
+
+        cursor.execute("SELECT MAX(id) FROM vulnerabilities")
+        watermark = cursor.fetchone()[0]
+
+        shrank = self.watermark is not None and (watermark is None or watermark < self.watermark)
+        if watermark is None:
+            count = 0
+        elif self.count is None or shrank or self._ticks % self.reconcile_every == 0:
+            cursor.execute("SELECT COUNT(*) FROM vulnerabilities")
+            count = cursor.fetchone()[0]
+            if self.count is not None:
+                self._counters['reconciliations'] += 1
+        elif watermark != self.watermark:
+            cursor.execute("SELECT COUNT(*) FROM vulnerabilities WHERE id > %s", (self.watermark or 0,))
+            count = self.count + cursor.fetchone()[0]
+        else:
+            count = self.count
+
+        self.watermark = watermark
+        if count == self.count:
+            return False
+
+        logger.debug("vulnerability count changed: %s -> %s", self.count, count)
+        self.count = count
+        self._counters['changes'] += 1
+        self._recent_changes.append(time.monotonic())
+        if self.writer:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((count, time.time()) if self.timestamps else (count,))
+        return True
+
+    def _flush_due(self):
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size
+            or time.monotonic() - self._pending_since >= self.max_delay
+            or self._stop.is_set()
+        )
+
+    def _flush(self, conn, cursor):
+        if self.timestamps:
+            # Buffered points keep the time they were seen, not the time they were flushed.
+            cursor.executemany(
+                "INSERT INTO live_graph (vulnerabilities, created_at) VALUES (%s, FROM_UNIXTIME(%s))",
+                self._pending,
+            )
+        else:
+            cursor.executemany("INSERT INTO live_graph (vulnerabilities) VALUES (%s)", self._pending)
+        conn.commit()
+        self._counters['points_written'] += len(self._pending)
+        self._counters['flushes'] += 1
+        self._pending = []
+        self._pending_since = None
+
+    def _record_latency(self, elapsed):
+        self._last_probe_latency = elapsed
+        self._probe_latency_total += elapsed
+        self._probe_latency_max = max(self._probe_latency_max, elapsed)
+
+    def _next_delay(self):
+        spread = self.interval * self.jitter
+        delay = max(0.0, self.interval + random.uniform(-spread, spread))
+        with self._lock:
+            if self._pending:
+                delay = min(delay, max(0.0, self._pending_since + self.max_delay - time.monotonic()))
+        return delay
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("change detector tick failed")
+                with self._lock:
+                    self._counters['errors'] += 1
+                    self.interval = min(self.max_interval, self.interval * self.backoff)
+            self._stop.wait(self._next_delay())
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("could not flush pending live_graph points on shutdown")
+        with self._lock:
+            self._release_writer()
@@ -0,0 +1,139 @@
+"""Dashboard figures computed from one consistent read snapshot.
+
+The per-widget endpoints in app.py and the aggregated ``/api/dashboard``
+endpoint share the calculations below so the numbers always agree.
+"""
+
+SECTIONS = (
+    'total_apis',
+    'total_vulnerabilities',
+    'code_score',
+    'severity',
+    'donought_chart',
+    'timeline',
+)
+
+SEVERITY_MAP = {
+    'Critical': 4,
+    'High': 3,
+    'Medium': 2,
+    'Low': 1
+}
+
+TIMELINE_POINTS = 15
+
+
+def severity_weights(rows):
+    """Map each vulnerability type to its weighted severity from (type, score) rows."""
+    severity = {}
+    for vulnerability, count in rows:
+        severity_level = SEVERITY_MAP.get(vulnerability, 1)
+        severity[vulnerability] = severity_level * count
+    return severity
+
+
+def code_score(impact_rows, total_apis):
+    """Format the 0-100 code quality score from (severity_score, count) rows."""
+    total_impact = sum(score * count for score, count in impact_rows)
+
+    if total_apis > 0:
+        normalized_impact = (total_impact / total_apis) * 10
+    else:
+        normalized_impact = 0
+
+    base_score = 100
+    score = max(0, base_score - normalized_impact)
+    return f"{score:.2f}"
+
+
+def severity_counts(rows):
+    """Map severity level to affected-route count from (level, count) rows."""
+    return {level: count for level, count in rows}
+
+
+def parse_sections(raw):
+    """Turn a comma-separated ``sections`` argument into a validated tuple.
+
+    Returns every section when ``raw`` is empty and raises ``ValueError``
+    naming the first unknown section otherwise.
+    """
+    if not raw:
+        return SECTIONS
+    requested = [part.strip() for part in raw.split(',') if part.strip()]
+    for section in requested:
+        if section not in SECTIONS:
+            raise ValueError(f"Unknown dashboard section: {section}")
+    return tuple(section for section in SECTIONS if section in requested)
+
+
+def load_dashboard(conn, sections=SECTIONS, reference=None):
+    """Compute the requested dashboard sections inside a single read-only snapshot.
+
+    At most four statements run regardless of how many sections are asked
+    for: one for both table counts, one grouped JOIN shared by the code
+    score and doughnut chart, one for the severity table and one for the
+    timeline. With a preloaded ``reference`` (``reference_data.ReferenceData``)
+    the severity lookups happen in Python: findings are only counted per
+    type and the severity table is not read.
+    """
+    wanted = set(sections)
+    result = {}
+
+    conn.start_transaction(consistent_snapshot=True, readonly=True)
+    cursor = conn.cursor()
+    try:
+        if wanted & {'total_apis', 'total_vulnerabilities', 'code_score'}:
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM api_routes),
+                       (SELECT COUNT(*) FROM vulnerabilities)
+            """)
+            total_apis, total_vulnerabilities = cursor.fetchone()
+            if 'total_apis' in wanted:
+                result['total_apis'] = total_apis
+            if 'total_vulnerabilities' in wanted:
+                result['total_vulnerabilities'] = total_vulnerabilities
+
+        if wanted & {'code_score', 'donought_chart'} and reference is not None:
+            cursor.execute("SELECT vulnerability_type, COUNT(*) FROM vulnerabilities GROUP BY vulnerability_type")
+            type_counts = cursor.fetchall()
+            if 'code_score' in wanted:
+                result['code_score'] = code_score(reference.impact_rows(type_counts), total_apis)
+            if 'donought_chart' in wanted:
+                result['donought_chart'] = reference.level_counts(type_counts)
+        elif wanted & {'code_score', 'donought_chart'}:
+            cursor.execute("""
+                SELECT vs.severity_level, vs.severity_score, COUNT(*) AS count
+                FROM vulnerabilities v
+                JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+                GROUP BY vs.severity_level, vs.severity_score
+                ORDER BY vs.severity_score
+            """)
+            grouped = cursor.fetchall()
+            if 'code_score' in wanted:
+                result['code_score'] = code_score(
+                    [(score, count) for _, score, count in grouped], total_apis
+                )
+            if 'donought_chart' in wanted:
+                result['donought_chart'] = severity_counts(
+                    [(level, count) for level, _, count in grouped]
+                )
+
+        if 'severity' in wanted and reference is not None:
+            result['severity'] = reference.severity_weights()
+        elif 'severity' in wanted:
+            cursor.execute("SELECT vulnerability_type, severity_score FROM vulnerability_severity")
+            result['severity'] = severity_weights(cursor.fetchall())
+
+        if 'timeline' in wanted:
+            cursor.execute(
+                "SELECT id, vulnerabilities FROM live_graph ORDER BY id DESC LIMIT %s",
+                (TIMELINE_POINTS,)
+            )
+            timeline = list(cursor.fetchall())
+            timeline.reverse()
+            result['timeline'] = timeline
+    finally:
+        cursor.close()
+        conn.rollback()
+
+    return result
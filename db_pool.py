@@ -0,0 +1,225 @@
+"""Bounded, health-checked connection pool for the MySQL backend.
+
+Each worker process owns one pool. Connections are checked out with
+``pool.connect()`` and handed back by calling ``close()`` on the returned
+proxy, so code written against plain DB-API connections keeps working.
+"""
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Proxy around a raw DB-API connection; ``close()`` returns it to the pool."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = created_at
+        self._checked_out = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        """Return the connection to the pool. Calling it twice is harmless."""
+        if self._checked_out:
+            self._checked_out = False
+            self._pool._release(self)
+
+    def invalidate(self):
+        """Discard the underlying connection instead of returning it to the pool."""
+        if self._checked_out:
+            self._checked_out = False
+            self._pool._discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool with a fixed core size plus a bounded overflow.
+
+    ``creator`` is a zero-argument callable returning a new raw connection.
+    Idle connections older than ``recycle`` seconds are replaced on checkout,
+    and with ``pre_ping`` every reused connection is pinged first so a
+    connection dropped by the server is never handed to a request.
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=5, timeout=10.0,
+                 recycle=1800, pre_ping=True):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._creator = creator
+        self.pool_size = pool_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._total = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def connect(self):
+        """Check out a connection, waiting at most ``timeout`` seconds for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._total >= self.pool_size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"no connection available within {self.timeout}s "
+                        f"(size={self.pool_size}, overflow={self.max_overflow})"
+                    )
+                if not waited:
+                    waited = True
+                    self._counters['waits'] += 1
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._idle:
+                conn = self._idle.pop()
+                fresh = False
+            else:
+                self._total += 1
+                conn = None
+                fresh = True
+            self._in_use += 1
+
+        try:
+            if fresh:
+                conn = self._create()
+            elif self._is_stale(conn):
+                self._close_raw(conn._raw)
+                self._bump('recycled')
+                conn = self._create()
+            elif self.pre_ping and not self._ping(conn._raw):
+                self._bump('ping_failures')
+                self._close_raw(conn._raw)
+                conn = self._create()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        self._record_checkout(time.monotonic() - started, waited)
+        conn._checked_out = True
+        return conn
+
+    def stats(self):
+        """Return a snapshot of pool occupancy and checkout counters."""
+        with self._cond:
+            checkouts = self._counters['checkouts']
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'overflow': max(0, self._total - self.pool_size),
+                'waiting': self._waiting,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+                'wait_time_avg': round(self._wait_time_total / checkouts, 6) if checkouts else 0.0,
+                **self._counters,
+            }
+
+    def dispose(self):
+        """Close every idle connection; checked-out ones are closed on return."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_raw(conn._raw)
+
+    def _create(self):
+        raw = self._creator()
+        self._bump('created')
+        return PooledConnection(self, raw, time.monotonic())
+
+    def _bump(self, counter):
+        with self._cond:
+            self._counters[counter] += 1
+
+    def _is_stale(self, conn):
+        return self.recycle is not None and self.recycle >= 0 and \
+            time.monotonic() - conn.created_at > self.recycle
+
+    def _record_checkout(self, elapsed, waited):
+        with self._cond:
+            self._counters['checkouts'] += 1
+            if waited:
+                self._wait_time_total += elapsed
+                self._wait_time_max = max(self._wait_time_max, elapsed)
+
+    def _release(self, conn):
+        # Never hand an open transaction (or consistent snapshot) to the next borrower.
+        try:
+            if getattr(conn._raw, 'in_transaction', False):
+                conn._raw.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._total -= 1
+            self._cond.notify()
+        self._close_raw(conn._raw)
+
+    def _discard(self, conn):
+        with self._cond:
+            self._in_use -= 1
+            self._total -= 1
+            self._counters['discarded'] += 1
+            self._cond.notify()
+        self._close_raw(conn._raw)
+
+    @staticmethod
+    def _ping(raw):
+        try:
+            raw.ping()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
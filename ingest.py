@@ -0,0 +1,174 @@
+"""Bulk loading of scanner results into api_routes and vulnerabilities.
+
+A scan payload looks like::
+
+    {
+        "routes": [{"path": "/login", "methods": ["POST"], "route_name": "login"}, ...],
+        "findings": [{"route_name": "login", "vulnerability_type": "SQL Injection"}, ...]
+    }
+
+Everything is written in one transaction with multi-row upserts, relying
+on the unique keys added by migration 0003, so re-sending a scan is a
+no-op rather than a source of duplicate rows. A route's optional
+``route_name`` is the name its findings are filed under; it is stored on
+``api_routes`` (migration 0005) because it cannot be derived from the path.
+"""
+import time
+
+from migrations import split_methods
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_ITEMS = 50000
+MAX_LENGTH = 255
+
+
+class ScanError(ValueError):
+    """Raised for a malformed scan payload."""
+
+
+def _text(item, field, where):
+    value = item.get(field) if isinstance(item, dict) else None
+    if not isinstance(value, str) or not value.strip():
+        raise ScanError(f"{where}: '{field}' must be a non-empty string")
+    value = value.strip()
+    if len(value) > MAX_LENGTH:
+        raise ScanError(f"{where}: '{field}' is longer than {MAX_LENGTH} characters")
+    return value
+
+
+def _items(payload, key):
+    items = payload.get(key, [])
+    if not isinstance(items, list):
+        raise ScanError(f"'{key}' must be a list")
+    if len(items) > MAX_ITEMS:
+        raise ScanError(f"'{key}' has more than {MAX_ITEMS} entries")
+    return items
+
+
+def parse_scan(payload):
+    """Validate a scan payload and de-duplicate it.
+
+    Returns ``(routes, findings)`` where ``routes`` maps each path to its
+    sorted methods (merged across repeated entries) and ``findings`` is a
+    list of unique ``(route_name, vulnerability_type)`` pairs in input order.
+    """
+    if not isinstance(payload, dict):
+        raise ScanError("scan payload must be a JSON object")
+
+    routes = {}
+    for i, item in enumerate(_items(payload, 'routes')):
+        path = _text(item, 'path', f"routes[{i}]")
+        if item.get('route_name') is not None:
+            _text(item, 'route_name', f"routes[{i}]")
+        methods = item.get('methods', [])
+        if isinstance(methods, str):
+            methods = split_methods(methods)
+        elif isinstance(methods, list) and all(isinstance(m, str) for m in methods):
+            methods = [m.strip().upper() for m in methods if m.strip()]
+        else:
+            raise ScanError(f"routes[{i}]: 'methods' must be a string or a list of strings")
+        routes.setdefault(path, set()).update(methods)
+
+    findings = {}
+    for i, item in enumerate(_items(payload, 'findings')):
+        where = f"findings[{i}]"
+        pair = (_text(item, 'route_name', where), _text(item, 'vulnerability_type', where))
+        findings.setdefault(pair, None)
+
+    return {path: sorted(methods) for path, methods in routes.items()}, list(findings)
+
+
+def parse_route_names(payload):
+    """Return ``{path: route_name}`` for the routes in a scan that name their findings' route.
+
+    Call after ``parse_scan`` has validated the payload's shape.
+    """
+    names = {}
+    for i, item in enumerate(_items(payload, 'routes')):
+        if item.get('route_name') is not None:
+            names[_text(item, 'path', f"routes[{i}]")] = _text(item, 'route_name', f"routes[{i}]")
+    return names
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _Timer:
+    def __init__(self, batches, table, rows):
+        self.entry = {'table': table, 'rows': rows}
+        batches.append(self.entry)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self.entry
+
+    def __exit__(self, exc_type, exc, tb):
+        self.entry['seconds'] = round(time.perf_counter() - self._started, 6)
+
+
+def ingest_scan(conn, routes, findings, batch_size=DEFAULT_BATCH_SIZE, route_names=None):
+    """Upsert parsed scan results in a single transaction and report per-batch timing.
+
+    ``route_names`` (from ``parse_route_names``) sets ``api_routes.route_name``;
+    routes without one keep their stored name.
+    """
+    route_names = route_names or {}
+    started = time.perf_counter()
+    batches = []
+    report = {
+        'routes': {'received': len(routes), 'written': 0},
+        'findings': {'received': len(findings), 'inserted': 0, 'duplicates': 0},
+        'batches': batches,
+    }
+
+    conn.start_transaction()
+    cursor = conn.cursor()
+    try:
+        paths = list(routes)
+        for chunk in _chunks(paths, batch_size):
+            with _Timer(batches, 'api_routes', len(chunk)) as batch:
+                cursor.executemany(
+                    "INSERT INTO api_routes (path, methods, route_name) VALUES (%s, %s, %s) AS new "
+                    "ON DUPLICATE KEY UPDATE methods = new.methods, "
+                    "route_name = COALESCE(new.route_name, api_routes.route_name)",
+                    [(path, ', '.join(routes[path]), route_names.get(path)) for path in chunk]
+                )
+                report['routes']['written'] += len(chunk)
+
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"SELECT id, path FROM api_routes WHERE path IN ({placeholders})", chunk)
+                ids = {path: route_id for route_id, path in cursor.fetchall()}
+                route_ids = [ids[path] for path in chunk if path in ids]
+                if route_ids:
+                    id_placeholders = ', '.join(['%s'] * len(route_ids))
+                    cursor.execute(f"DELETE FROM api_route_methods WHERE route_id IN ({id_placeholders})", route_ids)
+                pairs = [(ids[path], method) for path in chunk if path in ids for method in routes[path]]
+                if pairs:
+                    cursor.executemany(
+                        "INSERT INTO api_route_methods (route_id, method) VALUES (%s, %s)", pairs
+                    )
+                batch['methods'] = len(pairs)
+
+        for chunk in _chunks(findings, batch_size):
+            with _Timer(batches, 'vulnerabilities', len(chunk)) as batch:
+                cursor.executemany(
+                    "INSERT INTO vulnerabilities (route_name, vulnerability_type) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE id = id",
+                    chunk
+                )
+                inserted = max(cursor.rowcount, 0)
+                batch['inserted'] = inserted
+                report['findings']['inserted'] += inserted
+                report['findings']['duplicates'] += len(chunk) - inserted
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    report['seconds'] = round(time.perf_counter() - started, 6)
+    return report
@@ -0,0 +1,49 @@
+"""Fast JSON encoding for Flask responses.
+
+``OrjsonProvider`` serializes with orjson when it is installed, several
+times faster than the standard library on the large route and
+vulnerability listings. Output keeps Flask's defaults (compact, sorted
+keys, pretty-printed in debug mode) except that non-ASCII text is written
+as UTF-8 rather than ``\\u`` escapes. Select a provider with
+``JSON_PROVIDER`` (``orjson`` or ``default``).
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """``DefaultJSONProvider`` with orjson doing the encoding and decoding."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for stdlib options (indent, cls, ...) get the stdlib.
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self.dumps(obj)}\n", mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+PROVIDERS = {'default': DefaultJSONProvider}
+if orjson is not None:
+    PROVIDERS['orjson'] = OrjsonProvider
+
+
+def provider_class(name):
+    """Return the provider registered as ``name``, falling back to Flask's default."""
+    return PROVIDERS.get(name, DefaultJSONProvider)
@@ -0,0 +1,241 @@
+"""Server-Sent Events fan-out for live dashboard updates.
+
+One ``LiveFeed`` per process watches the data and publishes an event only
+when something changed; every connected dashboard is a ``Subscription`` on
+the shared ``Broadcaster``, so N open dashboards cost one probe, not N.
+"""
+from collections import deque
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_id, event, data):
+    """Encode one SSE frame."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """One client's bounded queue of pending events.
+
+    Events carry full state rather than deltas, so when a slow client falls
+    ``max_queue`` events behind, a new event replaces the pending one of the
+    same type instead of buffering without bound. Every type keeps its
+    latest frame; only when none of its type is pending does the oldest
+    frame go.
+    """
+
+    def __init__(self, broadcaster, max_queue):
+        self._broadcaster = broadcaster
+        self.max_queue = max_queue
+        self._queue = deque()   # (event, frame)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+        self.on_push = None
+
+    def push(self, frame, event=None):
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                stale = next((item for item in self._queue if item[0] == event), None)
+                if stale is not None:
+                    self._queue.remove(stale)
+                else:
+                    self._queue.popleft()
+            self._queue.append((event, frame))
+            self._cond.notify()
+        on_push = self.on_push
+        if on_push is not None:
+            on_push()
+
+    def next_frame(self, timeout):
+        """Return the next frame, or ``None`` if nothing arrived within ``timeout``."""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            if self._queue:
+                return self._queue.popleft()[1]
+            return None
+
+    def stream(self, heartbeat=15.0):
+        """Yield SSE frames forever, with a comment line every ``heartbeat`` idle seconds."""
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            while not self.closed:
+                frame = self.next_frame(heartbeat)
+                yield frame if frame is not None else ": heartbeat\n\n"
+        finally:
+            self.close()
+
+    async def astream(self, heartbeat=15.0):
+        """Async version of ``stream`` that waits on the event loop instead of a thread."""
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        self.on_push = lambda: loop.call_soon_threadsafe(wakeup.set)
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            while not self.closed:
+                wakeup.clear()
+                frame = self.next_frame(0)
+                if frame is not None:
+                    yield frame
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.on_push = None
+            self.close()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """Publish events to every subscriber and keep a short replay history.
+
+    Event ids are ``<epoch>-<sequence>``; the epoch is unique per process so
+    a ``Last-Event-ID`` from another worker or an earlier run falls back to
+    a fresh snapshot instead of replaying the wrong events.
+    """
+
+    def __init__(self, history=100, max_queue=32):
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history = deque(maxlen=history)
+        self._latest = {}
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            frame = format_event(f"{self.epoch}-{seq}", event, data)
+            self._history.append((seq, event, frame))
+            self._latest[event] = frame
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(frame, event)
+        return seq
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber primed with whatever it missed.
+
+        A resumable ``last_event_id`` replays the history after it; anything
+        else gets the latest event of each type as a snapshot.
+        """
+        subscription = Subscription(self, self.max_queue)
+        with self._lock:
+            for event, frame in self._backlog(last_event_id):
+                subscription.push(frame, event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _backlog(self, last_event_id):
+        seq = self._parse_event_id(last_event_id)
+        if seq is not None and self._history and seq >= self._history[0][0] - 1:
+            return [(event, frame) for frame_seq, event, frame in self._history if frame_seq > seq]
+        return list(self._latest.items())
+
+    def _parse_event_id(self, last_event_id):
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+
+class LiveFeed:
+    """Background change detector feeding a ``Broadcaster``.
+
+    ``version`` is a cheap callable returning a change token; ``load`` is
+    only called when the token moved and returns a mapping of event name to
+    payload. Only payloads that differ from the last published ones are
+    sent. The thread starts with the first subscriber and skips probing
+    while nobody is listening.
+    """
+
+    def __init__(self, version, load, interval=2.0, broadcaster=None):
+        self.broadcaster = broadcaster or Broadcaster()
+        self.interval = interval
+        self._version = version
+        self._load = load
+        self._token = object()
+        self._published = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def subscribe(self, last_event_id=None):
+        self.start()
+        if not self.broadcaster.subscriber_count:
+            # Nobody was listening, so the cached state may be stale.
+            self.poll_once()
+        return self.broadcaster.subscribe(last_event_id)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Probe now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def poll_once(self):
+        """Probe once and publish whatever changed. Returns the number of events sent."""
+        with self._lock:
+            token = self._version()
+            if token == self._token:
+                return 0
+            state = self._load()
+            sent = 0
+            for event, data in state.items():
+                if self._published.get(event) != data:
+                    self.broadcaster.publish(event, data)
+                    self._published[event] = data
+                    sent += 1
+            self._token = token
+            return sent
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set() or not self.broadcaster.subscriber_count:
+                continue
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("live feed probe failed")
@@ -0,0 +1,345 @@
+"""Request and query instrumentation exposed in the Prometheus text format.
+
+``Registry`` holds labelled counters, gauges and histograms and renders
+them for ``/metrics``. ``QueryRecorder`` times SQL statements run through an
+``InstrumentedConnection``: every statement is reduced to a fingerprint
+(literals and placeholders replaced by ``?``) so the same query with
+different arguments is counted together, and anything slower than the
+threshold is written to the ``slow_query`` logger as one JSON object.
+"""
+import json
+import logging
+import math
+import re
+import threading
+import time
+
+slow_query_logger = logging.getLogger('slow_query')
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_FINGERPRINTS = 500
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Normalize ``statement`` so executions differing only in values share one key."""
+    text = _STRING.sub('?', statement)
+    text = _COMMENT.sub(' ', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('(?+)', text)
+    return _SPACE.sub(' ', text).strip()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """Return ``(cumulative bucket counts, sum, count)`` for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return [0] * len(self.buckets), 0.0, 0
+            counts, total, count = state
+            return self._cumulative(counts), total, count
+
+    @staticmethod
+    def _cumulative(counts):
+        running, out = 0, []
+        for n in counts:
+            running += n
+            out.append(running)
+        return out
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(c), s, n)) for key, (c, s, n) in self._values.items())
+        for key, (counts, total, count) in items:
+            for bound, cumulative in zip(self.buckets, self._cumulative(counts)):
+                labels = _format_labels(self.labels, key, (('le', _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """A set of metrics plus collectors that report gauges at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, name, help, collect):
+        """Report ``collect()`` (a dict of label value -> number) as gauge ``name`` on each scrape."""
+        self._collectors.append((name, help, collect))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help, collect in self._collectors:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in sorted(collect().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{name}{{key="{_escape(key)}"}} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class QueryRecorder:
+    """Record statement timings and row counts into ``registry``.
+
+    ``context`` is a zero-argument callable naming what issued the query
+    (the route, for example); it is only attached to slow-query log entries.
+    """
+
+    def __init__(self, registry, slow_threshold=0.2, context=None):
+        self.slow_threshold = slow_threshold
+        self._context = context
+        self._known = set()
+        self._lock = threading.Lock()
+        self.duration = registry.histogram(
+            'db_query_duration_seconds', "Execution plus fetch time per statement.", ('fingerprint',)
+        )
+        self.rows = registry.counter('db_query_rows_total', "Rows returned or affected.", ('fingerprint',))
+        self.slow = registry.counter('db_slow_queries_total', "Statements over the slow-query threshold.", ('fingerprint',))
+        self.by_context = registry.counter(
+            'db_query_seconds_total', "Statement time by the route or job that issued it.", ('context',)
+        )
+
+    def _label(self, key):
+        with self._lock:
+            if key in self._known:
+                return key
+            if len(self._known) < MAX_FINGERPRINTS:
+                self._known.add(key)
+                return key
+        return 'other'
+
+    def record(self, statement, seconds, rows):
+        key = self._label(fingerprint(statement))
+        context = self._context() if self._context else None
+        self.duration.observe(seconds, fingerprint=key)
+        self.by_context.inc(seconds, context=context or '')
+        if rows > 0:
+            self.rows.inc(rows, fingerprint=key)
+        if seconds >= self.slow_threshold:
+            self.slow.inc(fingerprint=key)
+            slow_query_logger.warning(json.dumps({
+                'event': 'slow_query',
+                'fingerprint': key,
+                'duration_ms': round(seconds * 1000, 3),
+                'rows': rows,
+                'context': context,
+                'statement': _SPACE.sub(' ', statement).strip()[:1000],
+            }))
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing each statement from ``execute`` until the next one or ``close``."""
+
+    def __init__(self, cursor, recorder, on_close=None):
+        self._cursor = cursor
+        self._recorder = recorder
+        self._on_close = on_close
+        self._statement = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def _timed(self, call):
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def _begin(self, statement):
+        self.finish()
+        self._statement = statement
+
+    def finish(self):
+        """Record the current statement, if any."""
+        if self._statement is None:
+            return
+        rows = self._rows
+        if not rows:
+            rowcount = getattr(self._cursor, 'rowcount', -1)
+            rows = rowcount if isinstance(rowcount, int) and rowcount > 0 else 0
+        statement, seconds = self._statement, self._seconds
+        self._statement, self._seconds, self._rows = None, 0.0, 0
+        self._recorder.record(statement, seconds, rows)
+
+    def execute(self, statement, *args, **kwargs):
+        self._begin(statement)
+        return self._timed(lambda: self._cursor.execute(statement, *args, **kwargs))
+
+    def executemany(self, statement, *args, **kwargs):
+        self._begin(statement)
+        return self._timed(lambda: self._cursor.executemany(statement, *args, **kwargs))
+
+    def _fetched(self, rows):
+        if isinstance(rows, list):
+            self._rows += len(rows)
+        elif rows is not None:
+            self._rows += 1
+        return rows
+
+    def fetchone(self):
+        return self._fetched(self._timed(self._cursor.fetchone))
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self._timed(lambda: self._cursor.fetchmany(*args, **kwargs)))
+
+    def fetchall(self):
+        return self._fetched(self._timed(self._cursor.fetchall))
+
+    def close(self):
+        self.finish()
+        if self._on_close is not None:
+            self._on_close(self)
+        return self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors report to a ``QueryRecorder``."""
+
+    def __init__(self, conn, recorder):
+        self._conn = conn
+        self._recorder = recorder
+        self._cursors = set()   # cursors not closed yet
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._recorder, on_close=self._cursors.discard)
+        self._cursors.add(cursor)
+        return cursor
+
+    def finish(self):
+        """Record whatever statements are still open on this connection's cursors."""
+        cursors, self._cursors = self._cursors, set()
+        for cursor in cursors:
+            cursor.finish()
+
+    def close(self):
+        self.finish()
+        return self._conn.close()
+
+    def invalidate(self):
+        self.finish()
+        invalidate = getattr(self._conn, 'invalidate', None)
+        if invalidate is not None:
+            invalidate()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -0,0 +1,317 @@
+"""Versioned, idempotent schema migrations applied on top of api.sql.
+
+Every migration checks the live schema before changing it, so running
+``flask --app app db-upgrade`` against a database that already has some
+of the changes (or re-running after a failure) is safe. Applied versions
+are recorded in ``schema_migrations``.
+"""
+import bisect
+import time
+
+MIGRATIONS = []
+
+ER_NO_SUCH_TABLE = 1146
+
+
+class Migration:
+    def __init__(self, version, name, apply):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+
+def migration(version, name):
+    """Register ``apply(conn, cursor)`` as schema version ``version``."""
+    def decorator(apply):
+        if any(existing.version == version for existing in MIGRATIONS):
+            raise ValueError(f"duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, name, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return decorator
+
+
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def is_missing_table(error):
+    """Whether ``error`` is MySQL reporting a table that a pending migration creates."""
+    return getattr(error, 'errno', None) == ER_NO_SUCH_TABLE
+
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table, index):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+        (table, index)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def create_index(cursor, table, index, columns, unique=False):
+    """Add an index unless one with that name already exists. Returns True if created."""
+    if index_exists(cursor, table, index):
+        return False
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    cursor.execute(f"ALTER TABLE `{table}` ADD {kind} `{index}` ({columns})")
+    return True
+
+
+def drop_index(cursor, table, index):
+    """Drop an index if it exists. Returns True if dropped."""
+    if not index_exists(cursor, table, index):
+        return False
+    cursor.execute(f"ALTER TABLE `{table}` DROP INDEX `{index}`")
+    return True
+
+
+def split_methods(methods):
+    """Split the legacy comma-joined ``api_routes.methods`` value."""
+    return [method.strip().upper() for method in methods.split(',') if method.strip()]
+
+
+def backfill_route_methods(conn, batch_size=1000):
+    """Copy ``api_routes.methods`` into ``api_route_methods`` in keyset batches.
+
+    Existing pairs are left alone, so this doubles as a re-sync after routes
+    were loaded out of band. Returns the number of routes scanned.
+    """
+    cursor = conn.cursor()
+    scanned = 0
+    last_id = 0
+    try:
+        while True:
+            cursor.execute(
+                "SELECT id, methods FROM api_routes WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            routes = cursor.fetchall()
+            if not routes:
+                break
+            pairs = [(route_id, method) for route_id, methods in routes for method in split_methods(methods)]
+            if pairs:
+                cursor.executemany(
+                    "INSERT IGNORE INTO api_route_methods (route_id, method) VALUES (%s, %s)", pairs
+                )
+            conn.commit()
+            scanned += len(routes)
+            last_id = routes[-1][0]
+    finally:
+        cursor.close()
+    return scanned
+
+
+def path_route_name(path):
+    """The name a route's path spells: ``/api/users/<int:id>`` gives ``api_users``."""
+    return path.strip('/').split('/<', 1)[0].replace('/', '_').replace('-', '_')
+
+
+def match_route_name(path, names):
+    """The one name in sorted ``names`` that ``path`` spells, or else the only one extending it.
+
+    ``/fetch`` takes ``fetch_url`` when no finding is filed under ``fetch``;
+    ``None`` when nothing matches or several names extend the path's.
+    """
+    stem = path_route_name(path)
+    if not stem:
+        return None
+    i = bisect.bisect_left(names, stem)
+    if i < len(names) and names[i] == stem:
+        return stem
+    prefix = stem + '_'
+    start = bisect.bisect_left(names, prefix)
+    end = bisect.bisect_left(names, stem + '`')  # '`' sorts right after '_'
+    return names[start] if end - start == 1 else None
+
+
+def backfill_route_names(conn, batch_size=1000):
+    """Name routes left NULL by migration 0005 after the findings filed under them.
+
+    Each route whose path unambiguously matches a ``vulnerabilities.route_name``
+    (see ``match_route_name``) takes it; the rest stay NULL until a scan names
+    them. Returns ``(named, scanned)``.
+    """
+    cursor = conn.cursor()
+    named = scanned = 0
+    last_id = 0
+    try:
+        cursor.execute("SELECT DISTINCT route_name FROM vulnerabilities WHERE route_name IS NOT NULL")
+        names = sorted(name for name, in cursor.fetchall())
+        while True:
+            cursor.execute(
+                "SELECT id, path FROM api_routes WHERE route_name IS NULL AND id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            routes = cursor.fetchall()
+            if not routes:
+                break
+            updates = []
+            for route_id, path in routes:
+                name = match_route_name(path, names)
+                if name is not None:
+                    updates.append((name, route_id))
+            if updates:
+                cursor.executemany("UPDATE api_routes SET route_name = %s WHERE id = %s", updates)
+            conn.commit()
+            named += len(updates)
+            scanned += len(routes)
+            last_id = routes[-1][0]
+    finally:
+        cursor.close()
+    return named, scanned
+
+
+@migration(1, "add lookup indexes")
+def _add_lookup_indexes(conn, cursor):
+    # get_vulnerability_details filters on route_name; the composite index also covers its projection.
+    create_index(cursor, 'vulnerabilities', 'idx_vulnerabilities_route_type', 'route_name, vulnerability_type')
+    # JOIN / GROUP BY key for the code score, doughnut and severity queries.
+    create_index(cursor, 'vulnerabilities', 'idx_vulnerabilities_type', 'vulnerability_type')
+    create_index(cursor, 'vulnerability_severity', 'idx_vulnerability_severity_type', 'vulnerability_type')
+    create_index(cursor, 'VulnerabilityMitigations', 'idx_mitigations_type', 'vulnerability_type')
+    create_index(cursor, 'api_routes', 'idx_api_routes_path', 'path')
+
+
+@migration(2, "normalize route methods")
+def _normalize_route_methods(conn, cursor):
+    if not table_exists(cursor, 'api_route_methods'):
+        cursor.execute("""
+            CREATE TABLE `api_route_methods` (
+              `route_id` int NOT NULL,
+              `method` varchar(16) NOT NULL,
+              PRIMARY KEY (`route_id`, `method`),
+              KEY `idx_api_route_methods_method` (`method`, `route_id`),
+              CONSTRAINT `fk_api_route_methods_route` FOREIGN KEY (`route_id`)
+                REFERENCES `api_routes` (`id`) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """)
+    backfill_route_methods(conn)
+
+
+@migration(3, "unique scan keys")
+def _unique_scan_keys(conn, cursor):
+    # Scan ingestion upserts on these keys, so collapse existing duplicates first,
+    # keeping the oldest row (its methods rows survive; the others cascade away).
+    cursor.execute("""
+        DELETE newer FROM vulnerabilities newer
+        JOIN vulnerabilities older
+          ON older.route_name = newer.route_name
+         AND older.vulnerability_type = newer.vulnerability_type
+         AND older.id < newer.id
+    """)
+    cursor.execute("""
+        DELETE newer FROM api_routes newer
+        JOIN api_routes older ON older.path = newer.path AND older.id < newer.id
+    """)
+    conn.commit()
+
+    # The unique keys cover the same lookups as the plain indexes from 0001.
+    create_index(cursor, 'vulnerabilities', 'uq_vulnerabilities_route_type',
+                 'route_name, vulnerability_type', unique=True)
+    drop_index(cursor, 'vulnerabilities', 'idx_vulnerabilities_route_type')
+    create_index(cursor, 'api_routes', 'uq_api_routes_path', 'path', unique=True)
+    drop_index(cursor, 'api_routes', 'idx_api_routes_path')
+
+
+@migration(4, "live_graph timestamps and rollups")
+def _live_graph_time_series(conn, cursor):
+    # Existing points have no recorded time; they are stamped with the migration time.
+    if not column_exists(cursor, 'live_graph', 'created_at'):
+        cursor.execute("""
+            ALTER TABLE `live_graph`
+            ADD COLUMN `created_at` timestamp(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+        """)
+    create_index(cursor, 'live_graph', 'idx_live_graph_created_at', 'created_at')
+    if not table_exists(cursor, 'live_graph_rollups'):
+        cursor.execute("""
+            CREATE TABLE `live_graph_rollups` (
+              `resolution` int NOT NULL,
+              `bucket_start` timestamp NOT NULL,
+              `min_value` int NOT NULL,
+              `max_value` int NOT NULL,
+              `sum_value` bigint NOT NULL,
+              `samples` int NOT NULL,
+              PRIMARY KEY (`resolution`, `bucket_start`),
+              KEY `idx_live_graph_rollups_start` (`bucket_start`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """)
+
+
+@migration(5, "route names")
+def _route_names(conn, cursor):
+    # The scanner's route_name (the endpoint name findings are filed under) cannot
+    # be derived from the path: /fetch is fetch_url, /redirect redirect_to_external_api.
+    # Existing rows stay NULL until a scan supplies the name or
+    # ``flask --app app db-backfill-route-names`` matches them to their findings.
+    if not column_exists(cursor, 'api_routes', 'route_name'):
+        cursor.execute("ALTER TABLE `api_routes` ADD COLUMN `route_name` varchar(255) NULL")
+    create_index(cursor, 'api_routes', 'idx_api_routes_route_name', 'route_name')
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS `schema_migrations` (
+          `version` int NOT NULL,
+          `name` varchar(255) NOT NULL,
+          `applied_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (`version`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """)
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def pending(conn):
+    """Return the registered migrations not yet applied, oldest first."""
+    done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+def upgrade(conn, target=None, log=print):
+    """Apply pending migrations up to ``target`` (default: latest).
+
+    Returns a list of ``(version, name, seconds)`` for what was applied.
+    MySQL commits DDL implicitly, which is why every step is written to be
+    re-runnable rather than relying on a surrounding transaction.
+    """
+    applied = []
+    for m in pending(conn):
+        if target is not None and m.version > target:
+            break
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            m.apply(conn, cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (m.version, m.name)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+        elapsed = time.perf_counter() - started
+        applied.append((m.version, m.name, elapsed))
+        log(f"applied {m.version:04d} {m.name} in {elapsed:.2f}s")
+    return applied
@@ -0,0 +1,81 @@
+"""Keyset pagination and NDJSON streaming helpers for the list endpoints."""
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+def parse_page_args(args, max_limit=MAX_PAGE_SIZE):
+    """Read ``limit`` and ``after`` from the query string.
+
+    Returns ``(limit, after)`` with ``None`` for an absent argument. Raises
+    ``ValueError`` for non-integers, a non-positive limit or a limit above
+    ``max_limit`` (pass ``None`` for no cap).
+    """
+    limit = _int_arg(args, 'limit')
+    after = _int_arg(args, 'after')
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be a positive integer")
+    if limit is not None and max_limit is not None and limit > max_limit:
+        raise ValueError(f"limit must not exceed {max_limit}")
+    if after is not None and after < 0:
+        raise ValueError("after must not be negative")
+    return limit, after
+
+
+def _int_arg(args, name):
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def keyset_query(columns, table, after, limit):
+    """Build an id-ordered keyset query and its parameters."""
+    query = f"SELECT {columns} FROM {table} WHERE id > %s ORDER BY id"
+    params = [after or 0]
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, tuple(params)
+
+
+def fetch_page(cursor, columns, table, after, limit):
+    """Fetch one page and the cursor for the next one (``None`` on the last page)."""
+    query, params = keyset_query(columns, table, after, limit + 1)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]['id']
+    return rows, None
+
+
+def stream_ndjson(connection, query, params, encode, batch_size=STREAM_BATCH_SIZE, dumps=json.dumps):
+    """Yield newline-delimited JSON for every row of ``query``.
+
+    Rows are pulled ``batch_size`` at a time with ``fetchmany`` from an
+    unbuffered cursor, so memory stays flat however large the table is.
+    If the client goes away mid-stream the connection still has unread
+    rows on the wire, so it is discarded rather than returned to the pool.
+    """
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        finished = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield ''.join(dumps(encode(row)) + '\n' for row in rows)
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+            else:
+                conn.invalidate()
@@ -80,106 +80,88 @@ function Dashboard() {
     "#4A148C", // Deep indigo (darkest)
   ];
 
-  const fetchData = () => {
-    axios
-      .get(`${BASE_URL}/api/total_apis`)
-      .then((response) => setTotalApis(response.data))
-      .catch((error) => console.error("Error fetching total APIs:", error));
+  const applyStats = (stats) => {
+    setTotalApis(stats.total_apis);
+    setTotalVulnerabilities(stats.total_vulnerabilities);
 
-    // Fetch total vulnerabilities
-    axios
-      .get(`${BASE_URL}/api/total_vulnerabilities`)
-      .then((response) => setTotalVulnerabilities(response.data))
-      .catch((error) =>
-        console.error("Error fetching total vulnerabilities:", error)
-      );
+    const score = stats.code_score;
+    setCodeScore(score);
+    setCodeScoreData({
+      labels: ["Secure", "Vulnerable"],
+      datasets: [
+        {
+          label: "Code Quality Score",
+          data: [score, 100 - score],
+          backgroundColor: ["#9C27B0", "#4A148C"],
+          hoverOffset: 4,
+        },
+      ],
+    });
+  };
 
-    // Fetch code score
-    axios
-      .get(`${BASE_URL}/api/code_score`)
-      .then((response) => {
-        const score = response.data;
-        setCodeScore(score);
-        setCodeScoreData({
-          labels: ["Secure", "Vulnerable"],
-          datasets: [
-            {
-              label: "Code Quality Score",
-              data: [score, 100 - score],
-              backgroundColor: ["#9C27B0", "#4A148C"],
-              hoverOffset: 4,
-            },
-          ],
-        });
-      })
-      .catch((error) => console.error("Error fetching code score:", error));
+  const applyTimeline = (timeline) => {
+    setLineData({
+      labels: Array.from({ length: timeline.length }, (_, i) => i + 1),
+      datasets: [
+        {
+          label: "Vulnerabilities Over Time",
+          data: timeline.map((entry) => entry[1]),
+          fill: false,
+          borderColor: "#BA68C8",
+          tension: 0.1,
+        },
+      ],
+    });
+  };
 
-    axios
-      .get(`${BASE_URL}/api/vulnerabilities/severity`)
-      .then((response) => {
-        const labels = Object.keys(response.data);
-        const backgroundColors = labels.map(
-          (_, index) => colorPalette[index % colorPalette.length]
-        );
+  const applySeverity = (severity) => {
+    const severityLabels = Object.keys(severity);
+    setBarData({
+      labels: severityLabels,
+      datasets: [
+        {
+          label: "Severity of Vulnerabilities",
+          data: severityLabels.map((label) => severity[label]), // Use the severity value directly from the response
+          backgroundColor: severityLabels.map(
+            (_, index) => colorPalette[index % colorPalette.length]
+          ),
+        },
+      ],
+    });
+  };
 
-        setBarData({
-          labels,
-          datasets: [
-            {
-              label: "Severity of Vulnerabilities",
-              data: labels.map((label) => response.data[label]), // Use the severity value directly from the response
-              backgroundColor: backgroundColors,
-            },
-          ],
-        });
-      })
-      .catch((error) => console.error("Error fetching severity data:", error));
+  const applyDonut = (donut) => {
+    const pieLabels = Object.keys(donut);
+    setPieData({
+      labels: pieLabels,
+      datasets: [
+        {
+          label: "Severity of Vulnerabilities",
+          data: Object.values(donut),
+          backgroundColor: pieLabels.map(
+            (_, index) => colorPalette2[index % colorPalette2.length]
+          ),
+          hoverOffset: 4,
+        },
+      ],
+    });
+  };
 
-      axios
-      .get(`${BASE_URL}/api/donought_chart`)
+  const fetchData = () => {
+    // One request, one snapshot: every widget below is computed from the same data.
+    axios
+      .get(`${BASE_URL}/api/dashboard`)
       .then((response) => {
-        const labels = Object.keys(response.data);
-        const data = Object.values(response.data);
-        console.log(data);
-        
-        const backgroundColors = labels.map(
-          (_, index) => colorPalette2[index % colorPalette2.length]
-        );
+        const dashboard = response.data;
 
-        setPieData({
-          labels,
-          datasets: [
-            {
-              label: "Severity of Vulnerabilities",
-              data,
-              backgroundColor: backgroundColors,
-              hoverOffset: 4,
-            },
-          ],
-        });
-      })
-      .catch((error) => console.error("Error fetching severity data:", error));
-      
+        applyStats(dashboard);
 
-    // Fetch timeline data
-    axios
-      .get(`${BASE_URL}/api/vulnerabilities/timeline`)
-      .then((response) => {
-        setLineData({
-          labels: Array.from({ length: response.data.length }, (_, i) => i + 1),
-          datasets: [
-            {
-              label: "Vulnerabilities Over Time",
-              data: response.data.map((entry) => entry[1]),
-              fill: false,
-              borderColor: "#BA68C8",
-              tension: 0.1,
-            },
-          ],
-        });
+        applySeverity(dashboard.severity);
+        applyDonut(dashboard.donought_chart);
+        applyTimeline(dashboard.timeline);
         setLoading(false);
       })
-      .catch((error) => console.error("Error fetching timeline data:", error));
+      .catch((error) => console.error("Error fetching dashboard data:", error));
   };
 
   useEffect(() => {
@@ -188,8 +170,16 @@ function Dashboard() {
       navigate('/login');  // Redirect to login if no token is found
     } else {
       fetchData();  // Only call fetchData if the token exists
+
+      // Live updates are pushed by the server; no polling or re-fetch loop.
+      const source = new EventSource(`${BASE_URL}/api/stream`);
+      source.addEventListener("stats", (event) => applyStats(JSON.parse(event.data)));
+      source.addEventListener("severity", (event) => applySeverity(JSON.parse(event.data)));
+      source.addEventListener("donought_chart", (event) => applyDonut(JSON.parse(event.data)));
+      source.addEventListener("timeline", (event) => applyTimeline(JSON.parse(event.data)));
+      return () => source.close();
     }
-  }, [totalApis, totalVulnerabilities, codeScore, pieData]);
+  }, []);
 
   if (loading) {
     return <LoadingComponent />;
@@ -0,0 +1,179 @@
+"""Preloaded reference tables: severities and mitigations.
+
+``vulnerability_severity`` and ``VulnerabilityMitigations`` are a handful of
+rows that almost never change, yet the dashboard queries JOINed against
+them on every request. ``ReferenceStore`` loads both once into an immutable
+``ReferenceData`` snapshot so the views can count findings per type and do
+the severity lookup in Python. It re-reads the tables every ``interval``
+seconds (from ``start``, or from the first ``current()`` call when nothing
+started it) and swaps in a new snapshot (notifying listeners) only when the
+contents changed, which also catches edits that keep the row count.
+"""
+from collections import OrderedDict
+from types import MappingProxyType
+import hashlib
+import logging
+import threading
+import time
+
+import dashboard
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceData:
+    """One immutable snapshot of the reference tables."""
+
+    def __init__(self, severity_rows, mitigation_rows):
+        self.severity = MappingProxyType({
+            vulnerability_type: (level, score) for vulnerability_type, level, score in severity_rows
+        })
+        mitigations = {}
+        for vulnerability_type, recommendations in mitigation_rows:
+            mitigations.setdefault(vulnerability_type, []).append(recommendations)
+        self.mitigations = MappingProxyType({t: tuple(recs) for t, recs in mitigations.items()})
+        digest = hashlib.sha1(repr((sorted(self.severity.items()), sorted(self.mitigations.items()))).encode())
+        self.version = digest.hexdigest()[:16]
+
+    def weights(self):
+        """``{vulnerability_type: severity_score}``."""
+        return {vulnerability_type: score for vulnerability_type, (_, score) in self.severity.items()}
+
+    def severity_weights(self):
+        """The ``/api/vulnerabilities/severity`` payload."""
+        return dashboard.severity_weights(self.weights().items())
+
+    def impact_rows(self, type_counts):
+        """``(severity_score, findings)`` rows from ``(vulnerability_type, findings)`` rows.
+
+        Types without a severity are skipped, as the JOIN they replace did.
+        """
+        impact = {}
+        for vulnerability_type, count in type_counts:
+            if vulnerability_type in self.severity:
+                score = self.severity[vulnerability_type][1]
+                impact[score] = impact.get(score, 0) + count
+        return sorted(impact.items())
+
+    def level_counts(self, type_counts):
+        """``{severity_level: findings}`` ordered by severity score, for the doughnut chart."""
+        grouped = OrderedDict()
+        for vulnerability_type, count in type_counts:
+            if vulnerability_type in self.severity:
+                key = self.severity[vulnerability_type][::-1]
+                grouped[key] = grouped.get(key, 0) + count
+        return dashboard.severity_counts(
+            (level, count) for (_, level), count in sorted(grouped.items())
+        )
+
+
+def load(conn):
+    """Read both reference tables from ``conn`` into a ``ReferenceData``."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT vulnerability_type, severity_level, severity_score FROM vulnerability_severity")
+        severity_rows = cursor.fetchall()
+        cursor.execute("SELECT vulnerability_type, recommendations FROM VulnerabilityMitigations ORDER BY id")
+        mitigation_rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return ReferenceData(severity_rows, mitigation_rows)
+
+
+class ReferenceStore:
+    """Hold the current ``ReferenceData`` and hot-reload it in a background thread.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB-API connection. Listeners are called with the new
+    snapshot whenever the contents change.
+    """
+
+    def __init__(self, connection, interval=30.0):
+        self._connection = connection
+        self.interval = interval
+        self._data = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.errors = 0
+
+    @property
+    def ready(self):
+        return self._data is not None
+
+    def add_listener(self, callback):
+        """Call ``callback(data)`` after every change of the reference tables."""
+        self._listeners.append(callback)
+
+    def current(self):
+        """The current snapshot, loading it on first use.
+
+        A lazy first load also starts the reload thread, so servers that
+        never call ``start`` do not keep the first snapshot forever.
+        """
+        data = self._data
+        if data is None:
+            self.reload()
+            self.start()
+            data = self._data
+        return data
+
+    def reload(self):
+        """Re-read the tables; swap in and announce a new snapshot if they changed. Returns True if so."""
+        with self._connection() as conn:
+            data = load(conn)
+        with self._lock:
+            changed = self._data is None or data.version != self._data.version
+            if changed:
+                self._data = data
+                self.reloads += 1
+            self.loaded_at = time.time()
+        if changed:
+            logger.info("reference data loaded (version %s)", data.version)
+            for callback in self._listeners:
+                try:
+                    callback(data)
+                except Exception:
+                    logger.exception("reference data listener failed")
+        return changed
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='reference-data', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        delay = 0 if self._data is None else self.interval
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("reference data reload failed")
+                with self._lock:
+                    self.errors += 1
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            data = self._data
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'version': data.version if data else None,
+                'severities': len(data.severity) if data else 0,
+                'mitigations': len(data.mitigations) if data else 0,
+                'loaded_at': self.loaded_at,
+                'reloads': self.reloads,
+                'errors': self.errors,
+            }
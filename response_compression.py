@@ -0,0 +1,62 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+gzip is always available; brotli is used when the ``brotli`` package is
+installed. Bodies under ``min_size`` are sent as they are: on the count
+endpoints the headers would outweigh the savings.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/plain', 'text/html', 'text/csv')
+
+# Server preference when the client weights encodings equally.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` from an ``Accept-Encoding`` header value."""
+    weights = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate(header, available=ENCODINGS):
+    """Pick the best encoding from ``available`` the client accepts, or ``None`` for identity."""
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding, level=None):
+    """Encode ``body`` (bytes) with ``encoding``."""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6 if level is None else level, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=5 if level is None else level)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
@@ -0,0 +1,194 @@
+"""In-process result cache for the read endpoints.
+
+Entries are keyed by the request plus a data-version token of the tables
+the endpoint reads, so a new scan naturally misses the cache instead of
+needing explicit invalidation. Concurrent misses for the same key are
+coalesced into a single computation (singleflight).
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+
+class CacheEntry:
+    """A rendered response body together with its validator and encoded variants."""
+
+    def __init__(self, body, status=200, mimetype='application/json'):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded = {}
+
+    def encoded(self, encoding, encode):
+        """Return ``body`` encoded with ``encoding``, running ``encode(body)`` only the first time."""
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = encode(self.body)
+        return body
+
+    def has_encoded(self, encoding):
+        """Whether ``encoded(encoding, ...)`` would return without encoding anything."""
+        return encoding in self._encoded
+
+
+class _Call:
+    """A computation in flight that followers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run ``fn`` once for all callers currently asking for ``key``.
+
+        Returns ``(result, shared)`` where ``shared`` tells a follower that
+        it received another caller's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class ResultCache:
+    """Bounded LRU cache with a per-entry TTL and coalesced misses.
+
+    Values are arbitrary, except that ``None`` cannot be cached.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flight = SingleFlight()
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, key):
+        """Return the live entry for ``key`` or ``None``."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, stored_at = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._counters['expired'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def get_or_compute(self, key, compute, cacheable=lambda entry: True):
+        """Return the cached entry for ``key``, computing it at most once concurrently."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        def load():
+            # A previous leader may have filled the entry while we queued up.
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                self._counters['misses'] += 1
+            fresh = compute()
+            if cacheable(fresh):
+                self.put(key, fresh)
+            return fresh
+
+        entry, shared = self._flight.do(key, load)
+        if shared:
+            with self._lock:
+                self._counters['coalesced'] += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, **self._counters}
+
+
+class DataVersion:
+    """Cheap per-table change token, probed at most once every ``ttl`` seconds.
+
+    ``probe`` returns a mapping of table name to a hashable token (for
+    instance ``(count, max_id)``). Concurrent refreshes share one probe.
+    """
+
+    def __init__(self, probe, ttl=1.0):
+        self._probe = probe
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._versions = None
+        self._probed_at = 0.0
+
+    def current(self, tables):
+        """Return a tuple of version tokens for ``tables``, in the given order."""
+        with self._lock:
+            versions = self._versions
+            fresh = versions is not None and time.monotonic() - self._probed_at <= self.ttl
+        if not fresh:
+            versions, _ = self._flight.do('probe', self._refresh)
+        return tuple(versions.get(table) for table in tables)
+
+    def peek(self, tables):
+        """Like ``current`` but never probes: ``None`` when the last probe is older than ``ttl``."""
+        with self._lock:
+            versions = self._versions
+            if versions is None or time.monotonic() - self._probed_at > self.ttl:
+                return None
+        return tuple(versions.get(table) for table in tables)
+
+    def invalidate(self):
+        """Force the next ``current()`` call to probe the database."""
+        with self._lock:
+            self._probed_at = 0.0
+
+    def _refresh(self):
+        versions = dict(self._probe())
+        with self._lock:
+            self._versions = versions
+            self._probed_at = time.monotonic()
+        return versions
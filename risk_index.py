@@ -0,0 +1,226 @@
+"""In-memory per-route risk index.
+
+A route's risk is the sum of ``vulnerability_severity.severity_score`` over
+its findings. The index keeps per-route finding counts by type and a list
+of routes sorted by risk, so "top N" and "routes scoring between A and B"
+are a slice and a bisect, with no query involved. The global code score
+is derived from the same counts.
+
+``sync`` keeps it current without rescanning: it reads only findings above
+the ``vulnerabilities.id`` watermark it has already applied, and re-derives
+scores in memory when the severity table changes. Deletions do not move
+the watermark, so when the caller knows the table's row count (the change
+detector does) and it disagrees, ``sync`` recounts the table grouped by
+route and type and applies the differences.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+import threading
+
+SYNC_BATCH_SIZE = 5000
+
+
+class RiskIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._weights = {}
+        self._counts = {}          # route -> Counter(vulnerability_type -> findings)
+        self._scores = {}          # route -> risk score
+        self._ranked = []          # sorted (-score, route)
+        self._impact = Counter()   # severity_score -> findings
+        self.watermark = None
+        self.total_findings = 0
+        self.total_routes = 0
+
+    @property
+    def ready(self):
+        return self.watermark is not None
+
+    # -- maintenance -------------------------------------------------------
+
+    def _rank(self, route, score):
+        old = self._scores.get(route)
+        if old is not None:
+            i = bisect_left(self._ranked, (-old, route))
+            del self._ranked[i]
+        if score or self._counts.get(route):
+            self._scores[route] = score
+            insort(self._ranked, (-score, route))
+        else:
+            self._scores.pop(route, None)
+
+    def _apply(self, route, vulnerability_type, delta):
+        counts = self._counts.setdefault(route, Counter())
+        counts[vulnerability_type] += delta
+        if counts[vulnerability_type] <= 0:
+            delta -= counts[vulnerability_type]
+            del counts[vulnerability_type]
+        if not counts:
+            del self._counts[route]
+        weight = self._weights.get(vulnerability_type, 0)
+        self._impact[weight] += delta
+        if self._impact[weight] <= 0:
+            del self._impact[weight]
+        self.total_findings += delta
+        self._rank(route, self._scores.get(route, 0) + weight * delta)
+
+    def add(self, route, vulnerability_type, count=1):
+        """Record ``count`` new findings of ``vulnerability_type`` on ``route``."""
+        with self._lock:
+            self._apply(route, vulnerability_type, count)
+
+    def remove(self, route, vulnerability_type, count=1):
+        """Forget ``count`` findings of ``vulnerability_type`` on ``route``."""
+        with self._lock:
+            self._apply(route, vulnerability_type, -count)
+
+    def set_weights(self, weights):
+        """Replace the type -> severity score map and re-derive every score in memory."""
+        with self._lock:
+            if weights == self._weights:
+                return False
+            self._weights = dict(weights)
+            self._impact = Counter()
+            self._ranked = []
+            self._scores = {}
+            for route, counts in self._counts.items():
+                score = 0
+                for vulnerability_type, n in counts.items():
+                    weight = self._weights.get(vulnerability_type, 0)
+                    self._impact[weight] += n
+                    score += weight * n
+                self._scores[route] = score
+                self._ranked.append((-score, route))
+            self._ranked.sort()
+            return True
+
+    def sync(self, conn, expected_count=None, weights=None):
+        """Bring the index up to date with ``conn``.
+
+        The first call (or a count mismatch against ``expected_count``)
+        reconciles against a grouped count of the whole table; later calls
+        only read rows above the watermark. ``weights`` skips reading the
+        severity table. Returns the number of findings the index changed by.
+        """
+        with self._sync_lock:
+            cursor = conn.cursor()
+            try:
+                if weights is None:
+                    cursor.execute("SELECT vulnerability_type, severity_score FROM vulnerability_severity")
+                    weights = dict(cursor.fetchall())
+                self.set_weights(weights)
+                cursor.execute("SELECT COUNT(*) FROM api_routes")
+                self.total_routes = cursor.fetchone()[0]
+
+                if not self.ready:
+                    return self._reconcile(cursor)
+                changed = self._catch_up(cursor)
+                if expected_count is not None and expected_count != self.total_findings:
+                    changed += self._reconcile(cursor)
+                return changed
+            finally:
+                cursor.close()
+
+    def _catch_up(self, cursor):
+        applied = 0
+        while True:
+            cursor.execute(
+                "SELECT id, vulnerability_type, route_name FROM vulnerabilities "
+                "WHERE id > %s ORDER BY id LIMIT %s",
+                (self.watermark or 0, SYNC_BATCH_SIZE)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return applied
+            with self._lock:
+                for _, vulnerability_type, route in rows:
+                    self._apply(route, vulnerability_type, 1)
+                self.watermark = rows[-1][0]
+            applied += len(rows)
+
+    def _reconcile(self, cursor):
+        cursor.execute("""
+            SELECT route_name, vulnerability_type, COUNT(*), MAX(id)
+            FROM vulnerabilities
+            GROUP BY route_name, vulnerability_type
+        """)
+        actual = {}
+        watermark = 0
+        for route, vulnerability_type, n, max_id in cursor.fetchall():
+            actual[(route, vulnerability_type)] = n
+            watermark = max(watermark, max_id)
+
+        changed = 0
+        with self._lock:
+            current = {
+                (route, vulnerability_type): n
+                for route, counts in self._counts.items()
+                for vulnerability_type, n in counts.items()
+            }
+            for key in current.keys() | actual.keys():
+                delta = actual.get(key, 0) - current.get(key, 0)
+                if delta:
+                    self._apply(key[0], key[1], delta)
+                    changed += abs(delta)
+            self.watermark = watermark
+        return changed
+
+    # -- queries -----------------------------------------------------------
+
+    def top(self, limit=10, min_score=None, max_score=None):
+        """Return up to ``limit`` ``(route, score, findings)`` rows, riskiest first.
+
+        ``min_score``/``max_score`` bound the score inclusively.
+        """
+        with self._lock:
+            lo = 0 if max_score is None else bisect_left(self._ranked, (-max_score,))
+            hi = len(self._ranked) if min_score is None else bisect_right(self._ranked, (-min_score, '\U0010ffff'))
+            picked = self._ranked[lo:min(hi, lo + limit)]
+            return [(route, -negative, sum(self._counts[route].values())) for negative, route in picked]
+
+    def route(self, route):
+        """Return ``(score, {type: findings})`` for one route, or ``None`` if it has no findings."""
+        with self._lock:
+            counts = self._counts.get(route)
+            if not counts:
+                return None
+            return self._scores[route], dict(counts)
+
+    def matches(self, vulnerabilities_version, routes_version, weights=None):
+        """Whether the index reflects exactly these ``(count, max id)`` table versions.
+
+        ``weights``, when given, must also equal the severity scores the
+        index was built with. Callers that cache a result under a version
+        token use this to avoid pinning an index that has not caught up yet.
+        """
+        count, max_id = vulnerabilities_version or (None, None)
+        with self._lock:
+            return (
+                self.ready
+                and count == self.total_findings
+                and (max_id or 0) == (self.watermark or 0)
+                and routes_version is not None
+                and routes_version[0] == self.total_routes
+                and (weights is None or weights == self._weights)
+            )
+
+    def routes_with(self, vulnerability_type):
+        """The set of routes with at least one finding of ``vulnerability_type``."""
+        with self._lock:
+            return {route for route, counts in self._counts.items() if vulnerability_type in counts}
+
+    def impact_rows(self):
+        """``(severity_score, findings)`` rows, the input ``dashboard.code_score`` expects."""
+        with self._lock:
+            return sorted(self._impact.items())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'watermark': self.watermark,
+                'routes': len(self._counts),
+                'findings': self.total_findings,
+                'total_routes': self.total_routes,
+            }
@@ -0,0 +1,420 @@
+"""In-memory search index over ``api_routes.path``.
+
+Paths are stored in a trie keyed by lower-cased path segment, which
+answers prefix queries (``/api/us``) and segment wildcards (``/api/*/users``,
+``/admin/**``) by walking only the matching branches. Flask-style parameter
+segments such as ``<int:id>`` match any single segment. For typo-tolerant
+queries every word of every path (``delete-order`` holds ``delete`` and
+``order``) is indexed by its trigrams: a query term looks up the words
+sharing a trigram with it and keeps those within a small edit distance, so
+``/usres`` finds ``/users`` without scanning every route.
+
+``RouteIndex.sync`` loads routes above its id watermark when the table
+only grew, and reloads everything when rows were deleted; ``update``
+re-reads specific paths after an upsert changed their methods or name.
+Vulnerability filters go through the stored ``api_routes.route_name``
+(migration 0005); routes neither a scan nor ``db-backfill-route-names``
+named match no findings.
+
+Methods come from ``api_route_methods`` (migration 0002); a route with no
+rows there, e.g. one written straight to ``api_routes``, keeps the split
+legacy ``methods`` column, and so does every route until that migration runs.
+"""
+from fnmatch import fnmatchcase
+import re
+import threading
+
+import migrations
+
+MATCH_MODES = ('auto', 'prefix', 'wildcard', 'fuzzy')
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+LOAD_BATCH_SIZE = 5000
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+def split_path(path):
+    return [segment for segment in path.lower().strip('/').split('/') if segment]
+
+
+def trigrams(word):
+    padded = f"$${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(term):
+    return 0 if len(term) <= 2 else 1 if len(term) <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _with_methods(query):
+    return (
+        f"SELECT r.id, r.path, r.methods, r.route_name, m.method FROM ({query}) r "
+        "LEFT JOIN api_route_methods m ON m.route_id = r.id ORDER BY r.id, m.method"
+    )
+
+
+def fetch_routes(cursor, query, params=()):
+    """Run ``query``, a ``SELECT id, path, methods, route_name FROM api_routes``,
+    and return one ``(id, path, methods, route_name)`` per route with its
+    normalized methods, falling back to the legacy column as described above.
+    """
+    try:
+        cursor.execute(_with_methods(query), params)
+        rows = cursor.fetchall()
+    except Exception as e:
+        if not migrations.is_missing_table(e):
+            raise
+        cursor.execute(query, params)
+        rows = [tuple(row) + (None,) for row in cursor.fetchall()]
+
+    routes = []
+    for route_id, path, legacy, name, method in rows:
+        if not routes or routes[-1][0] != route_id:
+            routes.append((route_id, path, [], name, legacy))
+        if method is not None:
+            routes[-1][2].append(method)
+    return [(route_id, path, methods or migrations.split_methods(legacy or ''), name)
+            for route_id, path, methods, name, legacy in routes]
+
+
+def _is_param(segment):
+    return segment.startswith('<') and segment.endswith('>')
+
+
+class Route:
+    __slots__ = ('id', 'path', 'methods', 'name', 'segments', 'words')
+
+    def __init__(self, route_id, path, methods, name=None):
+        self.id = route_id
+        self.path = path
+        self.methods = migrations.split_methods(methods) if isinstance(methods, str) else list(methods)
+        self.name = name
+        self.segments = split_path(path)
+        self.words = {word for segment in self.segments if not _is_param(segment)
+                      for word in _WORDS.findall(segment)}
+
+    def as_dict(self, score):
+        return {'id': self.id, 'path': self.path, 'methods': self.methods, 'score': round(score, 3)}
+
+
+class _Node:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class RouteIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._clear()
+        self.version = None
+        self.stale = True
+        self._loaded = False
+
+    def _clear(self):
+        self._routes = {}
+        self._root = _Node()
+        self._words = {}       # word -> route ids
+        self._grams = {}       # trigram -> words
+        self.watermark = 0
+
+    @property
+    def ready(self):
+        return self._loaded
+
+    def __len__(self):
+        return len(self._routes)
+
+    # -- maintenance -------------------------------------------------------
+
+    def add(self, route_id, path, methods, name=None):
+        """Index one route, replacing whatever was stored under its id."""
+        with self._lock:
+            self.remove(route_id)
+            route = Route(route_id, path, methods, name)
+            self._routes[route_id] = route
+            node = self._root
+            for segment in route.segments:
+                node = node.children.setdefault(segment, _Node())
+            node.ids.add(route_id)
+            for word in route.words:
+                ids = self._words.get(word)
+                if ids is None:
+                    ids = self._words[word] = set()
+                    for gram in trigrams(word):
+                        self._grams.setdefault(gram, set()).add(word)
+                ids.add(route_id)
+            self.watermark = max(self.watermark, route_id)
+            return route
+
+    def remove(self, route_id):
+        with self._lock:
+            route = self._routes.pop(route_id, None)
+            if route is None:
+                return False
+            self._prune(self._root, route.segments, route_id)
+            for word in route.words:
+                ids = self._words[word]
+                ids.discard(route_id)
+                if not ids:
+                    del self._words[word]
+                    for gram in trigrams(word):
+                        self._grams[gram].discard(word)
+                        if not self._grams[gram]:
+                            del self._grams[gram]
+            return True
+
+    def _prune(self, node, segments, route_id):
+        if not segments:
+            node.ids.discard(route_id)
+        else:
+            child = node.children.get(segments[0])
+            if child is not None and self._prune(child, segments[1:], route_id):
+                del node.children[segments[0]]
+        return not node.ids and not node.children
+
+    def invalidate(self):
+        """Reload every route on the next ``sync``."""
+        self.stale = True
+
+    def sync(self, conn, version=None):
+        """Bring the index up to date with ``api_routes`` on ``conn``.
+
+        ``version`` is the ``(count, max id)`` token of the table. When the
+        index is fresh and the table only grew, just the new rows are read;
+        otherwise the index is rebuilt. Returns the number of routes read.
+        """
+        with self._sync_lock:
+            if self.stale:
+                loaded = self._load(conn, reload=True)
+            else:
+                loaded = self._load(conn)
+                if version is not None and version[0] != len(self._routes):
+                    loaded = self._load(conn, reload=True)
+            self.version = version
+            self.stale = False
+            self._loaded = True
+            return loaded
+
+    def _load(self, conn, reload=False):
+        routes = {} if reload else None
+        after = 0 if reload else self.watermark
+        read = 0
+        cursor = conn.cursor()
+        try:
+            while True:
+                rows = fetch_routes(
+                    cursor,
+                    "SELECT id, path, methods, route_name FROM api_routes WHERE id > %s ORDER BY id LIMIT %s",
+                    (after, LOAD_BATCH_SIZE)
+                )
+                if not rows:
+                    break
+                if reload:
+                    routes.update((row[0], row) for row in rows)
+                else:
+                    with self._lock:
+                        for row in rows:
+                            self.add(*row)
+                after = rows[-1][0]
+                read += len(rows)
+        finally:
+            cursor.close()
+
+        if reload:
+            with self._lock:
+                self._clear()
+                for row in routes.values():
+                    self.add(*row)
+        return read
+
+    def update(self, conn, paths, batch_size=LOAD_BATCH_SIZE):
+        """Re-read ``paths`` after they were inserted or changed in place."""
+        paths = list(paths)
+        cursor = conn.cursor()
+        try:
+            for i in range(0, len(paths), batch_size):
+                chunk = paths[i:i + batch_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                rows = fetch_routes(
+                    cursor, f"SELECT id, path, methods, route_name FROM api_routes WHERE path IN ({placeholders})", chunk
+                )
+                with self._lock:
+                    for row in rows:
+                        self.add(*row)
+        finally:
+            cursor.close()
+
+    # -- matching ----------------------------------------------------------
+
+    def _children(self, node, segment):
+        child = node.children.get(segment)
+        if child is not None:
+            yield child
+        for key, param in node.children.items():
+            if _is_param(key) and key != segment:
+                yield param
+
+    def _subtree(self, node, out):
+        out.update(node.ids)
+        for child in node.children.values():
+            self._subtree(child, out)
+
+    def prefix(self, query):
+        """``{route id: score}`` for paths starting with ``query``; exact matches score 1."""
+        segments = split_path(query)
+        if not segments:
+            return {route_id: 0.5 for route_id in self._routes}
+        nodes = [self._root]
+        for segment in segments[:-1]:
+            nodes = [child for node in nodes for child in self._children(node, segment)]
+        last = segments[-1]
+        scores = {}
+        for node in nodes:
+            for key, child in node.children.items():
+                if key.startswith(last) or (_is_param(key) and not query.endswith('/')):
+                    matched = set()
+                    self._subtree(child, matched)
+                    exact = key == last and not query.endswith('/')
+                    for route_id in matched:
+                        length = len(self._routes[route_id].path)
+                        score = 1.0 if exact and route_id in child.ids else 0.5 + 0.4 * min(1.0, len(query) / length)
+                        scores[route_id] = max(scores.get(route_id, 0), score)
+        return scores
+
+    def wildcard(self, pattern):
+        """``{route id: score}`` for paths matching ``pattern`` segment by segment.
+
+        ``*`` and ``?`` work within a segment and ``**`` spans any number of
+        segments; parameter segments only match wildcards or themselves. The
+        more literal segments a pattern has, the higher it scores.
+        """
+        segments = split_path(pattern)
+        literal = sum('*' not in s and '?' not in s for s in segments)
+        score = 0.5 + 0.4 * literal / max(1, len(segments))
+        matched = set()
+        self._walk(self._root, segments, matched)
+        return {route_id: score for route_id in matched}
+
+    def _walk(self, node, segments, out):
+        if not segments:
+            out.update(node.ids)
+            return
+        head, rest = segments[0], segments[1:]
+        if head == '**':
+            self._walk(node, rest, out)
+            for child in node.children.values():
+                self._walk(child, segments, out)
+            return
+        for key, child in node.children.items():
+            if fnmatchcase(key, head):
+                self._walk(child, rest, out)
+
+    def fuzzy(self, query):
+        """``{route id: score}`` for routes with a word close to every term of ``query``."""
+        scores = None
+        for term in _WORDS.findall(query.lower()):
+            term_scores = {}
+            for word, similarity in self._similar_words(term):
+                for route_id in self._words[word]:
+                    if similarity > term_scores.get(route_id, 0):
+                        term_scores[route_id] = similarity
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {route_id: scores[route_id] + s for route_id, s in term_scores.items() if route_id in scores}
+            if not scores:
+                return {}
+        terms = len(_WORDS.findall(query.lower()))
+        return {route_id: 0.8 * total / terms for route_id, total in (scores or {}).items()}
+
+    def _similar_words(self, term):
+        limit = max_typos(term)
+        grams = trigrams(term)
+        # Each edit destroys at most three trigrams; a word the term only
+        # prefixes also lacks the term's closing trigram.
+        needed = max(1, len(grams) - 3 * limit - 1)
+        shared = {}
+        for gram in grams:
+            for word in self._grams.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        prefixes = {}
+        for word, count in shared.items():
+            if count < needed:
+                continue
+            if word == term:
+                yield word, 1.0
+                continue
+            distance = edit_distance(term, word, limit)
+            if len(word) > len(term):
+                # Also accept words the user has not finished typing, at a small discount.
+                head = word[:len(term)]
+                if head not in prefixes:
+                    prefixes[head] = edit_distance(term, head, limit)
+                distance = min(distance, prefixes[head] + 0.5)
+            if distance <= limit + 0.5:
+                yield word, 1.0 - distance / (len(term) + 1)
+
+    def search(self, query, match='auto', methods=None, route_names=None, offset=0, limit=DEFAULT_LIMIT):
+        """Rank routes against ``query`` and return ``(total, page)``.
+
+        ``match`` is one of ``MATCH_MODES``; ``auto`` uses wildcards when the
+        query has ``*`` or ``?``, a prefix search otherwise, and falls back to
+        fuzzy matching when the prefix finds nothing. ``methods`` keeps routes
+        accepting any of those HTTP methods and ``route_names`` (a set of
+        ``vulnerabilities.route_name`` values) routes with those findings.
+        """
+        query = (query or '').strip()
+        with self._lock:
+            if match == 'wildcard' or (match == 'auto' and ('*' in query or '?' in query)):
+                scores = self.wildcard(query)
+            elif match == 'fuzzy':
+                scores = self.fuzzy(query) if query else self.prefix('')
+            else:
+                scores = self.prefix(query)
+                if not scores and match == 'auto':
+                    scores = self.fuzzy(query)
+
+            wanted = {method.upper() for method in methods} if methods else None
+            ranked = []
+            for route_id, score in scores.items():
+                route = self._routes[route_id]
+                if wanted is not None and wanted.isdisjoint(route.methods):
+                    continue
+                if route_names is not None and route.name not in route_names:
+                    continue
+                ranked.append((-score, len(route.path), route.path, route))
+            ranked.sort(key=lambda item: item[:3])
+            return len(ranked), [route.as_dict(-negative) for negative, _, _, route in ranked[offset:offset + limit]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'routes': len(self._routes),
+                'words': len(self._words),
+                'trigrams': len(self._grams),
+                'watermark': self.watermark,
+            }
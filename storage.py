@@ -0,0 +1,308 @@
+"""Storage engines serving the read endpoints.
+
+The views and helpers only need a DB-API connection that speaks the
+mysql-connector dialect used throughout the app (``%s`` placeholders,
+``cursor(dictionary=True)``, ``start_transaction``/``rollback``), so an
+engine is simply something whose ``connection()`` yields one. The MySQL
+engine is ``app.db_connection``. ``SnapshotEngine`` keeps a local SQLite
+copy of the schema tables, refreshed from a source connection on an
+interval or on demand, and serves reads in-process.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The tables of api.sql with the SQLite column definitions used for the snapshot.
+TABLES = {
+    'api_routes': (
+        ('id', 'INTEGER PRIMARY KEY'),
+        ('path', 'TEXT NOT NULL'),
+        ('methods', 'TEXT NOT NULL'),
+        ('route_name', 'TEXT'),
+    ),
+    'api_route_methods': (
+        ('route_id', 'INTEGER NOT NULL'),
+        ('method', 'TEXT NOT NULL'),
+    ),
+    'vulnerabilities': (
+        ('id', 'INTEGER PRIMARY KEY'),
+        ('vulnerability_type', 'TEXT NOT NULL'),
+        ('route_name', 'TEXT NOT NULL'),
+    ),
+    'vulnerability_severity': (
+        ('id', 'INTEGER PRIMARY KEY'),
+        ('vulnerability_type', 'TEXT NOT NULL'),
+        ('severity_level', 'TEXT NOT NULL'),
+        ('severity_score', 'INTEGER NOT NULL'),
+    ),
+    'live_graph': (
+        ('id', 'INTEGER PRIMARY KEY'),
+        ('vulnerabilities', 'INTEGER NOT NULL'),
+    ),
+    'VulnerabilityMitigations': (
+        ('id', 'INTEGER PRIMARY KEY'),
+        ('vulnerability_type', 'TEXT NOT NULL'),
+        ('recommendations', 'TEXT NOT NULL'),
+    ),
+}
+
+INDEXES = (
+    ('idx_vulnerabilities_route_name', 'vulnerabilities', 'route_name'),
+    ('idx_api_routes_route_name', 'api_routes', 'route_name'),
+    ('idx_api_route_methods_route', 'api_route_methods', 'route_id'),
+    ('idx_vulnerabilities_type', 'vulnerabilities', 'vulnerability_type'),
+    ('idx_severity_type', 'vulnerability_severity', 'vulnerability_type'),
+)
+
+COPY_BATCH_SIZE = 5000
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """Cursor accepting mysql-connector ``%s`` placeholders on a SQLite connection."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace('%s', '?'), tuple(params or ()))
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(query.replace('%s', '?'), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class SQLiteConnection:
+    """A SQLite connection with the subset of the mysql-connector API the app uses."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        cursor = self._conn.cursor()
+        if dictionary:
+            cursor.row_factory = _dict_row
+        return SQLiteCursor(cursor)
+
+    def start_transaction(self, consistent_snapshot=False, readonly=False, **kwargs):
+        self._conn.execute("BEGIN")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def invalidate(self):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def connect_sqlite(path, readonly=False):
+    """Open ``path`` as a ``SQLiteConnection`` usable from any thread."""
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False, isolation_level=None)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    return SQLiteConnection(conn)
+
+
+def create_schema(conn):
+    """Create the snapshot tables and lookup indexes on an empty SQLite database."""
+    cursor = conn.cursor()
+    for table, columns in TABLES.items():
+        definition = ', '.join(f"{name} {kind}" for name, kind in columns)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS `{table}` ({definition})")
+    for name, table, column in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON `{table}` ({column})")
+    cursor.close()
+
+
+def copy_table(source, target, table, batch_size=COPY_BATCH_SIZE):
+    """Copy every row of ``table`` from ``source`` into ``target``; returns the row count."""
+    columns = [name for name, _ in TABLES[table]]
+    column_list = ', '.join(columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    read = source.cursor()
+    write = target.cursor()
+    copied = 0
+    try:
+        read.execute(f"SELECT {column_list} FROM `{table}`")
+        while True:
+            rows = read.fetchmany(batch_size)
+            if not rows:
+                break
+            write.executemany(f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders})", rows)
+            copied += len(rows)
+    finally:
+        read.close()
+        write.close()
+    return copied
+
+
+class SnapshotEngine:
+    """Serve reads from a SQLite file copied from ``source``.
+
+    ``source`` is a zero-argument callable returning a context manager that
+    yields a connection (``app.db_connection``, or a ``connect_sqlite`` file
+    for an offline copy). A refresh copies all ``TABLES`` into a new file
+    and atomically renames it over ``path``; readers already running keep
+    the file they opened, later checkouts see the new one. With ``reuse``
+    an existing file at ``path`` is served until the first refresh succeeds,
+    so a snapshot left by an earlier run keeps the dashboards up while MySQL
+    is away; otherwise nothing is read before this engine has written it.
+    A ``source`` of ``None`` serves the file at ``path`` as it is.
+    """
+
+    def __init__(self, source, path, interval=60.0, reuse=False):
+        self._source = source
+        self.path = path
+        self.interval = interval
+        self.generation = 1 if reuse and os.path.exists(path) else 0
+        self.refreshed_at = None
+        self._listeners = []
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_report = None
+        self._counters = {'refreshes': 0, 'errors': 0, 'checkouts': 0}
+
+    @property
+    def ready(self):
+        return self.generation > 0
+
+    def add_listener(self, callback):
+        """Call ``callback(report)`` after every successful refresh."""
+        self._listeners.append(callback)
+
+    @contextmanager
+    def connection(self):
+        """Yield a read-only connection on the current snapshot."""
+        conn = connect_sqlite(self.path, readonly=True)
+        with self._lock:
+            self._counters['checkouts'] += 1
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Copy the source tables into a fresh snapshot file and swap it in."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            # Scan results are not public either; keep the directory and file private to this user.
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+            os.close(os.open(tmp_path, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600))
+            target = connect_sqlite(tmp_path)
+            try:
+                target.start_transaction()
+                create_schema(target)
+                with self._source() as source:
+                    rows = {table: copy_table(source, target, table) for table in TABLES}
+                target.commit()
+            except BaseException:
+                target.close()
+                os.unlink(tmp_path)
+                raise
+            target.close()
+            os.replace(tmp_path, self.path)
+
+            report = {'rows': rows, 'seconds': time.perf_counter() - started}
+            with self._lock:
+                self.generation += 1
+                self.refreshed_at = time.time()
+                self._counters['refreshes'] += 1
+                self._last_report = report
+
+        for callback in self._listeners:
+            callback(report)
+        return report
+
+    def request_refresh(self):
+        """Ask the background thread to refresh now rather than at the next interval."""
+        self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='storage-snapshot', daemon=True)
+                self._thread.start()
+
+    def ensure_started(self):
+        """Start the refresher on first use; a no-op once started or without a source."""
+        if self._thread is None and self._source is not None:
+            self.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("snapshot refresh failed")
+                with self._lock:
+                    self._counters['errors'] += 1
+            self._wake.wait(self.interval)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'ready': self.ready,
+                'generation': self.generation,
+                'interval': self.interval,
+                'refreshed_at': self.refreshed_at,
+                'age': None if self.refreshed_at is None else time.time() - self.refreshed_at,
+                'last_refresh': self._last_report,
+                **self._counters,
+            }
@@ -0,0 +1,18 @@
+# tests/conftest.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import mysql.connector
+import pytest
+from unittest.mock import patch
+import app as app_module
+
+
+@pytest.fixture(autouse=True)
+def reference_store_offline():
+    """Keep the app's reference store from loading out of mocked connections; views then read reference tables with SQL.
+
+    Tests of the store patch ``app.reference`` with their own.
+    """
+    with patch.object(app_module.reference, 'current', side_effect=mysql.connector.InterfaceError("no reference data in tests")):
+        yield
@@ -4,12 +4,15 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import pytest
 from unittest.mock import patch, MagicMock
+import app as app_module
 from app import app
 from flask import json
 import bcrypt
+import mysql.connector
 @pytest.fixture
 def client():
     app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
     with app.test_client() as client:
         yield client
 
@@ -58,8 +61,8 @@ def test_login_failure(client):
 def test_get_routes(client):
     with patch('app.get_db_connection') as mocked_db:
         mock_routes = [
-            {'path': '/api/login', 'methods': 'POST'},
-            {'path': '/api/routes', 'methods': 'GET'}
+            (1, '/api/login', 'POST', None, 'POST'),
+            (2, '/api/routes', 'GET', None, 'GET')
         ]
         mocked_conn = mock_db_connection(mock_routes)
         mocked_db.return_value = mocked_conn
@@ -189,3 +192,172 @@ def test_get_donought_chart(client):
             'High': 3,
             'Medium': 5
         }
+
+
+def test_get_dashboard(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.side_effect = [
+            (5, 3),  # total_apis, total_vulnerabilities
+        ]
+        mock_cursor.fetchall.side_effect = [
+            [('High', 3, 1), ('Critical', 4, 2)],  # severity level/score/count
+            [('SQL Injection', 4), ('SSRF', 4)],  # vulnerability_severity
+            [(12, 3), (11, 2)],  # live_graph, newest first
+        ]
+        mocked_conn.cursor.return_value = mock_cursor
+        mocked_db.return_value = mocked_conn
+
+        response = client.get('/api/dashboard')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {
+            'total_apis': 5,
+            'total_vulnerabilities': 3,
+            'code_score': "78.00",
+            'donought_chart': {'High': 1, 'Critical': 2},
+            'severity': {'SQL Injection': 4, 'SSRF': 4},
+            'timeline': [[11, 2], [12, 3]],
+        }
+        mocked_conn.start_transaction.assert_called_once_with(consistent_snapshot=True, readonly=True)
+        assert mock_cursor.execute.call_count == 4
+
+
+def test_get_dashboard_sections(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn = mock_db_connection((7, 2))
+        mocked_db.return_value = mocked_conn
+
+        response = client.get('/api/dashboard?sections=total_apis,total_vulnerabilities')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {'total_apis': 7, 'total_vulnerabilities': 2}
+        assert mocked_conn.cursor.return_value.execute.call_count == 1
+
+
+def test_get_dashboard_unknown_section(client):
+    response = client.get('/api/dashboard?sections=total_apis,bogus')
+
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['msg']
+
+
+def test_get_routes_keyset_page(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mock_routes = [
+            (4, '/login', 'POST', None, 'POST'),
+            (7, '/search', 'GET,POST', None, 'GET'),
+            (7, '/search', 'GET,POST', None, 'POST'),
+            (9, '/admin', 'GET', None, 'GET'),
+        ]
+        mocked_conn = mock_db_connection(mock_routes)
+        mocked_db.return_value = mocked_conn
+
+        response = client.get('/api/routes?limit=2&after=3')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['next_after'] == 7
+        assert data['routes'] == [
+            {'id': 4, 'path': '/login', 'methods': ['POST']},
+            {'id': 7, 'path': '/search', 'methods': ['GET', 'POST']},
+        ]
+        mocked_conn.cursor.return_value.execute.assert_called_once_with(
+            "SELECT r.id, r.path, r.methods, r.route_name, m.method FROM "
+            "(SELECT id, path, methods, route_name FROM api_routes WHERE id > %s ORDER BY id LIMIT %s) r "
+            "LEFT JOIN api_route_methods m ON m.route_id = r.id ORDER BY r.id, m.method", (3, 3)
+        )
+
+
+def test_get_routes_fall_back_to_legacy_methods(client):
+    with patch('app.get_db_connection') as mocked_db:
+        # Route 2 was written straight to api_routes and has no api_route_methods rows.
+        mocked_db.return_value = mock_db_connection([
+            (1, '/api/login', 'POST', None, 'POST'),
+            (2, '/api/legacy', 'get, put', None, None),
+        ])
+
+        response = client.get('/api/routes')
+
+        assert response.get_json() == [
+            {'path': '/api/login', 'methods': ['POST']},
+            {'path': '/api/legacy', 'methods': ['GET', 'PUT']},
+        ]
+
+
+def test_get_routes_before_the_methods_migration(client):
+    missing = mysql.connector.ProgrammingError(msg="Table 'api_route_methods' doesn't exist", errno=1146)
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn = mock_db_connection([(1, '/api/login', 'GET,POST', None)])
+        mocked_conn.cursor.return_value.execute.side_effect = [missing, None]
+        mocked_db.return_value = mocked_conn
+
+        response = client.get('/api/routes?limit=5')
+
+        assert response.status_code == 200
+        assert response.get_json()['routes'] == [{'id': 1, 'path': '/api/login', 'methods': ['GET', 'POST']}]
+        mocked_conn.cursor.return_value.execute.assert_called_with(
+            "SELECT id, path, methods, route_name FROM api_routes WHERE id > %s ORDER BY id LIMIT %s", (0, 6)
+        )
+
+
+def test_get_routes_rejects_bad_page_args(client):
+    assert client.get('/api/routes?limit=0').status_code == 400
+    assert client.get('/api/routes?limit=5000').status_code == 400
+    assert client.get('/api/routes?after=abc').status_code == 400
+
+
+def test_get_vulnerabilities_last_page(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mock_vulnerabilities = [
+            {'id': 1, 'vulnerability_type': 'SQL Injection', 'route_name': 'login'},
+            {'id': 2, 'vulnerability_type': 'SQL Injection', 'route_name': 'search'},
+        ]
+        mocked_db.return_value = mock_db_connection(mock_vulnerabilities)
+
+        response = client.get('/api/vulnerabilities?limit=10')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {'vulnerabilities': {'SQL Injection': ['login', 'search']}, 'next_after': None}
+
+
+def test_get_vulnerabilities_ndjson_stream(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = [
+            [{'id': 1, 'vulnerability_type': 'SSRF', 'route_name': 'fetch'}],
+            [{'id': 2, 'vulnerability_type': 'XSS', 'route_name': 'comments'}],
+            [],
+        ]
+        mocked_conn.cursor.return_value = mock_cursor
+        mocked_db.return_value = mocked_conn
+
+        response = client.get('/api/vulnerabilities?format=ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert [json.loads(line) for line in lines] == [
+            {'id': 1, 'vulnerability_type': 'SSRF', 'route_name': 'fetch'},
+            {'id': 2, 'vulnerability_type': 'XSS', 'route_name': 'comments'},
+        ]
+        mock_cursor.fetchall.assert_not_called()
+        mocked_conn.close.assert_called_once()
+
+
+def test_data_versions_before_the_methods_migration():
+    missing = mysql.connector.ProgrammingError(msg="Table 'api_route_methods' doesn't exist", errno=1146)
+    with patch('app.get_db_connection') as mocked_db, patch('app._reference', return_value=None):
+        mocked_conn = mock_db_connection([('api_routes', 2, 2)])
+        mocked_conn.cursor.return_value.execute.side_effect = [missing, None]
+        mocked_db.return_value = mocked_conn
+
+        versions = app_module._probe_data_versions()
+
+    assert versions == {'api_routes': (2, 2), 'api_route_methods': None}
+    assert 'api_route_methods' not in mocked_conn.cursor.return_value.execute.call_args[0][0]
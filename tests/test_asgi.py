@@ -0,0 +1,217 @@
+# tests/test_asgi.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import json
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+import app as app_module
+from app import app
+import asgi
+from asgi import application
+from flask import Response
+from live_stream import Broadcaster
+from urllib.parse import urlsplit
+
+# Re-run the whole WSGI suite through the ASGI bridge: behaviour must be identical.
+from test_app import *  # noqa: F401,F403
+
+
+@pytest.fixture(autouse=True)
+def testing_config():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+
+
+def mock_db_connection(rows):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = rows
+    mock_cursor.fetchone.return_value = rows
+    mock_conn.cursor.return_value = mock_cursor
+    return mock_conn
+
+
+def call(method, path, query=b'', body=b'', headers=()):
+    """Drive one HTTP request through the ASGI app; returns (status, headers, body)."""
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query,
+        'headers': [(b'host', b'testserver')] + list(headers),
+        'client': ('127.0.0.1', 5000), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+class AsgiClient:
+    """Minimal stand-in for ``app.test_client()`` that goes through ``application``."""
+
+    def open(self, method, url, json=None, headers=None):
+        parts = urlsplit(url)
+        body = b''
+        extra = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()]
+        if json is not None:
+            body = app.json.dumps(json).encode('utf-8')
+            extra.append((b'content-type', b'application/json'))
+        status, response_headers, data = call(method, parts.path, parts.query.encode(), body, extra)
+        return Response(data, status=status, headers=[(k.decode(), v.decode()) for k, v in response_headers.items()])
+
+    def get(self, url, **kwargs):
+        return self.open('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.open('POST', url, **kwargs)
+
+
+@pytest.fixture
+def client():
+    yield AsgiClient()
+
+
+def test_bridges_get_to_flask_view():
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection([(1, '/api/login', 'POST', None, 'POST')])
+
+        status, headers, body = call('GET', '/api/routes')
+
+    assert status == 200
+    assert headers[b'content-type'] == b'application/json'
+    assert json.loads(body) == [{'path': '/api/login', 'methods': ['POST']}]
+
+
+def test_bridges_post_body_and_errors():
+    status, _, body = call('POST', '/api/login', body=b'{}', headers=[(b'content-type', b'application/json')])
+
+    assert status == 400
+    assert 'msg' in json.loads(body)
+
+
+def test_streams_ndjson_chunks_and_releases_connection():
+    cursor = MagicMock()
+    cursor.fetchmany.side_effect = [[{'id': 1, 'vulnerability_type': 'SQL Injection', 'route_name': 'login'}],
+                                  [{'id': 2, 'vulnerability_type': 'SSRF', 'route_name': 'fetch'}], []]
+    conn = MagicMock()
+    conn.cursor.return_value = cursor
+    with patch('app.get_db_connection', return_value=conn):
+        status, headers, body = call('GET', '/api/vulnerabilities', query=b'format=ndjson')
+
+    assert status == 200
+    assert headers[b'content-type'] == b'application/x-ndjson'
+    assert [json.loads(line)['id'] for line in body.splitlines()] == [1, 2]
+    conn.close.assert_called_once()
+
+
+def test_cache_hits_are_answered_without_the_executor():
+    app.config['RESULT_CACHE_ENABLED'] = True
+    app_module.result_cache.clear()
+    try:
+        with patch.object(app_module.data_versions, 'current', return_value=('v1',)), \
+                patch.object(app_module.data_versions, 'peek', return_value=('v1',)), \
+                patch('app.get_db_connection') as mocked_db:
+            mocked_db.return_value = mock_db_connection((3,))
+            miss = call('GET', '/api/total_apis')
+            with patch('asgi.executor') as executor:
+                hit = call('GET', '/api/total_apis')
+            with patch.object(app_module.data_versions, 'peek', return_value=None):
+                stale = call('GET', '/api/total_apis')
+    finally:
+        app.config['RESULT_CACHE_ENABLED'] = False
+        app_module.result_cache.clear()
+
+    assert hit == miss == stale
+    assert json.loads(hit[2]) == 3
+    executor.submit.assert_not_called()
+    assert mocked_db.call_count == 1
+
+
+def test_cache_hits_needing_compression_go_to_the_executor():
+    routes = [(n, f'/api/item{n}', 'GET', None, 'GET') for n in range(200)]
+    gzip = [(b'accept-encoding', b'gzip')]
+    app.config['RESULT_CACHE_ENABLED'] = True
+    app_module.result_cache.clear()
+    try:
+        with patch.object(app_module.data_versions, 'current', return_value=('v1',)), \
+                patch.object(app_module.data_versions, 'peek', return_value=('v1',)), \
+                patch('app.get_db_connection') as mocked_db:
+            mocked_db.return_value = mock_db_connection(routes)
+            plain = call('GET', '/api/routes')
+            with patch('asgi.executor', wraps=asgi.executor) as executor:
+                first = call('GET', '/api/routes', headers=gzip)
+                encoded_submits = executor.submit.call_count
+                second = call('GET', '/api/routes', headers=gzip)
+    finally:
+        app.config['RESULT_CACHE_ENABLED'] = False
+        app_module.result_cache.clear()
+
+    assert plain[1].get(b'content-encoding') is None
+    assert first[1][b'content-encoding'] == second[1][b'content-encoding'] == b'gzip'
+    assert first[2] == second[2]
+    # Only the first gzip request compresses, and it does so off the event loop.
+    assert encoded_submits >= 1
+    assert executor.submit.call_count == encoded_submits
+    assert mocked_db.call_count == 1
+
+
+def test_lifespan_shutdown_stops_jobs_off_the_loop():
+    messages = [{'type': 'lifespan.shutdown'}]
+    sent = []
+    stopped_on = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    def stop_jobs():
+        stopped_on.append(threading.current_thread())
+
+    with patch('asgi.stop_background_jobs', side_effect=stop_jobs), patch('asgi.executor'):
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+
+    assert sent == [{'type': 'lifespan.shutdown.complete'}]
+    assert stopped_on and stopped_on[0] is not threading.main_thread()
+
+
+def test_event_stream_is_served_on_the_loop():
+    broadcaster = Broadcaster()
+    broadcaster.publish('stats', {'total_apis': 3})
+    feed = MagicMock()
+    feed.subscribe.side_effect = broadcaster.subscribe
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/stream', 'query_string': b'', 'headers': []}
+    sent = []
+
+    async def run():
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if b'event: stats' in message.get('body', b''):
+                disconnected.set()
+
+        await asyncio.wait_for(application(scope, receive, send), 2)
+
+    with patch.object(app_module, 'live_feed', feed):
+        asyncio.run(run())
+
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in sent[0]['headers']
+    assert b'retry:' in sent[1]['body']
+    assert b'"total_apis": 3' in sent[2]['body']
+    assert broadcaster.subscriber_count == 0
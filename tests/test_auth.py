@@ -0,0 +1,152 @@
+# tests/test_auth.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import time
+import bcrypt
+import pytest
+from unittest.mock import patch, MagicMock
+import app as app_module
+from app import app
+from auth import CredentialVerifier, TokenBucketLimiter, VerifierBusy
+
+HASHED = bcrypt.hashpw(b'testpassword', bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app_module.credential_cache.clear()
+    app_module.login_ip_limiter.reset()
+    app_module.login_user_limiter.reset()
+    with app.test_client() as client:
+        yield client
+    app_module.credential_cache.clear()
+    app_module.login_ip_limiter.reset()
+    app_module.login_user_limiter.reset()
+
+
+def mock_db_connection(mock_cursor_result=None):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = mock_cursor_result
+    mock_conn.cursor.return_value = mock_cursor
+    return mock_conn
+
+
+def test_token_bucket_refuses_after_burst_and_refills():
+    limiter = TokenBucketLimiter(capacity=2, refill_rate=50)
+
+    assert limiter.allow('ip')[0]
+    assert limiter.allow('ip')[0]
+    allowed, retry_after = limiter.allow('ip')
+    assert not allowed
+    assert 0 < retry_after <= 0.02
+
+    time.sleep(0.03)
+    assert limiter.allow('ip')[0]
+
+
+def test_token_bucket_tracks_bounded_number_of_keys():
+    limiter = TokenBucketLimiter(capacity=1, refill_rate=0.001, max_keys=2)
+    limiter.allow('a')
+    limiter.allow('b')
+    limiter.allow('c')
+
+    # 'a' was evicted, so it starts again with a full bucket.
+    assert limiter.allow('a')[0]
+
+
+def test_verifier_checks_password():
+    verifier = CredentialVerifier(max_workers=1, max_queue=0)
+
+    assert verifier.verify('testpassword', HASHED) is True
+    assert verifier.verify('nope', HASHED) is False
+    assert verifier.stats()['in_flight'] == 0
+
+
+def test_verifier_rejects_when_queue_is_full():
+    verifier = CredentialVerifier(max_workers=1, max_queue=0)
+    release = threading.Event()
+    with patch('auth.bcrypt.checkpw', side_effect=lambda *args: release.wait(2)):
+        worker = threading.Thread(target=verifier.verify, args=('x', HASHED))
+        worker.start()
+        time.sleep(0.05)
+
+        with pytest.raises(VerifierBusy):
+            verifier.verify('x', HASHED)
+
+        release.set()
+        worker.join()
+    assert verifier.stats()['rejected'] == 1
+
+
+def test_verifier_times_out_as_busy():
+    verifier = CredentialVerifier(max_workers=1, max_queue=0)
+    release = threading.Event()
+    with patch('auth.bcrypt.checkpw', side_effect=lambda *args: release.wait(2)):
+        with pytest.raises(VerifierBusy):
+            verifier.verify('x', HASHED, timeout=0.05)
+        release.set()
+    verifier.shutdown()
+
+
+def test_login_caches_password_hash(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection({'hashed_password': HASHED})
+
+        for _ in range(2):
+            response = client.post('/api/login', json={'username': 'testuser', 'password': 'testpassword'})
+            assert response.status_code == 200
+
+        assert mocked_db.call_count == 1
+
+
+def test_login_burst_is_throttled_before_database(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection(None)
+
+        statuses = [
+            client.post('/api/login', json={'username': 'victim', 'password': 'guess'}).status_code
+            for _ in range(app_module.login_user_limiter.capacity + 1)
+        ]
+
+        assert statuses[-1] == 429
+        assert set(statuses[:-1]) == {401}
+        assert mocked_db.call_count == 1
+
+
+def test_login_returns_503_when_verifier_is_busy(client):
+    with patch('app.get_db_connection') as mocked_db, \
+            patch.object(app_module.password_verifier, 'verify', side_effect=VerifierBusy()):
+        mocked_db.return_value = mock_db_connection({'hashed_password': HASHED})
+
+        response = client.post('/api/login', json={'username': 'testuser', 'password': 'testpassword'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+
+def test_ip_limit_keys_on_forwarded_address_behind_trusted_proxy(client):
+    app.config['TRUSTED_PROXIES'] = 1
+    try:
+        with patch('app.get_db_connection') as mocked_db, \
+                patch.object(app_module.login_ip_limiter, 'allow', return_value=(True, 0)) as allow:
+            mocked_db.return_value = mock_db_connection(None)
+            client.post('/api/login', json={'username': 'a', 'password': 'b'},
+                        headers={'X-Forwarded-For': '10.0.0.1, 203.0.113.7'})
+            client.post('/api/login', json={'username': 'a', 'password': 'b'})
+    finally:
+        app.config['TRUSTED_PROXIES'] = 0
+
+    assert [c.args[0] for c in allow.call_args_list] == ['203.0.113.7', '127.0.0.1']
+
+
+def test_forwarded_address_is_ignored_without_trusted_proxies(client):
+    with patch('app.get_db_connection') as mocked_db, \
+            patch.object(app_module.login_ip_limiter, 'allow', return_value=(True, 0)) as allow:
+        mocked_db.return_value = mock_db_connection(None)
+        client.post('/api/login', json={'username': 'a', 'password': 'b'}, headers={'X-Forwarded-For': '203.0.113.7'})
+
+    assert allow.call_args.args[0] == '127.0.0.1'
@@ -0,0 +1,57 @@
+# tests/test_benchmarks.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import json
+from unittest.mock import patch
+import app as app_module
+import run
+import storage
+import synthetic
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+
+    assert run.percentile(values, 50) == 50
+    assert run.percentile(values, 95) == 95
+    assert run.percentile(values, 99) == 99
+    assert run.percentile([], 50) is None
+
+
+def test_generator_matches_requested_scale(tmp_path):
+    path = str(tmp_path / 'bench.db')
+
+    counts = synthetic.seed_sqlite(path, routes=50, findings=500, points=10)
+
+    assert counts['api_routes'] == 50
+    assert counts['vulnerabilities'] == 500
+    assert counts['vulnerability_severity'] == len(synthetic.load_severities()) == 11
+    with storage.connect_sqlite(path, readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM vulnerabilities v
+            JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+        """)
+        assert cursor.fetchone() == (500,)
+
+
+def test_run_writes_report(tmp_path):
+    output = tmp_path / 'report.json'
+    config = dict(app_module.app.config)
+    with patch.object(app_module, 'snapshot'):
+        run.main([
+            '--db', str(tmp_path / 'bench.db'), '--routes', '20', '--findings', '200',
+            '--requests', '10', '--concurrency', '2', '--output', str(output),
+            '--endpoints', '/api/total_apis,/api/vulnerabilities/{route}',
+        ])
+    app_module.app.config.update(config)
+
+    report = json.loads(output.read_text())
+    assert report['meta']['findings'] == 200
+    result = report['results']['/api/total_apis']
+    assert result['requests'] == 10
+    assert result['errors'] == 0
+    assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
+    assert result['peak_rss_mb'] > 0
@@ -0,0 +1,125 @@
+# tests/test_change_detector.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+from change_detector import ChangeDetector
+
+
+def make_detector(fetchone_results, **kwargs):
+    conn = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = fetchone_results
+    conn.cursor.return_value = cursor
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    kwargs.setdefault('max_delay', 0)
+    return ChangeDetector(connection, **kwargs), conn, cursor
+
+
+def executed(cursor):
+    return [call.args[0] for call in cursor.execute.call_args_list]
+
+
+def test_first_tick_counts_and_records_point():
+    detector, conn, cursor = make_detector([(10,), (7,)])
+
+    assert detector.tick() is True
+    assert detector.count == 7
+    cursor.executemany.assert_called_once_with(
+        "INSERT INTO live_graph (vulnerabilities) VALUES (%s)", [(7,)]
+    )
+    conn.commit.assert_called_once()
+
+
+def test_idle_tick_only_reads_watermark_and_backs_off():
+    detector, _, cursor = make_detector([(10,), (7,), (10,)], min_interval=1, backoff=2)
+    detector.tick()
+    cursor.execute.reset_mock()
+
+    assert detector.tick() is False
+    assert executed(cursor) == ["SELECT MAX(id) FROM vulnerabilities"]
+    assert detector.interval == 2
+
+
+def test_new_rows_are_counted_above_watermark_only():
+    detector, _, cursor = make_detector([(10,), (7,), (13,), (3,)])
+    detector.tick()
+    cursor.execute.reset_mock()
+
+    assert detector.tick() is True
+    assert detector.count == 10
+    cursor.execute.assert_called_with("SELECT COUNT(*) FROM vulnerabilities WHERE id > %s", (10,))
+
+
+def test_lower_watermark_triggers_full_recount():
+    detector, _, cursor = make_detector([(10,), (7,), (9,), (6,)])
+    detector.tick()
+
+    assert detector.tick() is True
+    assert detector.count == 6
+    cursor.execute.assert_called_with("SELECT COUNT(*) FROM vulnerabilities")
+
+
+def test_points_are_batched_until_due():
+    detector, _, cursor = make_detector([(10,), (7,), (12,), (2,)], batch_size=2, max_delay=60)
+
+    detector.tick()
+    cursor.executemany.assert_not_called()
+    detector.tick()
+
+    cursor.executemany.assert_called_once_with(
+        "INSERT INTO live_graph (vulnerabilities) VALUES (%s)", [(7,), (9,)]
+    )
+
+
+def test_listeners_are_notified_on_change():
+    detector, _, _ = make_detector([(10,), (7,), (10,)])
+    listener = MagicMock()
+    detector.add_listener(listener)
+
+    detector.tick()
+    detector.tick()
+
+    listener.assert_called_once_with(7)
+    stats = detector.stats()
+    assert stats['changes'] == 1
+    assert stats['probes'] == 2
+
+
+def test_timestamps_record_observation_time():
+    detector, _, cursor = make_detector([(10,), (7,)], timestamps=True)
+    with patch('change_detector.time.time', return_value=1700000000.5):
+        detector.tick()
+
+    cursor.executemany.assert_called_once_with(
+        "INSERT INTO live_graph (vulnerabilities, created_at) VALUES (%s, FROM_UNIXTIME(%s))",
+        [(7, 1700000000.5)],
+    )
+
+
+def test_only_the_lock_holder_writes_points():
+    # IS_USED_LOCK and GET_LOCK both say no, then MAX(id) and COUNT(*).
+    detector, conn, cursor = make_detector([(0,), (0,), (10,), (7,)], lock_name='live_graph_writer')
+    listener = MagicMock()
+    detector.add_listener(listener)
+
+    assert detector.tick() is True
+
+    assert detector.writer is False
+    cursor.executemany.assert_not_called()
+    listener.assert_called_once_with(7)
+    assert ("SELECT GET_LOCK(%s, 0)", ('live_graph_writer',)) in [c.args for c in cursor.execute.call_args_list]
+
+
+def test_lock_holder_records_points():
+    detector, _, cursor = make_detector([(1,), (10,), (7,)], lock_name='live_graph_writer')
+
+    detector.tick()
+
+    assert detector.writer is True
+    cursor.executemany.assert_called_once_with("INSERT INTO live_graph (vulnerabilities) VALUES (%s)", [(7,)])
@@ -0,0 +1,120 @@
+# tests/test_db_pool.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from db_pool import ConnectionPool, PoolTimeout
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def creator():
+        raw = MagicMock()
+        raw.in_transaction = False
+        created.append(raw)
+        return raw
+
+    return ConnectionPool(creator, **kwargs), created
+
+
+def test_connection_is_reused_after_close():
+    pool, created = make_pool(pool_size=2)
+    conn = pool.connect()
+    conn.close()
+    again = pool.connect()
+
+    assert len(created) == 1
+    assert again._raw is created[0]
+    created[0].ping.assert_called_once()
+
+
+def test_double_close_returns_connection_once():
+    pool, _ = make_pool(pool_size=2)
+    conn = pool.connect()
+    conn.close()
+    conn.close()
+
+    stats = pool.stats()
+    assert stats['idle'] == 1
+    assert stats['in_use'] == 0
+
+
+def test_overflow_connections_are_closed_on_return():
+    pool, created = make_pool(pool_size=1, max_overflow=1)
+    first = pool.connect()
+    second = pool.connect()
+    assert pool.stats()['overflow'] == 1
+
+    first.close()
+    second.close()
+
+    stats = pool.stats()
+    assert stats['total'] == 1
+    assert stats['idle'] == 1
+    created[1].close.assert_called_once()
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+    pool.connect()
+
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool, _ = make_pool(pool_size=1, max_overflow=0, timeout=2)
+    held = pool.connect()
+    threading.Timer(0.05, held.close).start()
+
+    conn = pool.connect()
+
+    assert conn._raw is held._raw
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['wait_time_max'] > 0
+
+
+def test_failed_ping_replaces_connection():
+    pool, created = make_pool(pool_size=1)
+    pool.connect().close()
+    created[0].ping.side_effect = Exception("server has gone away")
+
+    conn = pool.connect()
+
+    assert conn._raw is created[1]
+    assert pool.stats()['ping_failures'] == 1
+
+
+def test_stale_connection_is_recycled():
+    pool, created = make_pool(pool_size=1, recycle=0)
+    pool.connect().close()
+    time.sleep(0.01)
+
+    conn = pool.connect()
+
+    assert conn._raw is created[1]
+    assert pool.stats()['recycled'] == 1
+
+
+def test_open_transaction_is_rolled_back_on_return():
+    pool, created = make_pool(pool_size=1)
+    conn = pool.connect()
+    created[0].in_transaction = True
+    conn.close()
+
+    created[0].rollback.assert_called_once()
+
+
+def test_invalidate_frees_slot():
+    pool, created = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+    conn = pool.connect()
+    conn.invalidate()
+
+    assert pool.connect()._raw is created[1]
+    assert pool.stats()['discarded'] == 1
@@ -0,0 +1,155 @@
+# tests/test_ingest.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from unittest.mock import patch, MagicMock
+from flask_jwt_extended import create_access_token
+import app as app_module
+from app import app
+import ingest
+from result_cache import CacheEntry
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers():
+    with app.app_context():
+        token = create_access_token(identity='scanner')
+    return {'Authorization': f'Bearer {token}'}
+
+
+def make_conn(route_ids=(), rowcount=0):
+    conn = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchall.return_value = list(route_ids)
+    cursor.rowcount = rowcount
+    conn.cursor.return_value = cursor
+    return conn, cursor
+
+
+def test_parse_scan_merges_routes_and_dedupes_findings():
+    routes, findings = ingest.parse_scan({
+        'routes': [
+            {'path': '/fetch', 'methods': 'GET'},
+            {'path': '/fetch', 'methods': ['post', 'GET']},
+        ],
+        'findings': [
+            {'route_name': 'fetch', 'vulnerability_type': 'SSRF'},
+            {'route_name': 'fetch', 'vulnerability_type': 'SSRF'},
+            {'route_name': 'login', 'vulnerability_type': 'SQL Injection'},
+        ],
+    })
+
+    assert routes == {'/fetch': ['GET', 'POST']}
+    assert findings == [('fetch', 'SSRF'), ('login', 'SQL Injection')]
+
+
+@pytest.mark.parametrize('payload', [
+    [],
+    {'routes': {}},
+    {'routes': [{'methods': 'GET'}]},
+    {'findings': [{'route_name': 'x'}]},
+    {'findings': [{'route_name': 'x' * 300, 'vulnerability_type': 'SSRF'}]},
+    {'routes': [{'path': '/fetch', 'methods': 'GET', 'route_name': 7}]},
+])
+def test_parse_scan_rejects_malformed_payloads(payload):
+    with pytest.raises(ingest.ScanError):
+        ingest.parse_scan(payload)
+
+
+def test_ingest_scan_writes_batches_in_one_transaction():
+    conn, cursor = make_conn(route_ids=[(1, '/a'), (2, '/b')], rowcount=1)
+    routes = {'/a': ['GET'], '/b': ['GET', 'POST']}
+    findings = [('a', 'SSRF'), ('b', 'SSRF'), ('b', 'SQL Injection')]
+
+    report = ingest.ingest_scan(conn, routes, findings, batch_size=2)
+
+    conn.start_transaction.assert_called_once()
+    conn.commit.assert_called_once()
+    assert [b['table'] for b in report['batches']] == ['api_routes', 'vulnerabilities', 'vulnerabilities']
+    assert report['findings'] == {'received': 3, 'inserted': 2, 'duplicates': 1}
+    methods_call = [c for c in cursor.executemany.call_args_list if 'api_route_methods' in c.args[0]][0]
+    assert methods_call.args[1] == [(1, 'GET'), (2, 'GET'), (2, 'POST')]
+
+
+def test_ingest_scan_stores_route_names():
+    conn, cursor = make_conn(route_ids=[(1, '/fetch'), (2, '/health')], rowcount=1)
+    payload = {'routes': [{'path': '/fetch', 'methods': 'GET', 'route_name': 'fetch_url'},
+                          {'path': '/health', 'methods': 'GET'}]}
+    routes, findings = ingest.parse_scan(payload)
+
+    ingest.ingest_scan(conn, routes, findings, route_names=ingest.parse_route_names(payload))
+
+    upsert = cursor.executemany.call_args_list[0]
+    assert 'COALESCE(new.route_name, api_routes.route_name)' in upsert.args[0]
+    assert upsert.args[1] == [('/fetch', 'GET', 'fetch_url'), ('/health', 'GET', None)]
+
+
+def test_ingest_scan_rolls_back_on_error():
+    conn, cursor = make_conn()
+    cursor.executemany.side_effect = RuntimeError("lock wait timeout")
+
+    with pytest.raises(RuntimeError):
+        ingest.ingest_scan(conn, {}, [('a', 'SSRF')])
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+
+
+def test_post_scan_requires_token(client):
+    response = client.post('/api/scans', json={'routes': []})
+
+    assert response.status_code == 401
+
+
+def test_post_scan_reports_counts(client, auth_headers):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn, _ = make_conn(route_ids=[(1, '/login')], rowcount=1)
+        mocked_db.return_value = mocked_conn
+
+        response = client.post('/api/scans', headers=auth_headers, json={
+            'routes': [{'path': '/login', 'methods': ['POST']}],
+            'findings': [{'route_name': 'login', 'vulnerability_type': 'SQL Injection'}],
+        })
+        data = response.get_json()
+
+        assert response.status_code == 201
+        assert data['routes'] == {'received': 1, 'written': 1}
+        assert data['findings'] == {'received': 1, 'inserted': 1, 'duplicates': 0}
+        assert all('seconds' in batch for batch in data['batches'])
+
+
+def test_post_scan_rejects_bad_payload(client, auth_headers):
+    response = client.post('/api/scans', headers=auth_headers, json={'routes': 'nope'})
+
+    assert response.status_code == 400
+    assert "'routes' must be a list" in response.get_json()['msg']
+
+
+def test_post_scan_drops_cached_results(client, auth_headers):
+    app_module.result_cache.put(('/api/routes', b'', ((1, 1),)), CacheEntry(b'[]'))
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value, _ = make_conn(route_ids=[(1, '/login')], rowcount=0)
+
+        response = client.post('/api/scans', headers=auth_headers, json={
+            'routes': [{'path': '/login', 'methods': ['POST', 'PUT']}],
+        })
+
+    assert response.status_code == 201
+    assert app_module.result_cache.stats()['entries'] == 0
+
+
+def test_snapshot_refresh_drops_cached_results():
+    app_module.result_cache.put(('/api/routes', b'', ((1, 1),)), CacheEntry(b'[]'))
+
+    app_module._on_snapshot_refreshed({'rows': {}})
+
+    assert app_module.result_cache.stats()['entries'] == 0
@@ -0,0 +1,108 @@
+# tests/test_live_stream.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+from unittest.mock import MagicMock
+from live_stream import Broadcaster, LiveFeed
+
+
+def frame_data(frame):
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    return fields['id'], fields['event'], json.loads(fields['data'])
+
+
+def test_publish_fans_out_to_every_subscriber():
+    broadcaster = Broadcaster()
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+
+    broadcaster.publish('stats', {'total_apis': 3})
+
+    for subscription in (first, second):
+        _, event, data = frame_data(subscription.next_frame(0))
+        assert event == 'stats'
+        assert data == {'total_apis': 3}
+
+
+def test_new_subscriber_gets_latest_snapshot():
+    broadcaster = Broadcaster()
+    broadcaster.publish('stats', {'total_apis': 1})
+    broadcaster.publish('stats', {'total_apis': 2})
+    broadcaster.publish('timeline', [[1, 5]])
+
+    subscription = broadcaster.subscribe()
+
+    events = [frame_data(subscription.next_frame(0))[1:] for _ in range(2)]
+    assert events == [('stats', {'total_apis': 2}), ('timeline', [[1, 5]])]
+    assert subscription.next_frame(0) is None
+
+
+def test_resume_replays_events_after_last_event_id():
+    broadcaster = Broadcaster()
+    broadcaster.publish('stats', {'n': 1})
+    broadcaster.publish('stats', {'n': 2})
+    broadcaster.publish('stats', {'n': 3})
+
+    subscription = broadcaster.subscribe(f"{broadcaster.epoch}-1")
+
+    assert [frame_data(subscription.next_frame(0))[2] for _ in range(2)] == [{'n': 2}, {'n': 3}]
+
+
+def test_unknown_epoch_falls_back_to_snapshot():
+    broadcaster = Broadcaster()
+    broadcaster.publish('stats', {'n': 1})
+    broadcaster.publish('stats', {'n': 2})
+
+    subscription = broadcaster.subscribe("other-1")
+
+    assert frame_data(subscription.next_frame(0))[2] == {'n': 2}
+    assert subscription.next_frame(0) is None
+
+
+def test_slow_subscriber_drops_oldest_events():
+    broadcaster = Broadcaster(max_queue=2)
+    subscription = broadcaster.subscribe()
+    for n in range(5):
+        broadcaster.publish('stats', {'n': n})
+
+    assert subscription.dropped == 3
+    assert [frame_data(subscription.next_frame(0))[2] for _ in range(2)] == [{'n': 3}, {'n': 4}]
+
+
+def test_slow_subscriber_keeps_latest_event_of_each_type():
+    broadcaster = Broadcaster(max_queue=2)
+    subscription = broadcaster.subscribe()
+    broadcaster.publish('stats', {'n': 1})
+    broadcaster.publish('timeline', [[1, 1]])
+    broadcaster.publish('stats', {'n': 2})
+    broadcaster.publish('stats', {'n': 3})
+
+    frames = [frame_data(subscription.next_frame(0))[1:] for _ in range(2)]
+    assert frames == [('timeline', [[1, 1]]), ('stats', {'n': 3})]
+    assert subscription.dropped == 2
+
+
+def test_stream_sends_heartbeat_and_unsubscribes_on_close():
+    broadcaster = Broadcaster()
+    subscription = broadcaster.subscribe()
+    stream = subscription.stream(heartbeat=0.01)
+
+    assert next(stream).startswith('retry:')
+    assert next(stream) == ': heartbeat\n\n'
+    stream.close()
+    assert broadcaster.subscriber_count == 0
+
+
+def test_feed_only_loads_and_publishes_on_change():
+    version = MagicMock(return_value=1)
+    load = MagicMock(return_value={'stats': {'n': 1}, 'timeline': [[1, 1]]})
+    feed = LiveFeed(version, load)
+
+    assert feed.poll_once() == 2
+    assert feed.poll_once() == 0
+    assert load.call_count == 1
+
+    version.return_value = 2
+    load.return_value = {'stats': {'n': 1}, 'timeline': [[1, 1], [2, 2]]}
+    assert feed.poll_once() == 1
@@ -0,0 +1,101 @@
+# tests/test_metrics.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import logging
+import pytest
+from unittest.mock import patch, MagicMock
+import app as app_module
+from app import app
+import metrics
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    with app.test_client() as client:
+        yield client
+
+
+def test_fingerprint_collapses_values():
+    first = metrics.fingerprint("SELECT * FROM vulnerabilities WHERE route_name = 'login' AND id > 10")
+    second = metrics.fingerprint("SELECT *\n  FROM vulnerabilities WHERE route_name = %s AND id > %s")
+
+    assert first == second == "SELECT * FROM vulnerabilities WHERE route_name = ? AND id > ?"
+    assert metrics.fingerprint("SELECT id FROM t WHERE id IN (%s, %s, %s) # note") == \
+        "SELECT id FROM t WHERE id IN (?+)"
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram('latency_seconds', "Latency.", ('route',), buckets=(0.1, 1))
+    histogram.observe(0.05, route='/a')
+    histogram.observe(0.5, route='/a')
+    histogram.observe(5, route='/a')
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_instrumented_cursor_records_rows_and_logs_slow_queries(caplog):
+    registry = metrics.Registry()
+    recorder = metrics.QueryRecorder(registry, slow_threshold=0, context=lambda: 'job')
+    raw = MagicMock()
+    raw.cursor.return_value.fetchall.return_value = [(1,), (2,)]
+    conn = metrics.InstrumentedConnection(raw, recorder)
+
+    with caplog.at_level(logging.WARNING, logger='slow_query'):
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM api_routes WHERE id > %s", (5,))
+        assert cursor.fetchall() == [(1,), (2,)]
+        conn.close()
+
+    key = "SELECT id FROM api_routes WHERE id > ?"
+    raw.cursor.return_value.execute.assert_called_once_with("SELECT id FROM api_routes WHERE id > %s", (5,))
+    raw.close.assert_called_once()
+    assert recorder.rows.value(fingerprint=key) == 2
+    assert recorder.duration.snapshot(fingerprint=key)[2] == 1
+    entry = json.loads(caplog.records[0].getMessage())
+    assert entry['fingerprint'] == key
+    assert entry['rows'] == 2
+    assert entry['context'] == 'job'
+
+
+def test_long_lived_connection_forgets_closed_cursors():
+    recorder = metrics.QueryRecorder(metrics.Registry(), slow_threshold=10)
+    conn = metrics.InstrumentedConnection(MagicMock(), recorder)
+
+    for _ in range(1000):
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", ('live_graph_writer',))
+        cursor.close()
+    still_open = conn.cursor()
+
+    assert conn._cursors == {still_open}
+
+
+def test_metrics_endpoint_reports_requests_and_queries(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_conn = MagicMock()
+        mocked_conn.cursor.return_value.fetchone.return_value = [7]
+        mocked_db.return_value = mocked_conn
+        before = app_module.http_requests.value(method='GET', route='/api/total_apis', status=200)
+
+        assert client.get('/api/total_apis').get_json() == 7
+
+    assert app_module.http_requests.value(method='GET', route='/api/total_apis', status=200) == before + 1
+    assert app_module.query_recorder.by_context.value(context='/api/total_apis') > 0
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    assert response.mimetype == 'text/plain'
+    assert 'http_requests_total{method="GET",route="/api/total_apis",status="200"}' in text
+    assert 'db_query_duration_seconds_count{fingerprint="SELECT COUNT(*) FROM api_routes"}' in text
+    assert 'http_requests_in_flight 1' in text
+    assert '# TYPE result_cache gauge' in text
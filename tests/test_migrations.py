@@ -0,0 +1,124 @@
+# tests/test_migrations.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from unittest.mock import MagicMock, patch
+import migrations
+import storage
+
+
+def make_conn(fetchone=(0,), fetchall=None):
+    conn = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchone.return_value = fetchone
+    cursor.fetchall.return_value = fetchall if fetchall is not None else []
+    conn.cursor.return_value = cursor
+    return conn, cursor
+
+
+def executed(cursor):
+    return [' '.join(call.args[0].split()) for call in cursor.execute.call_args_list]
+
+
+def test_versions_are_unique_and_ordered():
+    versions = [m.version for m in migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+def test_create_index_skips_existing_index():
+    _, cursor = make_conn(fetchone=(1,))
+
+    assert migrations.create_index(cursor, 'vulnerabilities', 'idx_x', 'route_name') is False
+    assert not any(sql.startswith('ALTER TABLE') for sql in executed(cursor))
+
+
+def test_create_index_adds_missing_index():
+    _, cursor = make_conn(fetchone=(0,))
+
+    assert migrations.create_index(cursor, 'vulnerabilities', 'idx_x', 'route_name') is True
+    assert executed(cursor)[-1] == "ALTER TABLE `vulnerabilities` ADD INDEX `idx_x` (route_name)"
+
+
+def test_split_methods_normalizes_legacy_values():
+    assert migrations.split_methods('GET, post,') == ['GET', 'POST']
+
+
+def test_backfill_route_methods_walks_keyset_batches():
+    conn, cursor = make_conn()
+    cursor.fetchall.side_effect = [
+        [(1, 'GET'), (2, 'GET, POST')],
+        [(5, 'DELETE')],
+        [],
+    ]
+
+    assert migrations.backfill_route_methods(conn, batch_size=2) == 3
+    assert cursor.executemany.call_args_list[0].args[1] == [(1, 'GET'), (2, 'GET'), (2, 'POST')]
+    assert cursor.execute.call_args_list[1].args[1] == (2, 2)
+    assert cursor.execute.call_args_list[2].args[1] == (5, 2)
+
+
+def test_match_route_name_needs_an_unambiguous_name():
+    names = sorted(['api_users', 'api_users_admin', 'fetch_url', 'login', 'redirect_to_external_api', 'report_csv',
+                    'report_pdf'])
+
+    assert migrations.match_route_name('/api/users/<int:user_id>', names) == 'api_users'
+    assert migrations.match_route_name('/login', names) == 'login'
+    assert migrations.match_route_name('/fetch', names) == 'fetch_url'
+    assert migrations.match_route_name('/redirect', names) == 'redirect_to_external_api'
+    assert migrations.match_route_name('/report', names) is None
+    assert migrations.match_route_name('/logout', names) is None
+    assert migrations.match_route_name('/', names) is None
+
+
+def test_backfill_route_names_fills_only_unnamed_routes(tmp_path):
+    conn = storage.connect_sqlite(str(tmp_path / 'names.db'))
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (id, path, methods, route_name) VALUES (%s, %s, %s, %s)", [
+        (1, '/fetch', 'GET', None),
+        (2, '/login', 'POST', 'sign_in'),
+        (3, '/report', 'GET', None),
+        (4, '/api/users/<int:user_id>', 'GET', None),
+    ])
+    cursor.executemany("INSERT INTO vulnerabilities (vulnerability_type, route_name) VALUES (%s, %s)", [
+        ('SSRF', 'fetch_url'), ('SQL Injection', 'login'), ('XSS', 'report_csv'), ('XSS', 'report_pdf'),
+        ('Broken Object Level Authorization', 'api_users'),
+    ])
+
+    assert migrations.backfill_route_names(conn, batch_size=2) == (2, 3)
+
+    cursor.execute("SELECT id, route_name FROM api_routes ORDER BY id")
+    assert cursor.fetchall() == [(1, 'fetch_url'), (2, 'sign_in'), (3, None), (4, 'api_users')]
+    conn.close()
+
+
+def test_upgrade_applies_only_pending_migrations():
+    conn, cursor = make_conn()
+    first, second = MagicMock(), MagicMock()
+    registry = [
+        migrations.Migration(1, 'first', first),
+        migrations.Migration(2, 'second', second),
+    ]
+    with patch.object(migrations, 'MIGRATIONS', registry), \
+            patch.object(migrations, 'applied_versions', return_value={1}):
+        applied = migrations.upgrade(conn, log=lambda message: None)
+
+    first.assert_not_called()
+    second.assert_called_once()
+    assert [(version, name) for version, name, _ in applied] == [(2, 'second')]
+    assert "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)" in executed(cursor)
+
+
+def test_upgrade_stops_at_target():
+    conn, _ = make_conn()
+    first, second = MagicMock(), MagicMock()
+    registry = [
+        migrations.Migration(1, 'first', first),
+        migrations.Migration(2, 'second', second),
+    ]
+    with patch.object(migrations, 'MIGRATIONS', registry), \
+            patch.object(migrations, 'applied_versions', return_value=set()):
+        migrations.upgrade(conn, target=1, log=lambda message: None)
+
+    first.assert_called_once()
+    second.assert_not_called()
@@ -0,0 +1,162 @@
+# tests/test_reference_data.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from contextlib import contextmanager
+import pytest
+from unittest.mock import patch
+import mysql.connector
+import app as app_module
+from app import app
+import dashboard
+import reference_data
+import storage
+
+SEVERITIES = [('SQL Injection', 'Critical', 4), ('SSRF', 'Critical', 4), ('XSS', 'Medium', 2), ('Weak TLS', 'Low', 1)]
+MITIGATIONS = [('SQL Injection', 'Use parameterized queries'), ('XSS', 'Encode output'), ('XSS', 'Set a CSP')]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = storage.connect_sqlite(str(tmp_path / 'reference.db'))
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (path, methods) VALUES (%s, %s)", [('/login', 'POST'), ('/fetch', 'GET')])
+    cursor.executemany("INSERT INTO vulnerabilities (vulnerability_type, route_name) VALUES (%s, %s)", [
+        ('SQL Injection', 'login'), ('SSRF', 'fetch'), ('XSS', 'fetch'), ('Unknown', 'fetch'),
+    ])
+    cursor.executemany(
+        "INSERT INTO vulnerability_severity (vulnerability_type, severity_level, severity_score) VALUES (%s, %s, %s)",
+        SEVERITIES,
+    )
+    cursor.executemany("INSERT INTO VulnerabilityMitigations (vulnerability_type, recommendations) VALUES (%s, %s)",
+                       MITIGATIONS)
+    cursor.execute("INSERT INTO live_graph (vulnerabilities) VALUES (4)")
+    cursor.close()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def store(conn):
+    @contextmanager
+    def connection():
+        yield conn
+    return reference_data.ReferenceStore(connection)
+
+
+def test_reference_data_lookups():
+    data = reference_data.ReferenceData(SEVERITIES, MITIGATIONS)
+    type_counts = [('XSS', 3), ('SQL Injection', 1), ('SSRF', 2), ('Unknown', 5)]
+
+    assert data.weights() == {'SQL Injection': 4, 'SSRF': 4, 'XSS': 2, 'Weak TLS': 1}
+    assert data.impact_rows(type_counts) == [(2, 3), (4, 3)]
+    assert list(data.level_counts(type_counts).items()) == [('Medium', 3), ('Critical', 3)]
+    assert data.mitigations['XSS'] == ('Encode output', 'Set a CSP')
+    with pytest.raises(TypeError):
+        data.severity['XSS'] = ('Low', 1)
+
+
+def test_version_tracks_content_not_order():
+    data = reference_data.ReferenceData(SEVERITIES, MITIGATIONS)
+    assert reference_data.ReferenceData(SEVERITIES[::-1], MITIGATIONS).version == data.version
+    changed = [('XSS', 'Medium', 3)] + SEVERITIES[:2]
+    assert reference_data.ReferenceData(changed, MITIGATIONS).version != data.version
+
+
+def test_store_reloads_only_on_change(store, conn):
+    seen = []
+    store.add_listener(seen.append)
+    assert not store.ready
+
+    assert store.reload() is True
+    assert store.reload() is False
+    cursor = conn.cursor()
+    cursor.execute("UPDATE vulnerability_severity SET severity_score = 3 WHERE vulnerability_type = 'XSS'")
+    cursor.close()
+    assert store.reload() is True
+
+    assert len(seen) == 2
+    assert store.current().severity['XSS'] == ('Medium', 3)
+    assert store.stats()['reloads'] == 2
+
+
+def test_lazy_load_starts_the_reloader(store):
+    store.interval = 60
+    try:
+        data = store.current()
+
+        assert store.stats()['running']
+        assert store.stats()['reloads'] == 1
+        assert store.current() is data
+    finally:
+        store.stop(timeout=1)
+
+
+def test_views_load_the_store_on_first_use(store):
+    store.interval = 60
+    try:
+        with patch.object(app_module, 'reference', store):
+            data = app_module._reference()
+
+        assert data is store.current()
+        assert store.stats()['running']
+    finally:
+        store.stop(timeout=1)
+
+
+def test_views_fall_back_to_sql_while_mysql_is_away():
+    @contextmanager
+    def unreachable():
+        raise mysql.connector.InterfaceError("mysql is down")
+        yield
+
+    with patch.object(app_module, 'reference', reference_data.ReferenceStore(unreachable)):
+        assert app_module._reference() is None
+
+
+def test_load_dashboard_with_reference_matches_joins(conn):
+    data = reference_data.load(conn)
+
+    assert dashboard.load_dashboard(conn, reference=data) == dashboard.load_dashboard(conn)
+
+
+@pytest.fixture
+def client(store, conn):
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    store.reload()
+    with patch.object(app_module, 'reference', store), \
+            patch.object(app_module, 'read_connection') as read_connection:
+        read_connection.return_value.__enter__.return_value = conn
+        with app.test_client() as client:
+            yield client
+
+
+def test_views_use_preloaded_reference(client):
+    severity = client.get('/api/vulnerabilities/severity').get_json()
+    chart = client.get('/api/donought_chart').get_json()
+    score = client.get('/api/code_score').get_json()
+
+    assert severity == {'SQL Injection': 4, 'SSRF': 4, 'XSS': 2, 'Weak TLS': 1}
+    assert chart == {'Medium': 1, 'Critical': 2}
+    assert score == dashboard.code_score([(2, 1), (4, 2)], 2)
+
+
+def test_mitigations_endpoint(client):
+    everything = client.get('/api/mitigations').get_json()
+    some = client.get('/api/mitigations?type=XSS&type=Missing').get_json()
+
+    assert everything == {'SQL Injection': ['Use parameterized queries'], 'XSS': ['Encode output', 'Set a CSP']}
+    assert some == {'XSS': ['Encode output', 'Set a CSP']}
+
+
+def test_data_versions_use_reference_version(client, store):
+    with patch.object(app_module, 'read_cursor') as read_cursor:
+        read_cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            (table, 1, 1) for table in app_module.VERSIONED_TABLES
+        ]
+        versions = app_module._probe_data_versions()
+
+    assert versions['vulnerability_severity'] == store.current().version
+    assert versions['api_routes'] == (1, 1)
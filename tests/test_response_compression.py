@@ -0,0 +1,107 @@
+# tests/test_response_compression.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import app as app_module
+from app import app
+import response_compression
+import json_provider
+
+ROUTES = [(n, f'/api/item{n}', 'GET,POST', None, method) for n in range(200) for method in ('GET', 'POST')]
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = True
+    app_module.result_cache.clear()
+    with patch.object(app_module.data_versions, 'current', return_value=('v1',)):
+        with app.test_client() as client:
+            yield client
+    app.config['RESULT_CACHE_ENABLED'] = False
+    app_module.result_cache.clear()
+
+
+def mock_routes_db(mocked_db):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.side_effect = lambda: list(ROUTES)
+    mocked_db.return_value = conn
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('*', response_compression.ENCODINGS[0]),
+    ('', None),
+])
+def test_negotiate(header, expected):
+    assert response_compression.negotiate(header) == expected
+
+
+def test_negotiate_prefers_highest_weight():
+    assert response_compression.negotiate('gzip;q=0.5, br;q=0.9', available=('br', 'gzip')) == 'br'
+    assert response_compression.negotiate('gzip;q=1, br;q=0.1', available=('br', 'gzip')) == 'gzip'
+
+
+def test_cached_response_is_compressed_once(client):
+    with patch('app.get_db_connection') as mocked_db, \
+            patch('response_compression.compress', wraps=response_compression.compress) as compress:
+        mock_routes_db(mocked_db)
+
+        first = client.get('/api/routes', headers={'Accept-Encoding': 'gzip'})
+        second = client.get('/api/routes', headers={'Accept-Encoding': 'gzip'})
+        plain = client.get('/api/routes')
+
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in first.headers['Vary']
+    assert first.get_data() == second.get_data()
+    assert len(first.get_data()) < len(plain.get_data())
+    assert json.loads(gzip.decompress(first.get_data())) == plain.get_json()
+    assert compress.call_count == 1
+    assert first.headers['ETag'] != plain.headers['ETag']
+    assert 'Content-Encoding' not in plain.headers
+
+    not_modified = client.get('/api/routes', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag'],
+    })
+    assert not_modified.status_code == 304
+
+
+def test_small_bodies_are_not_compressed(client):
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value.cursor.return_value.fetchone.return_value = [17]
+
+        response = client.get('/api/total_apis', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.get_json() == 17
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_uncached_responses_are_compressed(client):
+    app.config['RESULT_CACHE_ENABLED'] = False
+    with patch('app.get_db_connection') as mocked_db:
+        mock_routes_db(mocked_db)
+
+        response = client.get('/api/routes', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.get_data()))) == 200
+
+
+@pytest.mark.skipif(json_provider.orjson is None, reason="orjson not installed")
+def test_orjson_provider_matches_default_output():
+    fast_app, default_app = Flask('fast'), Flask('default')
+    fast_app.json = json_provider.OrjsonProvider(fast_app)
+    default_app.json = DefaultJSONProvider(default_app)
+    payload = {'b': [1, 2.5, None, True], 'a': {'nested': (1, 2)}}
+
+    with fast_app.app_context(), default_app.app_context():
+        assert fast_app.json.response(payload).get_data() == default_app.json.response(payload).get_data()
+        assert fast_app.json.loads(fast_app.json.dumps({3: 'int key'})) == {'3': 'int key'}
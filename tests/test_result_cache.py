@@ -0,0 +1,147 @@
+# tests/test_result_cache.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app import app, result_cache
+from result_cache import CacheEntry, DataVersion, ResultCache, SingleFlight
+
+
+@pytest.fixture
+def cached_client():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = True
+    result_cache.clear()
+    with patch('app.data_versions') as versions:
+        versions.current.return_value = ((1, 1),)
+        with app.test_client() as client:
+            yield client, versions
+    app.config['RESULT_CACHE_ENABLED'] = False
+    result_cache.clear()
+
+
+def mock_db_connection(mock_cursor_result=None):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = mock_cursor_result
+    mock_cursor.fetchone.return_value = mock_cursor_result
+    mock_conn.cursor.return_value = mock_cursor
+    return mock_conn
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', CacheEntry(b'1'))
+    cache.put('b', CacheEntry(b'2'))
+    cache.get('a')
+    cache.put('c', CacheEntry(b'3'))
+
+    assert cache.get('b') is None
+    assert cache.get('a').body == b'1'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache(ttl=0)
+    cache.put('a', CacheEntry(b'1'))
+    time.sleep(0.01)
+
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache()
+    cache.get_or_compute('a', lambda: CacheEntry(b'oops', status=500), cacheable=lambda e: e.status == 200)
+
+    assert cache.get('a') is None
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return 42
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(value == 42 for value, _ in results)
+
+
+def test_data_version_probes_once_per_ttl():
+    probe = MagicMock(return_value={'api_routes': (3, 9)})
+    versions = DataVersion(probe, ttl=60)
+
+    assert versions.current(('api_routes', 'live_graph')) == ((3, 9), None)
+    versions.current(('api_routes',))
+    assert probe.call_count == 1
+
+    versions.invalidate()
+    versions.current(('api_routes',))
+    assert probe.call_count == 2
+
+
+def test_data_version_peek_never_probes():
+    probe = MagicMock(return_value={'api_routes': (3, 9)})
+    versions = DataVersion(probe, ttl=60)
+
+    assert versions.peek(('api_routes',)) is None
+    versions.current(('api_routes',))
+    assert versions.peek(('api_routes',)) == ((3, 9),)
+    versions.invalidate()
+    assert versions.peek(('api_routes',)) is None
+    assert probe.call_count == 1
+
+
+def test_cached_endpoint_hits_database_once(cached_client):
+    client, _ = cached_client
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection((10,))
+
+        first = client.get('/api/total_apis')
+        second = client.get('/api/total_apis')
+
+        assert first.get_json() == second.get_json() == 10
+        assert mocked_db.call_count == 1
+        assert first.headers['ETag'] == second.headers['ETag']
+
+
+def test_cached_endpoint_answers_if_none_match_with_304(cached_client):
+    client, _ = cached_client
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection((10,))
+
+        etag = client.get('/api/total_apis').headers['ETag']
+        response = client.get('/api/total_apis', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+
+
+def test_new_data_version_misses_cache(cached_client):
+    client, versions = cached_client
+    with patch('app.get_db_connection') as mocked_db:
+        mocked_db.return_value = mock_db_connection((10,))
+        client.get('/api/total_apis')
+
+        versions.current.return_value = ((2, 2),)
+        mocked_db.return_value = mock_db_connection((11,))
+
+        assert client.get('/api/total_apis').get_json() == 11
+        assert mocked_db.call_count == 2
@@ -0,0 +1,212 @@
+# tests/test_risk_index.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from unittest.mock import MagicMock, patch
+import app as app_module
+from app import app
+import dashboard
+import storage
+from risk_index import RiskIndex
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = storage.connect_sqlite(str(tmp_path / 'risk.db'))
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (id, path, methods) VALUES (%s, %s, %s)", [
+        (1, '/api/login', 'POST'), (2, '/api/fetch', 'GET'), (3, '/api/health', 'GET'),
+    ])
+    cursor.executemany("INSERT INTO vulnerabilities (id, vulnerability_type, route_name) VALUES (%s, %s, %s)", [
+        (1, 'SQL Injection', 'login'),
+        (2, 'SSRF', 'fetch'),
+        (3, 'XSS', 'fetch'),
+        (4, 'XSS', 'health'),
+    ])
+    cursor.executemany(
+        "INSERT INTO vulnerability_severity (vulnerability_type, severity_level, severity_score) VALUES (%s, %s, %s)",
+        [('SQL Injection', 'Critical', 10), ('SSRF', 'High', 8), ('XSS', 'Medium', 5)],
+    )
+    cursor.close()
+    yield conn
+    conn.close()
+
+
+def execute(conn, query, params=()):
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    cursor.close()
+
+
+def test_sync_builds_scores_from_findings(conn):
+    index = RiskIndex()
+    assert not index.ready
+
+    assert index.sync(conn) == 4
+
+    assert index.ready
+    assert index.top(10) == [('fetch', 13, 2), ('login', 10, 1), ('health', 5, 1)]
+    assert index.route('fetch') == (13, {'SSRF': 1, 'XSS': 1})
+    assert index.route('missing') is None
+    assert index.impact_rows() == [(5, 2), (8, 1), (10, 1)]
+    assert index.stats()['total_routes'] == 3
+
+
+def test_top_filters_by_score_range(conn):
+    index = RiskIndex()
+    index.sync(conn)
+
+    assert index.top(1) == [('fetch', 13, 2)]
+    assert index.top(10, min_score=6) == [('fetch', 13, 2), ('login', 10, 1)]
+    assert index.top(10, max_score=10) == [('login', 10, 1), ('health', 5, 1)]
+    assert index.top(10, min_score=10, max_score=10) == [('login', 10, 1)]
+    assert index.top(10, min_score=20) == []
+
+
+def test_sync_only_reads_new_findings(conn):
+    index = RiskIndex()
+    index.sync(conn)
+    execute(conn, "INSERT INTO vulnerabilities (id, vulnerability_type, route_name) VALUES (5, 'SSRF', 'health')")
+
+    with patch.object(index, '_reconcile', wraps=index._reconcile) as reconcile:
+        assert index.sync(conn, expected_count=5) == 1
+
+    reconcile.assert_not_called()
+    assert index.watermark == 5
+    assert index.top(10)[:2] == [('fetch', 13, 2), ('health', 13, 2)]
+
+
+def test_deleted_findings_are_reconciled(conn):
+    index = RiskIndex()
+    index.sync(conn)
+    execute(conn, "DELETE FROM vulnerabilities WHERE id IN (1, 3)")
+
+    assert index.sync(conn, expected_count=2) == 2
+
+    assert index.top(10) == [('fetch', 8, 1), ('health', 5, 1)]
+    assert index.route('login') is None
+    assert index.total_findings == 2
+
+
+def test_severity_changes_reweight_in_memory(conn):
+    index = RiskIndex()
+    index.sync(conn)
+    execute(conn, "UPDATE vulnerability_severity SET severity_score = 1 WHERE vulnerability_type = 'SSRF'")
+
+    index.sync(conn)
+
+    assert index.top(10) == [('login', 10, 1), ('fetch', 6, 2), ('health', 5, 1)]
+    assert index.impact_rows() == [(1, 1), (5, 2), (10, 1)]
+
+
+def test_add_and_remove_keep_ranking_sorted():
+    index = RiskIndex()
+    index.set_weights({'XSS': 5, 'RCE': 10})
+    index.add('a', 'XSS', 3)
+    index.add('b', 'RCE')
+    index.remove('a', 'XSS', 2)
+
+    assert index.top(10) == [('b', 10, 1), ('a', 5, 1)]
+    index.remove('a', 'XSS')
+    assert index.top(10) == [('b', 10, 1)]
+    assert index.impact_rows() == [(10, 1)]
+
+
+def test_code_score_from_index_matches_sql(conn):
+    index = RiskIndex()
+    index.sync(conn)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT vs.severity_score, COUNT(*) FROM vulnerabilities v
+        JOIN vulnerability_severity vs ON v.vulnerability_type = vs.vulnerability_type
+        GROUP BY vs.severity_score
+    """)
+    expected = dashboard.code_score(cursor.fetchall(), 3)
+    cursor.close()
+
+    assert dashboard.code_score(index.impact_rows(), index.total_routes) == expected
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_risk_routes_endpoint_uses_warm_index(client, conn):
+    index = RiskIndex()
+    index.sync(conn)
+    with patch.object(app_module, 'risk_index', index), patch('app.get_db_connection') as mocked_db:
+        response = client.get('/api/risk/routes?limit=2&min_score=6')
+
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'route': 'fetch', 'score': 13, 'findings': 2},
+        {'route': 'login', 'score': 10, 'findings': 1},
+    ]
+    mocked_db.assert_not_called()
+
+
+def test_risk_routes_endpoint_falls_back_to_sql(client):
+    with patch.object(app_module, 'risk_index', RiskIndex()), patch('app.get_db_connection') as mocked_db:
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [('fetch', 13, 2)]
+        mocked_db.return_value.cursor.return_value = cursor
+
+        response = client.get('/api/risk/routes?max_score=20')
+
+    assert response.get_json() == [{'route': 'fetch', 'score': 13, 'findings': 2}]
+    query, params = cursor.execute.call_args.args
+    assert 'HAVING score <= %s' in query
+    assert params == [20.0, 10]
+
+
+def test_risk_routes_endpoint_rejects_bad_arguments(client):
+    assert client.get('/api/risk/routes?limit=0').status_code == 400
+    assert client.get('/api/risk/routes?min_score=high').status_code == 400
+
+
+def test_matches_requires_the_exact_table_versions(conn):
+    index = RiskIndex()
+    index.sync(conn)
+
+    assert index.matches((4, 4), (3, 3))
+    assert not index.matches((5, 5), (3, 3))
+    assert not index.matches((4, 4), (4, 4))
+    assert not index.matches((4, 4), (3, 3), weights={'XSS': 1})
+    assert not RiskIndex().matches((4, 4), (3, 3))
+
+
+def test_code_score_falls_back_to_sql_when_index_lags(client, conn):
+    index = RiskIndex()
+    index.sync(conn)
+    execute(conn, "INSERT INTO api_routes (id, path, methods) VALUES (4, '/api/new', 'GET')")
+
+    with patch.object(app_module, 'risk_index', index), \
+            patch.object(app_module.data_versions, 'current', return_value=((4, 4), (4, 4))), \
+            patch('app.get_db_connection') as mocked_db:
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(10, 1), (8, 1), (5, 2)]
+        cursor.fetchone.return_value = (4,)
+        mocked_db.return_value.cursor.return_value = cursor
+
+        lagging = client.get('/api/code_score').get_json()
+
+    assert lagging == dashboard.code_score(index.impact_rows(), 4)
+    assert mocked_db.called
+
+
+def test_code_score_served_from_index_when_in_sync(client, conn):
+    index = RiskIndex()
+    index.sync(conn)
+
+    with patch.object(app_module, 'risk_index', index), \
+            patch.object(app_module.data_versions, 'current', return_value=((4, 4), (3, 3))), \
+            patch('app.get_db_connection') as mocked_db:
+        score = client.get('/api/code_score').get_json()
+
+    assert score == dashboard.code_score(index.impact_rows(), 3)
+    mocked_db.assert_not_called()
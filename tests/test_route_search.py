@@ -0,0 +1,195 @@
+# tests/test_route_search.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from unittest.mock import patch
+import app as app_module
+from app import app
+import route_search
+import storage
+from risk_index import RiskIndex
+from route_search import RouteIndex
+
+ROUTES = [
+    (1, '/api/users', 'GET, POST', 'api_users'),
+    (2, '/api/users/<int:user_id>', 'GET, DELETE', 'api_users'),
+    (3, '/api/orders', 'GET', 'api_orders'),
+    (4, '/delete-order/<int:order_id>', 'DELETE', 'delete_order'),
+    (5, '/admin/reports/export', 'GET', None),
+    (6, '/login', 'POST', 'login'),
+    (7, '/fetch', 'GET', 'fetch_url'),
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = storage.connect_sqlite(str(tmp_path / 'routes.db'))
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (id, path, methods, route_name) VALUES (%s, %s, %s, %s)", ROUTES)
+    cursor.executemany("INSERT INTO vulnerabilities (id, vulnerability_type, route_name) VALUES (%s, %s, %s)", [
+        (1, 'SQL Injection', 'login'),
+        (2, 'Broken Object Level Authorization', 'api_users'),
+        (3, 'SSRF', 'fetch_url'),
+    ])
+    cursor.close()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def index(conn):
+    index = RouteIndex()
+    index.sync(conn, (len(ROUTES), len(ROUTES)))
+    return index
+
+
+def paths(results):
+    return [result['path'] for result in results]
+
+
+def test_prefix_search_ranks_exact_match_first(index):
+    total, results = index.search('/api/us')
+    assert total == 2
+    assert paths(results) == ['/api/users', '/api/users/<int:user_id>']
+
+    _, results = index.search('/api/users')
+    assert results[0] == {'id': 1, 'path': '/api/users', 'methods': ['GET', 'POST'], 'score': 1.0}
+
+
+def test_prefix_search_matches_path_parameters(index):
+    _, results = index.search('/api/users/42')
+    assert paths(results) == ['/api/users/<int:user_id>']
+
+
+def test_wildcard_search(index):
+    assert paths(index.search('/api/*')[1]) == ['/api/users', '/api/orders']
+    assert paths(index.search('/admin/**')[1]) == ['/admin/reports/export']
+    assert paths(index.search('/**/export')[1]) == ['/admin/reports/export']
+    assert paths(index.search('/api/users/*')[1]) == ['/api/users/<int:user_id>']
+
+
+def test_fuzzy_search_tolerates_typos(index):
+    total, results = index.search('/usres')
+    assert total == 2
+    assert set(paths(results)) == {'/api/users', '/api/users/<int:user_id>'}
+
+    assert paths(index.search('ordr export', match='fuzzy')[1]) == []
+    assert paths(index.search('reprts export', match='fuzzy')[1]) == ['/admin/reports/export']
+    assert paths(index.search('delet ordr', match='fuzzy')[1]) == ['/delete-order/<int:order_id>']
+
+
+def test_filters_and_pagination(index):
+    total, results = index.search('/api', methods=['delete'])
+    assert (total, paths(results)) == (1, ['/api/users/<int:user_id>'])
+
+    total, results = index.search('', route_names={'login', 'api_users'})
+    assert (total, paths(results)) == (3, ['/login', '/api/users', '/api/users/<int:user_id>'])
+
+    total, page = index.search('/api', offset=1, limit=1)
+    assert total == 3 and len(page) == 1
+
+
+def test_sync_adds_new_routes_and_reloads_after_deletes(conn, index):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO api_routes (id, path, methods) VALUES (8, '/api/usage', 'GET')")
+    with patch.object(index, '_load', wraps=index._load) as load:
+        assert index.sync(conn, (8, 8)) == 1
+    assert [call.kwargs for call in load.call_args_list] == [{}]
+    assert '/api/usage' in paths(index.search('/api/us')[1])
+
+    cursor.execute("DELETE FROM api_routes WHERE id IN (1, 8)")
+    cursor.close()
+    index.sync(conn, (6, 7))
+    assert paths(index.search('/api/us')[1]) == ['/api/users/<int:user_id>']
+    assert len(index) == 6
+
+
+def test_update_rereads_changed_paths(conn, index):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE api_routes SET methods = 'PATCH' WHERE path = '/login'")
+    cursor.close()
+
+    index.update(conn, ['/login'])
+
+    assert index.search('/login')[1][0]['methods'] == ['PATCH']
+
+
+def test_methods_prefer_the_normalized_table(conn):
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_route_methods (route_id, method) VALUES (%s, %s)", [(6, 'POST'), (6, 'PUT')])
+    cursor.close()
+    index = RouteIndex()
+    index.sync(conn, (len(ROUTES), len(ROUTES)))
+
+    assert index.search('/login')[1][0]['methods'] == ['POST', 'PUT']
+    # No normalized rows for /fetch, so the legacy column is used.
+    assert index.search('/fetch')[1][0]['methods'] == ['GET']
+
+
+def test_vulnerability_filter_uses_stored_route_names(conn, index):
+    assert paths(index.search('', route_names={'fetch_url'})[1]) == ['/fetch']
+    assert index.search('', route_names={'fetch'})[0] == 0
+    assert index.search('/admin', route_names={'admin_reports_export'})[0] == 0
+
+    cursor = conn.cursor()
+    cursor.execute("UPDATE api_routes SET route_name = 'export_report' WHERE id = 5")
+    cursor.close()
+    index.update(conn, ['/admin/reports/export'])
+
+    assert paths(index.search('', route_names={'export_report'})[1]) == ['/admin/reports/export']
+
+
+def test_remove_prunes_words_and_trie(index):
+    index.remove(5)
+    assert index.search('/admin')[0] == 0
+    assert index.search('reports', match='fuzzy')[0] == 0
+    assert 'reports' not in index._words
+
+
+def test_edit_distance():
+    assert route_search.edit_distance('users', 'usres', 2) == 1
+    assert route_search.edit_distance('order', 'ordr', 2) == 1
+    assert route_search.edit_distance('admin', 'users', 1) == 2
+
+
+@pytest.fixture
+def client(conn):
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    index = RouteIndex()
+    risk = RiskIndex()
+    risk.sync(conn)
+    version = (len(ROUTES), len(ROUTES))
+    with patch.object(app_module, 'route_index', index), patch.object(app_module, 'risk_index', risk), \
+            patch.object(app_module.data_versions, 'current', return_value=(version,)), \
+            patch.object(app_module, 'read_connection') as read_connection:
+        read_connection.return_value.__enter__.return_value = conn
+        with app.test_client() as client:
+            yield client
+
+
+def test_search_endpoint(client):
+    response = client.get('/api/routes/search?q=/api&method=GET,DELETE&limit=2')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total'] == 3
+    assert body['next_offset'] == 2
+    assert paths(body['results']) == ['/api/users', '/api/orders']
+
+
+def test_search_endpoint_filters_by_vulnerability(client):
+    body = client.get('/api/routes/search?vulnerability=SQL Injection').get_json()
+    assert paths(body['results']) == ['/login']
+    assert body['next_offset'] is None
+
+    body = client.get('/api/routes/search?vulnerability=SSRF').get_json()
+    assert paths(body['results']) == ['/fetch']
+
+
+def test_search_endpoint_rejects_bad_arguments(client):
+    assert client.get('/api/routes/search?match=regex').status_code == 400
+    assert client.get('/api/routes/search?limit=0').status_code == 400
+    assert client.get('/api/routes/search?offset=x').status_code == 400
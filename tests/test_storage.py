@@ -0,0 +1,189 @@
+# tests/test_storage.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+from contextlib import contextmanager
+import pytest
+from unittest.mock import patch
+import app as app_module
+from app import app
+import storage
+
+
+def seed(path):
+    conn = storage.connect_sqlite(path)
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (id, path, methods) VALUES (%s, %s, %s)", [
+        (1, '/api/login', 'POST'),
+        (2, '/api/fetch', 'GET, POST'),
+    ])
+    cursor.executemany("INSERT INTO api_route_methods (route_id, method) VALUES (%s, %s)", [
+        (1, 'POST'), (2, 'GET'), (2, 'POST'),
+    ])
+    cursor.executemany("INSERT INTO vulnerabilities (id, vulnerability_type, route_name) VALUES (%s, %s, %s)", [
+        (1, 'SQL Injection', 'login'),
+        (2, 'SSRF', 'fetch'),
+        (3, 'XSS', 'fetch'),
+    ])
+    cursor.executemany(
+        "INSERT INTO vulnerability_severity (vulnerability_type, severity_level, severity_score) VALUES (%s, %s, %s)",
+        [('SQL Injection', 'Critical', 10), ('SSRF', 'High', 8), ('XSS', 'Medium', 5)],
+    )
+    cursor.executemany("INSERT INTO live_graph (id, vulnerabilities) VALUES (%s, %s)", [(1, 2), (2, 3)])
+    cursor.close()
+    return conn
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / 'source.db')
+    seed(path).close()
+
+    @contextmanager
+    def connect():
+        with storage.connect_sqlite(path) as conn:
+            yield conn
+    return connect
+
+
+@pytest.fixture
+def engine(source, tmp_path):
+    engine = storage.SnapshotEngine(source, path=str(tmp_path / 'snapshot.db'))
+    engine.refresh()
+    return engine
+
+
+def test_refresh_copies_every_table(engine):
+    assert engine.ready
+    assert engine.stats()['last_refresh']['rows']['vulnerabilities'] == 3
+
+    with engine.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT vulnerability_type FROM vulnerabilities WHERE route_name = %s ORDER BY id", ('fetch',))
+        assert cursor.fetchall() == [{'vulnerability_type': 'SSRF'}, {'vulnerability_type': 'XSS'}]
+
+
+def test_snapshot_leaves_out_credentials(engine):
+    assert 'users' not in engine.stats()['last_refresh']['rows']
+    with engine.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        assert 'users' not in {name for name, in cursor.fetchall()}
+
+
+def test_snapshot_is_read_only(engine):
+    with engine.connection() as conn:
+        with pytest.raises(Exception):
+            conn.cursor().execute("DELETE FROM vulnerabilities")
+
+
+def test_refresh_swaps_in_new_data_and_notifies(engine, source):
+    reports = []
+    engine.add_listener(reports.append)
+    with source() as conn:
+        conn.cursor().execute("INSERT INTO api_routes (path, methods) VALUES (%s, %s)", ('/api/new', 'GET'))
+
+    with engine.connection() as before:
+        engine.refresh()
+        # A reader that started before the swap still sees its own copy.
+        before_cursor = before.cursor()
+        before_cursor.execute("SELECT COUNT(*) FROM api_routes")
+        assert before_cursor.fetchone() == (2,)
+
+    with engine.connection() as after:
+        cursor = after.cursor()
+        cursor.execute("SELECT COUNT(*) FROM api_routes")
+        assert cursor.fetchone() == (3,)
+    assert reports[0]['rows']['api_routes'] == 3
+    assert engine.generation == 2
+
+
+def test_existing_snapshot_is_served_before_first_refresh(engine, tmp_path):
+    def unreachable():
+        raise ConnectionError("mysql is down")
+
+    offline = storage.SnapshotEngine(unreachable, path=engine.path, reuse=True)
+
+    assert offline.ready
+    with pytest.raises(ConnectionError):
+        offline.refresh()
+    with offline.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM vulnerabilities")
+        assert cursor.fetchone() == (3,)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_existing_snapshot_is_not_trusted_by_default(engine):
+    assert not storage.SnapshotEngine(engine._source, path=engine.path).ready
+
+
+def test_refresh_creates_a_private_directory(source, tmp_path):
+    engine = storage.SnapshotEngine(source, path=str(tmp_path / 'instance' / 'snapshot.db'))
+    engine.refresh()
+
+    assert engine.ready
+    assert os.stat(tmp_path / 'instance').st_mode & 0o777 == 0o700
+
+
+def test_first_sqlite_read_starts_the_refresher(source, tmp_path):
+    engine = storage.SnapshotEngine(source, path=str(tmp_path / 'snapshot.db'))
+    app.config['STORAGE_ENGINE'] = 'sqlite'
+    try:
+        with patch.object(app_module, 'snapshot', engine), patch('app.get_db_connection'):
+            with app_module.read_connection():
+                pass
+            deadline = time.monotonic() + 5
+            while not engine.ready and time.monotonic() < deadline:
+                time.sleep(0.01)
+        engine.stop(timeout=5)
+    finally:
+        app.config['STORAGE_ENGINE'] = 'mysql'
+
+    assert engine.stats()['refreshes'] == 1
+
+
+@pytest.fixture
+def sqlite_client(engine):
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    app.config['STORAGE_ENGINE'] = 'sqlite'
+    with patch.object(app_module, 'snapshot', engine), \
+            patch('app.get_db_connection', side_effect=AssertionError("read went to MySQL")):
+        with app.test_client() as client:
+            yield client
+    engine.stop()
+    app.config['STORAGE_ENGINE'] = 'mysql'
+
+
+def test_routes_read_methods_from_normalized_table(sqlite_client):
+    page = sqlite_client.get('/api/routes?limit=1').get_json()
+    lines = sqlite_client.get('/api/routes?format=ndjson&after=1').get_data(as_text=True).splitlines()
+
+    assert page == {'routes': [{'id': 1, 'path': '/api/login', 'methods': ['POST']}], 'next_after': 1}
+    assert lines == ['{"id":2,"methods":["GET","POST"],"path":"/api/fetch"}']
+
+
+def test_live_state_carries_every_chart(sqlite_client):
+    state = app_module._load_live_state()
+
+    assert set(state) == {'stats', 'severity', 'donought_chart', 'timeline'}
+    assert state['severity'] == sqlite_client.get('/api/vulnerabilities/severity').get_json()
+    assert state['donought_chart'] == sqlite_client.get('/api/donought_chart').get_json()
+
+
+def test_read_endpoints_are_served_from_snapshot(sqlite_client):
+    assert sqlite_client.get('/api/total_apis').get_json() == 2
+    assert sqlite_client.get('/api/vulnerabilities/fetch').get_json() == {'SSRF': 'fetch', 'XSS': 'fetch'}
+    assert sqlite_client.get('/api/routes').get_json()[1] == {'path': '/api/fetch', 'methods': ['GET', 'POST']}
+    assert sqlite_client.get('/api/code_score').get_json() == sqlite_client.get('/api/dashboard').get_json()['code_score']
+
+    dashboard = sqlite_client.get('/api/dashboard').get_json()
+    assert dashboard['total_vulnerabilities'] == 3
+    assert dashboard['timeline'] == [[1, 2], [2, 3]]
+    assert dashboard['donought_chart'] == sqlite_client.get('/api/donought_chart').get_json()
+
+    lines = sqlite_client.get('/api/vulnerabilities?format=ndjson').get_data(as_text=True).splitlines()
+    assert len(lines) == 3
@@ -0,0 +1,161 @@
+# tests/test_timeseries.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from contextlib import contextmanager
+from decimal import Decimal
+import pytest
+from unittest.mock import patch, MagicMock
+import app as app_module
+from app import app
+import timeseries
+
+DAY = 86400
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['RESULT_CACHE_ENABLED'] = False
+    with app.test_client() as client:
+        yield client
+
+
+def test_parse_range_defaults_to_last_day():
+    start, end, buckets = timeseries.parse_range({}, now=1000000)
+
+    assert (start, end, buckets) == (1000000 - DAY, 1000000, timeseries.DEFAULT_BUCKETS)
+
+
+def test_parse_range_accepts_iso_and_window():
+    start, end, buckets = timeseries.parse_range({'end': '2024-01-02T00:00:00Z', 'window': '6h', 'buckets': '12'})
+
+    assert end - start == 6 * 3600
+    assert end == 1704153600
+    assert buckets == 12
+
+
+@pytest.mark.parametrize('args', [
+    {'window': '0h'},
+    {'window': 'soon'},
+    {'start': '100', 'end': '50'},
+    {'buckets': '0'},
+    {'buckets': str(timeseries.MAX_BUCKETS + 1)},
+    {'start': 'yesterday'},
+])
+def test_parse_range_rejects_bad_input(args):
+    with pytest.raises(ValueError):
+        timeseries.parse_range(args, now=1000000)
+
+
+def test_series_aligns_buckets_and_averages():
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [(0, 5, 9, Decimal(21), Decimal(3)), (2, 10, 10, Decimal(10), Decimal(1))]
+
+    step, points = timeseries.series(cursor, start=1030, end=1630, buckets=10)
+
+    assert step == 60
+    assert points == [
+        {'t': 1020, 'min': 5, 'max': 9, 'avg': 7.0, 'samples': 3},
+        {'t': 1140, 'min': 10, 'max': 10, 'avg': 10.0, 'samples': 1},
+    ]
+    assert cursor.execute.call_args.args[1] == (1020, 60, 1020, 1630, 1020, 1630)
+
+
+def test_compact_rolls_each_tier_in_chunks():
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    now = 10 * DAY
+    # Raw points from day 7 on, the 15th newest at day 9.5; nothing in the finer rollup tiers yet.
+    cursor.fetchone.side_effect = [(9.5 * DAY,), (7 * DAY,), (None,), (None,)]
+    cursor.rowcount = 100
+
+    report = timeseries.compact(conn, now=now, chunk=DAY)
+
+    # Raw points older than one day: days 7 and 8, one chunk each.
+    inserts = [c for c in cursor.execute.call_args_list if c.args[0].lstrip().startswith('INSERT')]
+    assert [c.args[1][0] for c in inserts] == [60, 60]
+    assert [c.args[1][-2:] for c in inserts] == [(7 * DAY, 8 * DAY), (8 * DAY, 9 * DAY)]
+    assert conn.commit.call_count == 2
+    assert report == {'raw->60': 200, '60->3600': 0, '3600->86400': 0}
+
+
+def test_compact_keeps_the_newest_raw_points_after_a_quiet_spell():
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    # 20 points a minute apart, all long past the one-day raw retention.
+    points = [DAY + i * 60 for i in range(20)]
+    cursor.fetchone.side_effect = [(points[-15],), (points[0],), (None,), (None,)]
+    cursor.rowcount = 5
+
+    report = timeseries.compact(conn, now=30 * DAY, chunk=DAY)
+
+    inserts = [c for c in cursor.execute.call_args_list if c.args[0].lstrip().startswith('INSERT')]
+    assert [c.args[1][-2:] for c in inserts] == [(points[0], points[-15])]
+    assert report['raw->60'] == 5
+
+
+def test_compact_leaves_a_short_raw_table_alone():
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.fetchone.side_effect = [None, (None,), (None,)]
+
+    report = timeseries.compact(conn, now=30 * DAY)
+
+    assert report == {'raw->60': 0, '60->3600': 0, '3600->86400': 0}
+    assert not [c for c in cursor.execute.call_args_list if c.args[0].lstrip().startswith('INSERT')]
+
+
+def test_compactor_skips_when_lock_is_held():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = (0,)
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    with patch('timeseries.compact') as compact:
+        assert timeseries.Compactor(connection).run_once() is None
+    compact.assert_not_called()
+
+
+def test_timeline_range_endpoint(client):
+    with patch('app.get_db_connection') as mocked_db:
+        cursor = mocked_db.return_value.cursor.return_value
+        cursor.fetchall.return_value = [(0, 3, 4, 7, 2)]
+
+        response = client.get('/api/vulnerabilities/timeline?start=0&end=3600&buckets=60')
+        data = response.get_json()
+
+    assert response.status_code == 200
+    assert data['step'] == 60
+    assert data['points'] == [{'t': 0, 'min': 3, 'max': 4, 'avg': 3.5, 'samples': 2}]
+
+
+def test_timeline_range_endpoint_rejects_bad_window(client):
+    response = client.get('/api/vulnerabilities/timeline?window=forever')
+
+    assert response.status_code == 400
+    assert 'invalid window' in response.get_json()['msg']
+
+
+def test_open_ended_range_is_cached_per_bucket(client):
+    app.config['RESULT_CACHE_ENABLED'] = True
+    app_module.result_cache.clear()
+    try:
+        with patch('app.get_db_connection') as mocked_db, \
+                patch.object(app_module.data_versions, 'current', return_value=((5, 5),)), \
+                patch('timeseries.time.time') as now:
+            mocked_db.return_value.cursor.return_value.fetchall.return_value = []
+            ends = []
+            for t in (7200, 7259, 7260):
+                now.return_value = t
+                ends.append(client.get('/api/vulnerabilities/timeline?window=1h&buckets=60').get_json()['end'])
+            fixed = [client.get('/api/vulnerabilities/timeline?start=0&end=3600').status_code for _ in range(2)]
+    finally:
+        app.config['RESULT_CACHE_ENABLED'] = False
+        app_module.result_cache.clear()
+
+    assert ends == [7200, 7200, 7260]
+    assert fixed == [200, 200]
+    assert mocked_db.call_count == 3
@@ -0,0 +1,122 @@
+# tests/test_vulnerability_batch.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from contextlib import contextmanager
+import json
+import pytest
+from unittest.mock import patch
+import app as app_module
+from app import app
+import reference_data
+import storage
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = storage.connect_sqlite(str(tmp_path / 'batch.db'))
+    storage.create_schema(conn)
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO api_routes (path, methods, route_name) VALUES (%s, %s, %s)", [
+        ('/login', 'POST', 'login'), ('/fetch', 'GET', 'fetch_url'),
+        ('/delete-order/<int:order_id>', 'DELETE', 'delete_order'), ('/health', 'GET', None),
+    ])
+    cursor.executemany("INSERT INTO vulnerabilities (vulnerability_type, route_name) VALUES (%s, %s)", [
+        ('SQL Injection', 'login'), ('XSS', 'login'), ('SSRF', 'fetch_url'), ('Unlisted', 'delete_order'),
+    ])
+    cursor.executemany(
+        "INSERT INTO vulnerability_severity (vulnerability_type, severity_level, severity_score) VALUES (%s, %s, %s)",
+        [('SQL Injection', 'Critical', 4), ('SSRF', 'Critical', 4), ('XSS', 'Medium', 2)],
+    )
+    cursor.executemany("INSERT INTO VulnerabilityMitigations (vulnerability_type, recommendations) VALUES (%s, %s)",
+                       [('SQL Injection', 'Use parameterized queries'), ('SSRF', 'Allow-list outbound hosts')])
+    cursor.close()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def client(conn):
+    @contextmanager
+    def connection():
+        yield conn
+
+    app.config['TESTING'] = True
+    store = reference_data.ReferenceStore(connection)
+    with patch.object(app_module, 'reference', store), \
+            patch.object(app_module, 'read_connection', connection):
+        with app.test_client() as client:
+            yield client
+    store.stop(timeout=1)
+
+
+def test_batch_returns_details_per_route(client):
+    response = client.post('/api/vulnerabilities/batch', json={
+        'paths': ['login', '/delete-order/<int:order_id>', 'missing', 'login'],
+    })
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'results': {
+            'login': {
+                'SQL Injection': {'severity_level': 'Critical', 'severity_score': 4,
+                                  'mitigations': ['Use parameterized queries']},
+                'XSS': {'severity_level': 'Medium', 'severity_score': 2, 'mitigations': []},
+            },
+            '/delete-order/<int:order_id>': {
+                'Unlisted': {'severity_level': None, 'severity_score': None, 'mitigations': []},
+            },
+            'missing': {},
+        },
+        'unmapped': [],
+    }
+
+
+def test_batch_resolves_paths_through_stored_route_names(client):
+    response = client.post('/api/vulnerabilities/batch', json={'paths': ['/fetch', '/health', '/unknown']})
+
+    body = response.get_json()
+    assert body['results'] == {
+        '/fetch': {'SSRF': {'severity_level': 'Critical', 'severity_score': 4,
+                            'mitigations': ['Allow-list outbound hosts']}},
+    }
+    assert body['unmapped'] == ['/health', '/unknown']
+
+
+def test_batch_runs_one_query_per_chunk(client, conn):
+    queries = []
+    conn._conn.set_trace_callback(queries.append)
+    with patch.object(app_module, 'DETAILS_CHUNK_SIZE', 2):
+        response = client.post('/api/vulnerabilities/batch', json={'paths': ['login', 'fetch', 'a', 'b', 'c']})
+    conn._conn.set_trace_callback(None)
+
+    assert len(response.get_json()['results']) == 5
+    lookups = [query for query in queries if 'FROM vulnerabilities WHERE route_name IN' in query]
+    assert len(lookups) == 3
+
+
+def test_batch_streams_ndjson(client):
+    response = client.post('/api/vulnerabilities/batch?format=ndjson', json={'paths': ['/fetch', 'login', '/health']})
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['path'] for line in lines] == ['/fetch', 'login', '/health']
+    assert lines[0]['vulnerabilities']['SSRF']['mitigations'] == ['Allow-list outbound hosts']
+    assert lines[2] == {'path': '/health', 'unmapped': True}
+
+
+def test_batch_size_is_capped(client):
+    with patch.object(app_module, 'DETAILS_MAX_BATCH', 2), patch.object(app_module, 'DETAILS_MAX_STREAM_BATCH', 3):
+        too_many = client.post('/api/vulnerabilities/batch', json={'paths': ['a', 'b', 'c']})
+        streamed = client.post('/api/vulnerabilities/batch?format=ndjson', json={'paths': ['a', 'b', 'c']})
+        too_many_streamed = client.post('/api/vulnerabilities/batch?format=ndjson', json={'paths': ['a', 'b', 'c', 'd']})
+
+    assert too_many.status_code == 413
+    assert 'format=ndjson' in too_many.get_json()['msg']
+    assert streamed.status_code == 200
+    assert too_many_streamed.status_code == 413
+
+
+@pytest.mark.parametrize('body', [None, {'paths': 'login'}, {'paths': ['login', 3]}, {'paths': ['']}])
+def test_batch_rejects_bad_bodies(client, body):
+    assert client.post('/api/vulnerabilities/batch', json=body).status_code == 400
@@ -0,0 +1,308 @@
+"""Time-range queries, downsampling and compaction for live_graph.
+
+Raw points live in ``live_graph`` (``created_at`` from migration 4). Older
+points are rolled into ``live_graph_rollups``: one row per ``resolution``
+(bucket width in seconds) and ``bucket_start`` holding the min, max, sum and
+sample count of the points it replaced. Compaction walks ``TIERS`` from
+finest to coarsest, so raw points become minute buckets after a day, minute
+buckets become hours after a week and so on. ``series`` reads the raw and
+rollup rows covering a window and re-buckets them on the server, so a chart
+over months touches a few thousand stored rows at most and returns only as
+many points as it asked for. The newest ``dashboard.TIMELINE_POINTS`` raw
+points are never compacted, however old, because the dashboard's
+last-points timeline reads them from ``live_graph`` and the change
+detector only writes a point when the count moves.
+
+All times are Unix epoch seconds; the SQL is MySQL.
+"""
+from datetime import datetime, timezone
+import logging
+import math
+import re
+import threading
+import time
+
+import dashboard
+
+logger = logging.getLogger(__name__)
+
+# (source resolution, target resolution, seconds the source is kept before rolling up).
+# Resolution 0 is the raw live_graph table.
+TIERS = (
+    (0, 60, 24 * 3600),
+    (60, 3600, 7 * 24 * 3600),
+    (3600, 86400, 90 * 24 * 3600),
+)
+DEFAULT_BUCKETS = 100
+MAX_BUCKETS = 1000
+COMPACTION_CHUNK = 24 * 3600
+COMPACTION_LOCK = 'live_graph_compaction'
+
+_WINDOW = re.compile(r"^(\d+)([smhdw])$")
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def parse_time(raw):
+    """Parse epoch seconds or an ISO 8601 timestamp (UTC when no offset is given)."""
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"invalid time: {raw!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_window(raw):
+    """Parse a window such as ``90m``, ``24h`` or ``30d`` into seconds."""
+    match = _WINDOW.match(raw or '')
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid window: {raw!r} (use e.g. 15m, 24h, 30d)")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_range(args, now=None):
+    """Read ``start``/``end``/``window``/``buckets`` from the query string.
+
+    Returns ``(start, end, buckets)``. ``end`` defaults to now and ``start``
+    to ``end - window`` (one day when neither is given).
+    """
+    now = time.time() if now is None else now
+    end = parse_time(args['end']) if args.get('end') else now
+    if args.get('start'):
+        start = parse_time(args['start'])
+    else:
+        start = end - parse_window(args.get('window') or '1d')
+    if start >= end:
+        raise ValueError("start must be before end")
+
+    raw_buckets = args.get('buckets') or DEFAULT_BUCKETS
+    try:
+        buckets = int(raw_buckets)
+    except ValueError:
+        raise ValueError("buckets must be an integer")
+    if not 1 <= buckets <= MAX_BUCKETS:
+        raise ValueError(f"buckets must be between 1 and {MAX_BUCKETS}")
+    return start, end, buckets
+
+
+def bucket_step(start, end, buckets):
+    """Whole-second bucket width covering ``[start, end)`` in at most ``buckets`` buckets."""
+    return max(1, math.ceil((end - start) / buckets))
+
+
+def series(cursor, start, end, buckets=DEFAULT_BUCKETS):
+    """Return ``(step, points)`` for ``[start, end)`` downsampled into ``buckets`` buckets.
+
+    Bucket boundaries are aligned to multiples of ``step`` so repeated
+    requests over a sliding window line up. Each point is a dict with the
+    bucket start ``t`` and the ``min``/``max``/``avg`` count and ``samples``.
+    Empty buckets are omitted.
+    """
+    step = bucket_step(start, end, buckets)
+    origin = math.floor(start / step) * step
+    cursor.execute("""
+        SELECT FLOOR((UNIX_TIMESTAMP(ts) - %s) / %s) AS bucket,
+               MIN(min_value), MAX(max_value), SUM(sum_value), SUM(samples)
+        FROM (
+            SELECT created_at AS ts, vulnerabilities AS min_value, vulnerabilities AS max_value,
+                   vulnerabilities AS sum_value, 1 AS samples
+            FROM live_graph
+            WHERE created_at >= FROM_UNIXTIME(%s) AND created_at < FROM_UNIXTIME(%s)
+            UNION ALL
+            SELECT bucket_start, min_value, max_value, sum_value, samples
+            FROM live_graph_rollups
+            WHERE bucket_start >= FROM_UNIXTIME(%s) AND bucket_start < FROM_UNIXTIME(%s)
+        ) AS points
+        GROUP BY bucket
+        ORDER BY bucket
+    """, (origin, step, origin, end, origin, end))
+    points = [
+        {
+            't': origin + int(bucket) * step,
+            'min': int(low),
+            'max': int(high),
+            'avg': round(float(total) / int(samples), 3),
+            'samples': int(samples),
+        }
+        for bucket, low, high, total, samples in cursor.fetchall()
+    ]
+    return step, points
+
+
+def _roll_up(cursor, source, target, chunk_start, chunk_end):
+    """Fold one chunk of ``source`` rows into ``target`` buckets and delete them. Returns rows removed."""
+    if source == 0:
+        selected = """
+            SELECT FROM_UNIXTIME(FLOOR(UNIX_TIMESTAMP(created_at) / %s) * %s) AS bucket,
+                   MIN(vulnerabilities) AS low, MAX(vulnerabilities) AS high,
+                   SUM(vulnerabilities) AS total, COUNT(*) AS n
+            FROM live_graph
+            WHERE created_at >= FROM_UNIXTIME(%s) AND created_at < FROM_UNIXTIME(%s)
+            GROUP BY bucket
+        """
+        params = (target, target, chunk_start, chunk_end)
+        delete = "DELETE FROM live_graph WHERE created_at >= FROM_UNIXTIME(%s) AND created_at < FROM_UNIXTIME(%s)"
+        delete_params = (chunk_start, chunk_end)
+    else:
+        selected = """
+            SELECT FROM_UNIXTIME(FLOOR(UNIX_TIMESTAMP(bucket_start) / %s) * %s) AS bucket,
+                   MIN(min_value) AS low, MAX(max_value) AS high,
+                   SUM(sum_value) AS total, SUM(samples) AS n
+            FROM live_graph_rollups
+            WHERE resolution = %s AND bucket_start >= FROM_UNIXTIME(%s) AND bucket_start < FROM_UNIXTIME(%s)
+            GROUP BY bucket
+        """
+        params = (target, target, source, chunk_start, chunk_end)
+        delete = """
+            DELETE FROM live_graph_rollups
+            WHERE resolution = %s AND bucket_start >= FROM_UNIXTIME(%s) AND bucket_start < FROM_UNIXTIME(%s)
+        """
+        delete_params = (source, chunk_start, chunk_end)
+
+    cursor.execute(f"""
+        INSERT INTO live_graph_rollups (resolution, bucket_start, min_value, max_value, sum_value, samples)
+        SELECT %s, bucket, low, high, total, n FROM ({selected}) AS new
+        ON DUPLICATE KEY UPDATE
+            min_value = LEAST(live_graph_rollups.min_value, new.low),
+            max_value = GREATEST(live_graph_rollups.max_value, new.high),
+            sum_value = live_graph_rollups.sum_value + new.total,
+            samples = live_graph_rollups.samples + new.n
+    """, (target,) + params)
+    cursor.execute(delete, delete_params)
+    return cursor.rowcount
+
+
+def _oldest(cursor, source):
+    if source == 0:
+        cursor.execute("SELECT UNIX_TIMESTAMP(MIN(created_at)) FROM live_graph")
+    else:
+        cursor.execute(
+            "SELECT UNIX_TIMESTAMP(MIN(bucket_start)) FROM live_graph_rollups WHERE resolution = %s", (source,)
+        )
+    oldest = cursor.fetchone()[0]
+    return None if oldest is None else float(oldest)
+
+
+def _newest_raw(cursor, keep_latest):
+    """``created_at`` of the ``keep_latest``-th newest raw point, or ``None`` when there are fewer."""
+    cursor.execute(
+        "SELECT UNIX_TIMESTAMP(created_at) FROM live_graph ORDER BY id DESC LIMIT 1 OFFSET %s", (keep_latest - 1,)
+    )
+    row = cursor.fetchone()
+    return None if row is None or row[0] is None else float(row[0])
+
+
+def compact(conn, now=None, tiers=TIERS, chunk=COMPACTION_CHUNK, keep_latest=dashboard.TIMELINE_POINTS):
+    """Roll every tier's expired rows into the next coarser one.
+
+    Each tier's cutoff is aligned to the target bucket width so no bucket is
+    split between two runs, and every ``chunk`` seconds of history is
+    committed separately, so a large backlog never becomes one huge
+    transaction. The raw cutoff never passes the ``keep_latest`` newest raw
+    points. Returns ``{'<source>-><target>': rows removed}``.
+    """
+    now = time.time() if now is None else now
+    report = {}
+    cursor = conn.cursor()
+    try:
+        for source, target, keep in tiers:
+            cutoff = math.floor((now - keep) / target) * target
+            if source == 0 and keep_latest:
+                newest = _newest_raw(cursor, keep_latest)
+                if newest is None:
+                    report[f"raw->{target}"] = 0
+                    continue
+                cutoff = min(cutoff, math.floor(newest / target) * target)
+            oldest = _oldest(cursor, source)
+            removed = 0
+            if oldest is not None and oldest < cutoff:
+                chunk_start = math.floor(oldest / target) * target
+                while chunk_start < cutoff:
+                    chunk_end = min(cutoff, chunk_start + max(chunk, target))
+                    removed += _roll_up(cursor, source, target, chunk_start, chunk_end)
+                    conn.commit()
+                    chunk_start = chunk_end
+            report[f"{source or 'raw'}->{target}"] = removed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return report
+
+
+class Compactor:
+    """Run ``compact`` every ``interval`` seconds in a background thread.
+
+    ``connection`` is a zero-argument callable returning a context manager
+    that yields a DB-API connection. A MySQL named lock keeps several
+    workers from compacting at the same time.
+    """
+
+    def __init__(self, connection, interval=3600.0, tiers=TIERS):
+        self._connection = connection
+        self.interval = interval
+        self.tiers = tiers
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_report = None
+        self.last_run = None
+        self.errors = 0
+
+    def run_once(self, now=None):
+        """Compact now unless another worker holds the lock. Returns the report or ``None``."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (COMPACTION_LOCK,))
+                if not cursor.fetchone()[0]:
+                    return None
+                try:
+                    report = compact(conn, now=now, tiers=self.tiers)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (COMPACTION_LOCK,))
+                    cursor.fetchone()
+            finally:
+                cursor.close()
+        with self._lock:
+            self.last_report = report
+            self.last_run = time.time()
+        return report
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='live-graph-compactor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("live_graph compaction failed")
+                with self._lock:
+                    self.errors += 1
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'last_run': self.last_run,
+                'last_report': self.last_report,
+                'errors': self.errors,
+            }